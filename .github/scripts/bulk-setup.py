@@ -7,6 +7,11 @@ Parses subdomain -> URL mappings and updates configuration
 import json
 import re
 import sys
+from pathlib import Path
+
+# Shared with the leaderboard build
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'tools'))
+from subdomain_index import SubdomainIndex  # noqa: E402
 
 def parse_subdomain_list(text):
     """Parse subdomain list from text"""
@@ -78,6 +83,9 @@ def main():
         config = json.load(f)
 
     subdomains = config.get('subdomains', {})
+    index = SubdomainIndex(subdomains)
+    for host, names in index.duplicates.items():
+        print(f"⚠️  {host} is already served by more than one subdomain: {', '.join(names)}")
 
     # Process each mapping
     new_count = 0
@@ -100,6 +108,12 @@ def main():
         else:
             target = url.rstrip('/')
 
+        # Another subdomain already serving this app is allowed, but worth flagging
+        other = index.claimed_by(target, exclude=subdomain)
+        if other:
+            print(f"⚠️  {subdomain}: {url} is already served by {other}")
+        index.add(subdomain, target)
+
         # Check if exists
         if subdomain in subdomains:
             old_value = subdomains[subdomain]
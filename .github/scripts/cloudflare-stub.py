@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Minimal fake Cloudflare DNS API for testing manage-dns.py offline
+
+Serves one zone (illinihunt.org) with the endpoints manage-dns.py uses:
+zone lookup, paginated record listing, create, delete and the batch
+endpoint. Point the script at it with CLOUDFLARE_API_BASE (any token works):
+
+    .github/scripts/cloudflare-stub.py --port 8787 --records 20
+    CLOUDFLARE_API_BASE=http://127.0.0.1:8787/client/v4 CLOUDFLARE_API_TOKEN=x \\
+        .github/scripts/manage-dns.py sync --prune
+
+GET /_stats returns the number of requests served per method.
+"""
+
+import argparse
+import itertools
+import json
+import socket
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ZONE_NAME = "illinihunt.org"
+ZONE_ID = "zone0000000000000000000000000000"
+PREFIX = "/client/v4"
+
+
+def envelope(result=None, success=True, errors=None, result_info=None):
+    body = {'success': success, 'errors': errors or [], 'messages': [], 'result': result}
+    if result_info is not None:
+        body['result_info'] = result_info
+    return body
+
+
+def error(code, message):
+    return envelope(None, False, [{'code': code, 'message': message}])
+
+
+class FakeZone:
+    """In-memory records of one zone"""
+
+    def __init__(self, seed_records=0, no_batch=False):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.records = {}
+        self.names = set()
+        self.calls = {}
+        self.no_batch = no_batch
+        # Some managed records (stale unless listed in subdomains.json) plus
+        # ones sync must never touch
+        for i in range(seed_records):
+            self._add({'type': 'CNAME', 'name': f"seed{i}.{ZONE_NAME}", 'content': ZONE_NAME, 'proxied': True, 'ttl': 1})
+        self._add({'type': 'CNAME', 'name': f"www.{ZONE_NAME}", 'content': ZONE_NAME, 'proxied': True, 'ttl': 1})
+        self._add({'type': 'CNAME', 'name': f"mail.{ZONE_NAME}", 'content': "mail.example.com", 'proxied': False, 'ttl': 1})
+
+    def _add(self, data):
+        name = data.get('name', '')
+        if not name.lower().endswith(ZONE_NAME):
+            name = f"{name}.{ZONE_NAME}"
+        if (data.get('type'), name.lower()) in self.names:
+            return None
+        record = dict(data, id=f"rec{next(self.ids):028d}", name=name.lower(), zone_id=ZONE_ID, zone_name=ZONE_NAME)
+        self.records[record['id']] = record
+        self.names.add((record['type'], record['name']))
+        return record
+
+    def _remove(self, record_id):
+        record = self.records.pop(record_id, None)
+        if record is not None:
+            self.names.discard((record['type'], record['name']))
+        return record
+
+    def handle(self, method, path, query, body):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if path == "/_stats":
+                return 200, self.calls
+            if not path.startswith(PREFIX):
+                return 404, error(7000, "No route for that URI")
+            path = path[len(PREFIX):]
+
+            if method == 'GET' and path == "/zones":
+                zones = [{'id': ZONE_ID, 'name': ZONE_NAME}] if query.get('name', ZONE_NAME) == ZONE_NAME else []
+                return 200, envelope(zones)
+
+            base = f"/zones/{ZONE_ID}/dns_records"
+            if not path.startswith(base):
+                return 404, error(7003, "Could not route to that zone")
+            rest = path[len(base):]
+
+            if method == 'GET' and rest == "":
+                return 200, self.listing(query)
+            if method == 'POST' and rest == "":
+                record = self._add(body or {})
+                if record is None:
+                    return 400, error(81053, "An A, AAAA, or CNAME record with that host already exists.")
+                return 200, envelope(record)
+            if method == 'POST' and rest == "/batch":
+                if self.no_batch:
+                    return 404, error(7000, "No route for that URI")
+                return self.batch(body or {})
+            if method == 'DELETE' and rest.startswith("/"):
+                record = self._remove(rest[1:])
+                if record is None:
+                    return 404, error(81044, "Record does not exist.")
+                return 200, envelope({'id': record['id']})
+            return 404, error(7000, "No route for that URI")
+
+    def listing(self, query):
+        matches = [
+            r for r in sorted(self.records.values(), key=lambda r: r['id'])
+            if r['type'] == query.get('type', r['type']) and r['name'] == query.get('name', r['name']).lower()
+        ]
+        per_page = max(5, min(int(query.get('per_page', 100)), 5000))
+        page = max(1, int(query.get('page', 1)))
+        total_pages = max(1, -(-len(matches) // per_page))
+        result = matches[(page - 1) * per_page:page * per_page]
+        info = {'page': page, 'per_page': per_page, 'count': len(result), 'total_count': len(matches), 'total_pages': total_pages}
+        return envelope(result, result_info=info)
+
+    def batch(self, body):
+        """Deletes, then posts; all or nothing"""
+
+        deletes = [d.get('id') for d in body.get('deletes', [])]
+        missing = [i for i in deletes if i not in self.records]
+        if missing:
+            return 400, error(81044, f"Record does not exist: {missing[0]}")
+        saved = dict(self.records), set(self.names)
+        removed = [self._remove(i) for i in deletes]
+        posts = []
+        for data in body.get('posts', []):
+            record = self._add(data)
+            if record is None:
+                self.records, self.names = saved
+                return 400, error(81053, f"Record already exists: {data.get('name')}")
+            posts.append(record)
+        return 200, envelope({'deletes': removed, 'posts': posts, 'patches': [], 'puts': []})
+
+
+def make_handler(zone):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self, method):
+            url = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, payload = zone.handle(method, url.path, query, body)
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._serve('GET')
+
+        def do_POST(self):
+            self._serve('POST')
+
+        def do_DELETE(self):
+            self._serve('DELETE')
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Cloudflare DNS API on localhost.")
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--records', type=int, default=0, help="Managed CNAME records to seed the zone with")
+    parser.add_argument('--no-batch', action='store_true', help="Answer the batch endpoint with 404")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(FakeZone(args.records, args.no_batch)))
+    server.daemon_threads = True
+    print(f"Serving fake Cloudflare API on http://127.0.0.1:{args.port}{PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
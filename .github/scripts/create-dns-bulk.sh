@@ -1,43 +1,12 @@
 #!/bin/bash
 # Bulk create DNS records for subdomains
+#
+# Reconciles the zone against subdomains.json in a few requests (one zone
+# listing plus batched writes) instead of looking every subdomain up and
+# creating it one at a time. Extra arguments go to `manage-dns.py sync`,
+# e.g. --dry-run to preview or --prune to also remove stale records.
 
-SUBDOMAINS=(
-    "localoop"
-    "longlink"
-    "net-umbrella"
-    "tonematchai"
-    "moneynova"
-    "thinker"
-    "firstshares"
-    "anchor"
-    "fridgemate"
-    "core"
-    "dormplate"
-    "dresscode"
-    "guidedgains"
-    "youngeru"
-    "thesystem"
-)
-
-echo "Creating DNS records for ${#SUBDOMAINS[@]} subdomains..."
+echo "Syncing DNS records with subdomains.json..."
 echo ""
 
-SUCCESS=0
-FAILED=0
-
-for subdomain in "${SUBDOMAINS[@]}"; do
-    echo "Creating DNS record: ${subdomain}.illinihunt.org"
-
-    if .github/scripts/manage-dns.py create "$subdomain" 2>&1 | grep -q "SUCCESS\|already exists"; then
-        echo "  ✅ Success"
-        ((SUCCESS++))
-    else
-        echo "  ❌ Failed"
-        ((FAILED++))
-    fi
-
-    echo ""
-done
-
-echo "================================"
-echo "Summary: ${SUCCESS} successful, ${FAILED} failed"
+.github/scripts/manage-dns.py sync "$@"
@@ -3,17 +3,170 @@
 Manage Cloudflare DNS records for illinihunt.org subdomains
 
 Creates/updates CNAME records pointing to illinihunt.org (proxied)
+
+`sync` reconciles the zone against subdomains.json: one paginated listing of
+the zone's CNAMEs, a diff, then the missing records are created (and, with
+--prune, stale ones deleted) through Cloudflare's batch DNS endpoint, or
+concurrently over pooled connections with --no-batch.
+
+The zone ID and known record IDs are cached between runs (default
+.cache/cloudflare-dns.json, entries expire after a day), so a repeated
+create or delete costs one API call. A 404 or conflict from the API drops
+the stale entry and looks the record (or zone) up again.
+
+CLOUDFLARE_API_BASE overrides the API endpoint (e.g. a local fake server:
+.github/scripts/cloudflare-stub.py).
 """
 
+import argparse
+import http.client
 import json
 import os
 import sys
-import urllib.request
-import urllib.error
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 
 ZONE_NAME = "illinihunt.org"
-API_BASE = "https://api.cloudflare.com/client/v4"
+API_BASE = os.environ.get("CLOUDFLARE_API_BASE", "https://api.cloudflare.com/client/v4").rstrip("/")
+
+# Records per page when listing the zone (Cloudflare allows up to 5,000,000)
+PER_PAGE = 5000
+# Operations per batch request (the lowest plan limit)
+BATCH_LIMIT = 200
+# Records sync never deletes, even when they point at the zone apex
+PROTECTED = {"www"}
+
+CACHE_PATH = os.environ.get("CLOUDFLARE_DNS_CACHE", ".cache/cloudflare-dns.json")
+CACHE_TTL = 24 * 3600  # seconds
+# Cloudflare error codes: record missing, record already exists, zone not routable
+RECORD_MISSING = {81044}
+RECORD_EXISTS = {81053, 81057, 81058}
+ZONE_MISSING = {7003}
+
+
+class ApiError(Exception):
+    """Non-2xx answer from the Cloudflare API"""
+
+    def __init__(self, status, body):
+        super().__init__(f"API Error: {status} - {body}")
+        self.status = status
+        self.body = body
+        try:
+            errors = json.loads(body).get('errors') or []
+        except (ValueError, AttributeError):
+            errors = []
+        self.codes = {e.get('code') for e in errors if isinstance(e, dict)}
+
+    @property
+    def record_missing(self):
+        return self.status == 404 and bool(self.codes & RECORD_MISSING)
+
+    @property
+    def conflict(self):
+        return self.status == 409 or bool(self.codes & RECORD_EXISTS)
+
+    @property
+    def zone_missing(self):
+        return bool(self.codes & ZONE_MISSING) or (self.status == 404 and not self.record_missing)
+
+
+class DnsCache:
+    """Zone ID and record IDs (by full record name) remembered between runs.
+
+    Entries older than ttl seconds are ignored. With no path nothing is kept.
+    """
+
+    def __init__(self, path=None, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.zone = None
+        self.records = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            zone = data.get('zone') or {}
+            if zone.get('name') == ZONE_NAME:
+                self.zone = zone
+                self.records = data.get('records') or {}
+
+    def _fresh(self, entry):
+        return bool(entry) and time.time() - entry.get('at', 0) < self.ttl
+
+    def zone_id(self):
+        return self.zone['id'] if self._fresh(self.zone) else None
+
+    def set_zone(self, zone_id):
+        if not self.zone or self.zone.get('id') != zone_id:
+            self.records = {}
+        self.zone = {'name': ZONE_NAME, 'id': zone_id, 'at': time.time()}
+        self.dirty = True
+
+    def forget_zone(self):
+        self.zone = None
+        self.records = {}
+        self.dirty = True
+
+    def record_id(self, name):
+        entry = self.records.get(name.lower())
+        return entry['id'] if self._fresh(entry) else None
+
+    def set_record(self, name, record_id):
+        self.records[name.lower()] = {'id': record_id, 'at': time.time()}
+        self.dirty = True
+
+    def forget_record(self, name):
+        if self.records.pop(name.lower(), None):
+            self.dirty = True
+
+    def replace_records(self, records):
+        """Start over from a full listing of the zone"""
+        now = time.time()
+        self.records = {r['name'].lower(): {'id': r['id'], 'at': now} for r in records}
+        self.dirty = True
+
+    def save(self):
+        """Write atomically, and only if anything changed"""
+        if not self.path or not self.dirty:
+            return
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'zone': self.zone, 'records': self.records}, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
+
+
+# One keep-alive connection per thread
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        parts = urllib.parse.urlsplit(API_BASE)
+        cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        conn = _local.conn = cls(parts.netloc, timeout=30)
+    return conn
+
+
+def _reset_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
 
 
 def make_api_request(endpoint, method="GET", data=None):
@@ -23,27 +176,39 @@ def make_api_request(endpoint, method="GET", data=None):
     if not api_token:
         raise ValueError("CLOUDFLARE_API_TOKEN environment variable not set")
 
-    url = f"{API_BASE}{endpoint}"
+    path = urllib.parse.urlsplit(API_BASE).path + endpoint
     headers = {
         'Authorization': f'Bearer {api_token}',
         'Content-Type': 'application/json'
     }
 
     request_data = json.dumps(data).encode('utf-8') if data else None
-    req = urllib.request.Request(url, data=request_data, headers=headers, method=method)
-
-    try:
-        with urllib.request.urlopen(req) as response:
-            return json.loads(response.read().decode('utf-8'))
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8')
-        print(f"API Error: {e.code} - {error_body}")
-        raise
 
-
-def get_zone_id():
+    for attempt in range(2):
+        conn = _connection()
+        try:
+            conn.request(method, path, body=request_data, headers=headers)
+            response = conn.getresponse()
+            status, body = response.status, response.read().decode('utf-8')
+            break
+        except (http.client.HTTPException, ConnectionError):
+            # The server closed an idle keep-alive connection; reconnect once
+            _reset_connection()
+            if attempt:
+                raise
+
+    if status >= 400:
+        raise ApiError(status, body)
+    return json.loads(body)
+
+
+def get_zone_id(cache=None):
     """Get zone ID for illinihunt.org"""
 
+    zone_id = cache.zone_id() if cache else None
+    if zone_id:
+        return zone_id
+
     response = make_api_request(f"/zones?name={ZONE_NAME}")
 
     if not response.get('success'):
@@ -53,9 +218,25 @@ def get_zone_id():
     if not zones:
         raise ValueError(f"Zone {ZONE_NAME} not found")
 
+    if cache:
+        cache.set_zone(zones[0]['id'])
     return zones[0]['id']
 
 
+def with_zone(cache, operation):
+    """Run operation(zone_id); if a cached zone ID turns out stale, refresh it and retry once"""
+
+    cached = cache.zone_id() is not None
+    try:
+        return operation(get_zone_id(cache))
+    except ApiError as e:
+        if not cached or not e.zone_missing:
+            raise
+        print("Cached zone ID is stale; looking it up again")
+        cache.forget_zone()
+        return operation(get_zone_id(cache))
+
+
 def get_dns_record(zone_id, subdomain):
     """Check if DNS record already exists"""
 
@@ -69,80 +250,287 @@ def get_dns_record(zone_id, subdomain):
     return records[0] if records else None
 
 
-def create_dns_record(zone_id, subdomain):
-    """Create CNAME record for subdomain"""
+def list_dns_records(zone_id, record_type="CNAME"):
+    """All records of one type in the zone, following pagination"""
 
-    full_name = f"{subdomain}.{ZONE_NAME}"
+    records = []
+    page = 1
+    while True:
+        response = make_api_request(f"/zones/{zone_id}/dns_records?type={record_type}&per_page={PER_PAGE}&page={page}")
+        if not response.get('success'):
+            raise ValueError(f"Failed to list DNS records: {response.get('errors')}")
+        records.extend(response.get('result', []))
+        total_pages = (response.get('result_info') or {}).get('total_pages') or 1
+        if page >= total_pages:
+            return records
+        page += 1
 
-    # Check if record already exists
-    existing = get_dns_record(zone_id, subdomain)
-    if existing:
-        print(f"DNS record already exists for {full_name}")
-        return existing['id']
 
-    # Create CNAME record pointing to root domain (proxied)
-    data = {
+def record_data(subdomain):
+    """CNAME record pointing to root domain (proxied)"""
+
+    return {
         'type': 'CNAME',
-        'name': subdomain,
+        'name': f"{subdomain}.{ZONE_NAME}",
         'content': ZONE_NAME,
         'ttl': 1,  # Automatic
         'proxied': True  # Orange cloud
     }
 
-    response = make_api_request(f"/zones/{zone_id}/dns_records", method="POST", data=data)
+
+def create_dns_record(zone_id, subdomain, cache=None):
+    """Create CNAME record for subdomain"""
+
+    cache = cache or DnsCache()
+    full_name = f"{subdomain}.{ZONE_NAME}"
+
+    # Create first and only look the record up if it already exists
+    try:
+        response = make_api_request(f"/zones/{zone_id}/dns_records", method="POST", data=record_data(subdomain))
+    except ApiError as e:
+        if not e.conflict:
+            raise
+        existing = get_dns_record(zone_id, subdomain)
+        if not existing:
+            raise  # Taken by a record of another type
+        cache.set_record(full_name, existing['id'])
+        print(f"DNS record already exists for {full_name}")
+        return existing['id']
 
     if not response.get('success'):
         errors = response.get('errors', [])
         raise ValueError(f"Failed to create DNS record: {errors}")
 
     record_id = response['result']['id']
+    cache.set_record(full_name, record_id)
     print(f"✅ Created DNS record: {full_name} -> {ZONE_NAME} (proxied)")
     return record_id
 
 
-def delete_dns_record(zone_id, subdomain):
+def delete_dns_record(zone_id, subdomain, cache=None):
     """Delete DNS record for subdomain"""
 
-    existing = get_dns_record(zone_id, subdomain)
-    if not existing:
-        print(f"DNS record does not exist for {subdomain}.{ZONE_NAME}")
-        return
+    cache = cache or DnsCache()
+    full_name = f"{subdomain}.{ZONE_NAME}"
 
-    record_id = existing['id']
-    response = make_api_request(f"/zones/{zone_id}/dns_records/{record_id}", method="DELETE")
+    record_id = cache.record_id(full_name)
+    if record_id:
+        try:
+            response = make_api_request(f"/zones/{zone_id}/dns_records/{record_id}", method="DELETE")
+        except ApiError as e:
+            if not e.record_missing:
+                raise
+            # Removed or recreated behind our back; look it up by name
+            cache.forget_record(full_name)
+            record_id = None
+
+    if not record_id:
+        existing = get_dns_record(zone_id, subdomain)
+        if not existing:
+            print(f"DNS record does not exist for {full_name}")
+            return
+
+        record_id = existing['id']
+        response = make_api_request(f"/zones/{zone_id}/dns_records/{record_id}", method="DELETE")
 
     if not response.get('success'):
         errors = response.get('errors', [])
         raise ValueError(f"Failed to delete DNS record: {errors}")
 
-    print(f"✅ Deleted DNS record: {subdomain}.{ZONE_NAME}")
+    cache.forget_record(full_name)
+    print(f"✅ Deleted DNS record: {full_name}")
+
+
+def load_subdomains(path="subdomains.json"):
+    """Subdomain names configured in subdomains.json"""
+
+    with open(path, 'r') as f:
+        return list(json.load(f).get('subdomains', {}))
+
+
+def plan_sync(subdomains, records):
+    """Diff wanted subdomains against the zone's CNAMEs.
+
+    Returns (creates, deletes, unchanged): subdomain names to create, records
+    to delete and the number already in place. Only records this script
+    manages (CNAMEs onto the zone apex) are ever candidates for deletion.
+    """
+
+    suffix = f".{ZONE_NAME}"
+    existing = {r['name'].lower(): r for r in records}
+    wanted = {f"{s}{suffix}".lower(): s for s in subdomains}
+
+    creates = sorted(s for name, s in wanted.items() if name not in existing)
+    deletes = sorted(
+        (r for name, r in existing.items()
+         if name not in wanted
+         and name.endswith(suffix)
+         and name[:-len(suffix)] not in PROTECTED
+         and str(r.get('content', '')).lower() == ZONE_NAME),
+        key=lambda r: r['name'],
+    )
+    return creates, deletes, len(wanted) - len(creates)
+
+
+def _short(name):
+    return name[:-len(ZONE_NAME) - 1] if name.lower().endswith(f".{ZONE_NAME}") else name
+
+
+def apply_batch(zone_id, creates, deletes):
+    """Apply the diff through POST /dns_records/batch, BATCH_LIMIT operations per request.
+
+    Each batch is atomic on Cloudflare's side, so its operations share one outcome.
+    Returns [(action, subdomain, error or None, created record ID)].
+    """
+
+    ops = [('delete', r) for r in deletes] + [('create', s) for s in creates]
+    results = []
+    for i in range(0, len(ops), BATCH_LIMIT):
+        chunk = ops[i:i + BATCH_LIMIT]
+        body = {
+            'deletes': [{'id': r['id']} for op, r in chunk if op == 'delete'],
+            'posts': [record_data(s) for op, s in chunk if op == 'create'],
+        }
+        created = {}
+        try:
+            response = make_api_request(f"/zones/{zone_id}/dns_records/batch", method="POST", data=body)
+            error = None if response.get('success') else str(response.get('errors'))
+            created = {r['name'].lower(): r['id'] for r in (response.get('result') or {}).get('posts') or []}
+        except ApiError as e:
+            if i == 0 and e.status in (404, 405):
+                raise  # No batch endpoint; the caller falls back
+            error = str(e)
+        for op, item in chunk:
+            if op == 'delete':
+                results.append((op, _short(item['name']), error, None))
+            else:
+                results.append((op, item, error, created.get(f"{item}.{ZONE_NAME}".lower())))
+    return results
+
+
+def apply_concurrent(zone_id, creates, deletes, concurrency=8):
+    """Apply the diff one request per record, several in flight at once.
+
+    Returns [(action, subdomain, error or None, created record ID)].
+    """
+
+    def create(subdomain):
+        try:
+            response = make_api_request(f"/zones/{zone_id}/dns_records", method="POST", data=record_data(subdomain))
+            if not response.get('success'):
+                return 'create', subdomain, str(response.get('errors')), None
+            return 'create', subdomain, None, response['result']['id']
+        except Exception as e:
+            return 'create', subdomain, str(e), None
+
+    def delete(record):
+        try:
+            response = make_api_request(f"/zones/{zone_id}/dns_records/{record['id']}", method="DELETE")
+            return 'delete', _short(record['name']), None if response.get('success') else str(response.get('errors')), None
+        except ApiError as e:
+            # Already gone counts as deleted
+            return 'delete', _short(record['name']), None if e.record_missing else str(e), None
+        except Exception as e:
+            return 'delete', _short(record['name']), str(e), None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(delete, r) for r in deletes] + [pool.submit(create, s) for s in creates]
+        return [f.result() for f in futures]
+
+
+def sync_dns_records(zone_id, subdomains, prune=False, dry_run=False, batch=True, concurrency=8, cache=None):
+    """Reconcile the zone's CNAMEs with subdomains; returns the number of failed operations"""
+
+    cache = cache or DnsCache()
+    records = list_dns_records(zone_id)
+    cache.replace_records(records)
+    creates, deletes, unchanged = plan_sync(subdomains, records)
+
+    print(f"{len(records)} CNAME records in zone, {len(subdomains)} subdomains configured")
+    print(f"Plan: {len(creates)} to create, {len(deletes)} to delete, {unchanged} unchanged")
+    if deletes and not prune:
+        for r in deletes:
+            print(f"  (stale) {r['name']} — rerun with --prune to delete")
+        deletes = []
+
+    if dry_run:
+        for s in creates:
+            print(f"  + {s}.{ZONE_NAME}")
+        for r in deletes:
+            print(f"  - {r['name']}")
+        return 0
+    if not creates and not deletes:
+        return 0
+
+    results = None
+    if batch:
+        try:
+            results = apply_batch(zone_id, creates, deletes)
+        except ApiError:
+            print("Batch endpoint unavailable; falling back to individual requests")
+    if results is None:
+        results = apply_concurrent(zone_id, creates, deletes, concurrency)
+
+    failed = 0
+    for action, subdomain, error, record_id in results:
+        full_name = f"{subdomain}.{ZONE_NAME}"
+        if error:
+            failed += 1
+            print(f"❌ Failed to {action} {full_name}: {error}")
+        elif action == 'create':
+            if record_id:
+                cache.set_record(full_name, record_id)
+            print(f"✅ Created DNS record: {full_name} -> {ZONE_NAME} (proxied)")
+        else:
+            cache.forget_record(full_name)
+            print(f"✅ Deleted DNS record: {full_name}")
+    print(f"Summary: {len(results) - failed} applied, {failed} failed")
+    return failed
 
 
 def main():
     """Main function"""
 
-    if len(sys.argv) < 3:
-        print("Usage: manage-dns.py <action> <subdomain>")
-        print("Actions: create, delete")
-        sys.exit(1)
-
-    action = sys.argv[1].lower()
-    subdomain = sys.argv[2]
+    parser = argparse.ArgumentParser(description=f"Manage CNAME records for {ZONE_NAME} subdomains")
+    parser.add_argument('action', choices=['create', 'delete', 'list', 'sync'])
+    parser.add_argument('subdomain', nargs='?', help="Subdomain for create/delete")
+    parser.add_argument('--subdomains', default='subdomains.json', help="Config to sync against (default: subdomains.json)")
+    parser.add_argument('--prune', action='store_true', help="sync: also delete managed records missing from the config")
+    parser.add_argument('--dry-run', action='store_true', help="sync: print the plan without changing anything")
+    parser.add_argument('--no-batch', dest='batch', action='store_false', help="sync: one request per record instead of the batch endpoint")
+    parser.add_argument('--concurrency', type=int, default=8, help="sync --no-batch: requests in flight (default 8)")
+    parser.add_argument('--cache', default=CACHE_PATH, help=f"Zone/record ID cache (default: {CACHE_PATH})")
+    parser.add_argument('--cache-ttl', type=int, default=CACHE_TTL, help=f"Seconds before cached IDs are looked up again (default {CACHE_TTL})")
+    parser.add_argument('--no-cache', action='store_true', help="Always look the zone and records up")
+    args = parser.parse_args()
+
+    if args.action in ('create', 'delete') and not args.subdomain:
+        parser.error(f"{args.action} needs a subdomain")
+
+    cache = DnsCache(None if args.no_cache else args.cache, args.cache_ttl)
+
+    def perform(zone_id):
+        print(f"Zone ID: {zone_id}")
+        if args.action == 'create':
+            create_dns_record(zone_id, args.subdomain, cache)
+        elif args.action == 'delete':
+            delete_dns_record(zone_id, args.subdomain, cache)
+        elif args.action == 'list':
+            records = list_dns_records(zone_id)
+            cache.replace_records(records)
+            for record in sorted(records, key=lambda r: r['name']):
+                proxied = " (proxied)" if record.get('proxied') else ""
+                print(f"{record['name']} -> {record.get('content')}{proxied}")
+        else:
+            subdomains = load_subdomains(args.subdomains)
+            return sync_dns_records(zone_id, subdomains, args.prune, args.dry_run, args.batch, args.concurrency, cache)
+        return 0
 
     try:
-        # Get zone ID
+        # Get zone ID (cached) and perform action
         print(f"Looking up zone ID for {ZONE_NAME}...")
-        zone_id = get_zone_id()
-        print(f"Zone ID: {zone_id}")
-
-        # Perform action
-        if action == 'create':
-            create_dns_record(zone_id, subdomain)
-        elif action == 'delete':
-            delete_dns_record(zone_id, subdomain)
-        else:
-            print(f"Unknown action: {action}")
-            sys.exit(1)
+        if with_zone(cache, perform):
+            return 1
 
         print("SUCCESS")
         return 0
@@ -151,6 +539,9 @@ def main():
         print(f"ERROR: {e}")
         return 1
 
+    finally:
+        cache.save()
+
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -3,13 +3,33 @@
 Process subdomain request from GitHub issue
 
 Parses issue body, validates input, and updates subdomains.json
+
+Batch mode applies many requests at once: one read of subdomains.json, every
+request validated and applied in order, one atomic write, all under an
+exclusive lock (subdomains.json.lock) so concurrent runs cannot lose each
+other's updates. Requests come as JSONL on stdin ({"id": ..., "body": ...}
+per line) or as a directory of issue bodies (one file each, named after the
+issue); a JSON result document with one entry per request goes to stdout.
+
+    process-subdomain-request.py "<issue body>"
+    process-subdomain-request.py --batch < requests.jsonl
+    process-subdomain-request.py --batch issues/
 """
 
+import argparse
+import contextlib
+import fcntl
 import json
+import os
 import re
 import sys
+import tempfile
 from pathlib import Path
 
+# Shared with the leaderboard build
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'tools'))
+from subdomain_index import SubdomainIndex  # noqa: E402
+
 
 def parse_issue_body(body):
     """Extract subdomain and URL from issue body"""
@@ -66,18 +86,50 @@ def validate_bolt_url(url):
     return None, "Invalid URL format. Supported: bolt.host, vercel.app, netlify.app, onrender.com, fly.dev"
 
 
-def update_subdomains_config(subdomain, project_id, action):
-    """Update subdomains.json with new/updated subdomain"""
+CONFIG_FILE = Path('subdomains.json')
+
+
+@contextlib.contextmanager
+def config_transaction(config_file=CONFIG_FILE):
+    """Read subdomains.json under an exclusive lock; write it back atomically if changed.
+
+    Yields the parsed config, or None when the file does not exist.
+    """
+
+    lock_file = config_file.with_name(config_file.name + '.lock')
+    with open(lock_file, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
 
-    config_file = Path('subdomains.json')
+        if not config_file.exists():
+            yield None
+            return
 
-    if not config_file.exists():
-        return False, "subdomains.json not found"
+        with open(config_file, 'r') as f:
+            original = f.read()
+        config = json.loads(original)
 
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+        yield config
 
-    subdomains = config.get('subdomains', {})
+        updated = json.dumps(config, indent=2)
+        if updated == original:
+            return
+        fd, tmp = tempfile.mkstemp(dir=config_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(updated)
+            # mkstemp creates 0600; keep the committed file's mode
+            os.chmod(tmp, config_file.stat().st_mode & 0o777)
+            os.replace(tmp, config_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def apply_request(subdomains, index, subdomain, project_id, action):
+    """Apply one validated request to the in-memory subdomain map.
+
+    Returns (success, message, warnings).
+    """
 
     # Check if subdomain exists
     exists = subdomain in subdomains
@@ -87,51 +139,181 @@ def update_subdomains_config(subdomain, project_id, action):
         action = 'update' if exists else 'new'
 
     if action == 'new' and exists:
-        return False, f"Subdomain '{subdomain}' already exists. Use 'update' action to modify it, or omit the Action field to auto-detect."
+        return False, f"Subdomain '{subdomain}' already exists. Use 'update' action to modify it, or omit the Action field to auto-detect.", []
 
     if action == 'update' and not exists:
-        return False, f"Subdomain '{subdomain}' does not exist. Use 'new' action to create it, or omit the Action field to auto-detect."
+        return False, f"Subdomain '{subdomain}' does not exist. Use 'new' action to create it, or omit the Action field to auto-detect.", []
+
+    # Another subdomain already serving this app is allowed, but worth flagging
+    warnings = []
+    other = index.claimed_by(project_id, exclude=subdomain)
+    if other:
+        warnings.append(f"{project_id} is already served by '{other}.illinihunt.org'")
 
     # Update subdomain
     old_value = subdomains.get(subdomain)
     subdomains[subdomain] = project_id
-    config['subdomains'] = subdomains
-
-    # Write back
-    with open(config_file, 'w') as f:
-        json.dump(config, f, indent=2)
+    index.add(subdomain, project_id)
 
     action_msg = f"Updated '{subdomain}' from {old_value} to {project_id}" if action == 'update' else f"Added '{subdomain}' -> {project_id}"
-    return True, action_msg
+    return True, action_msg, warnings
 
 
-def main():
-    """Main function"""
+def update_subdomains_config(subdomain, project_id, action):
+    """Update subdomains.json with new/updated subdomain"""
 
-    if len(sys.argv) < 2:
-        print("ERROR: Missing issue body")
-        sys.exit(1)
+    with config_transaction() as config:
+        if config is None:
+            return False, "subdomains.json not found"
+
+        subdomains = config.get('subdomains', {})
+        success, message, warnings = apply_request(subdomains, SubdomainIndex(subdomains), subdomain, project_id, action)
+        for warning in warnings:
+            print(f"WARNING: {warning}")
+        config['subdomains'] = subdomains
+
+    return success, message
 
-    issue_body = sys.argv[1]
+
+def validate_request(issue_body):
+    """Parse and validate an issue body.
+
+    Returns (subdomain, project_id, action, error); error is None when valid.
+    """
 
     # Parse issue
     subdomain, url, action = parse_issue_body(issue_body)
 
     if not subdomain or not url:
-        print("ERROR: Could not parse subdomain or URL from issue body")
-        print("Make sure you filled in both 'Subdomain Name' and 'Bolt.host URL' fields")
-        sys.exit(1)
+        return subdomain, None, action, "Could not parse subdomain or URL from issue body. Make sure you filled in both 'Subdomain Name' and 'Bolt.host URL' fields"
 
     # Validate subdomain
     valid, error = validate_subdomain(subdomain)
     if not valid:
-        print(f"ERROR: Invalid subdomain: {error}")
-        sys.exit(1)
+        return subdomain, None, action, f"Invalid subdomain: {error}"
 
     # Validate and extract bolt URL
     project_id, error = validate_bolt_url(url)
     if not project_id:
-        print(f"ERROR: Invalid URL: {error}")
+        return subdomain, None, action, f"Invalid URL: {error}"
+
+    return subdomain, project_id, action, None
+
+
+def parse_batch_item(text, default_id):
+    """(id, issue body, error) for one JSON request; error is None when it is usable"""
+
+    try:
+        item = json.loads(text)
+    except ValueError as e:
+        return default_id, None, f"Invalid JSON: {e}"
+    if not isinstance(item, dict):
+        return default_id, None, "Request must be a JSON object"
+    request_id = item.get('id', item.get('number', default_id))
+    body = item.get('body')
+    if not isinstance(body, str):
+        return request_id, None, "Request body must be a string"
+    return request_id, body, None
+
+
+def read_batch(source):
+    """(id, issue body, error) triples from JSONL on stdin (source '-') or a directory of issue bodies
+
+    A line or file that is not a usable request gets an error instead of a
+    body, so one bad entry fails on its own rather than the whole batch.
+    """
+
+    if source == '-':
+        requests = []
+        for n, line in enumerate(sys.stdin.buffer, 1):
+            if not line.strip():
+                continue
+            try:
+                text = line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                requests.append((n, None, f"Invalid UTF-8: {e}"))
+                continue
+            requests.append(parse_batch_item(text, n))
+        return requests
+
+    requests = []
+    for path in sorted(Path(source).iterdir(), key=lambda p: (len(p.stem), p.stem)):
+        if not path.is_file() or path.name.startswith('.'):
+            continue
+        try:
+            body = path.read_text(encoding='utf-8')
+        except UnicodeDecodeError as e:
+            requests.append((path.stem, None, f"Invalid UTF-8: {e}"))
+            continue
+        if path.suffix == '.json':
+            requests.append(parse_batch_item(body, path.stem))
+        else:
+            requests.append((path.stem, body, None))
+    return requests
+
+
+def process_batch(requests):
+    """Validate every request, then apply them in order in one transaction.
+
+    Returns the result document: {"applied": n, "failed": n, "results": [...]}.
+    """
+
+    validated = [
+        (request_id, validate_request(body) if error is None else (None, None, None, error))
+        for request_id, body, error in requests
+    ]
+
+    results = []
+    with config_transaction() as config:
+        if config is None:
+            raise FileNotFoundError("subdomains.json not found")
+
+        subdomains = config.get('subdomains', {})
+        index = SubdomainIndex(subdomains)
+        for request_id, (subdomain, project_id, action, error) in validated:
+            result = {'id': request_id, 'success': False, 'subdomain': subdomain, 'project_id': project_id, 'warnings': []}
+            if error is None:
+                success, message, warnings = apply_request(subdomains, index, subdomain, project_id, action)
+                result.update(success=success, warnings=warnings)
+                if success:
+                    result.update(message=message, url=f"https://{subdomain}.illinihunt.org")
+                else:
+                    error = message
+            if error is not None:
+                result['error'] = error
+            results.append(result)
+        config['subdomains'] = subdomains
+
+    applied = sum(1 for r in results if r['success'])
+    return {'applied': applied, 'failed': len(results) - applied, 'results': results}
+
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Apply subdomain requests from GitHub issues to subdomains.json")
+    parser.add_argument('issue_body', nargs='?', help="Issue body of a single request")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='DIR',
+                        help="Apply many requests in one transaction: JSONL on stdin, or a directory of issue bodies")
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        try:
+            document = process_batch(read_batch(args.batch))
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        json.dump(document, sys.stdout, indent=2)
+        print()
+        return 1 if document['failed'] else 0
+
+    if not args.issue_body:
+        print("ERROR: Missing issue body")
+        sys.exit(1)
+
+    subdomain, project_id, action, error = validate_request(args.issue_body)
+    if error:
+        print(f"ERROR: {error}")
         sys.exit(1)
 
     # Update config
@@ -0,0 +1,120 @@
+"""Attribute commits to students.
+
+The rules are the ones commit_belongs_to_student has always applied:
+
+- the commit's author or committer GitHub login equals the student's login;
+- an author/committer noreply email (...@users.noreply.github.com) has a
+  local part containing the login;
+- weak fallback: at least two tokens of the student's full name appear as
+  substrings of the author + committer names.
+
+Attribution precomputes the lowered login and name tokens of every student
+once per run and reduces each commit to a small identity tuple. Decisions are
+memoised per (identity, student): a repo's commits come from a handful of
+people, so after the first commit by someone every further commit resolves
+with dictionary lookups.
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Tuple
+
+NOREPLY = "@users.noreply.github.com"
+_NAME_SPLIT = re.compile(r"[ ,]+")
+
+# (author login, committer login, noreply local parts, author + committer names), all lowercased
+Identity = Tuple[str, str, Tuple[str, ...], str]
+
+
+def _identity(a_login, c_login, a_email, c_email, a_name, c_name) -> Identity:
+    locals_ = tuple(
+        e.split("@", 1)[0] for e in (str(a_email or "").lower(), str(c_email or "").lower()) if e.endswith(NOREPLY)
+    )
+    names = (str(a_name or "") + " " + str(c_name or "")).lower()
+    return (a_login or "").lower(), (c_login or "").lower(), locals_, names
+
+
+def rest_identity(commit: dict) -> Identity:
+    """Identity of a REST commit object (GET /repos/{owner}/{repo}/commits)."""
+    info = commit.get("commit") or {}
+    ca = info.get("author", {}) or {}
+    cc = info.get("committer", {}) or {}
+    return _identity(
+        (commit.get("author") or {}).get("login"),
+        (commit.get("committer") or {}).get("login"),
+        ca.get("email"),
+        cc.get("email"),
+        ca.get("name"),
+        cc.get("name"),
+    )
+
+
+def graphql_identity(node: dict) -> Identity:
+    """Identity of a GraphQL history node selected with GRAPHQL_FIELDS."""
+    a = node.get("author") or {}
+    c = node.get("committer") or {}
+    return _identity(
+        (a.get("user") or {}).get("login"),
+        (c.get("user") or {}).get("login"),
+        a.get("email"),
+        c.get("email"),
+        a.get("name"),
+        c.get("name"),
+    )
+
+
+def webhook_identity(commit: dict) -> Identity:
+    """Identity of a commit in a push webhook payload (author/committer carry a username)."""
+    a = commit.get("author") or {}
+    c = commit.get("committer") or {}
+    return _identity(a.get("username"), c.get("username"), a.get("email"), c.get("email"), a.get("name"), c.get("name"))
+
+
+# Selection that gives graphql_identity what it needs
+GRAPHQL_FIELDS = "author { name email user { login } } committer { name email user { login } }"
+
+
+def identity(commit: dict) -> Identity:
+    """Identity of either a REST commit object or a GraphQL history node."""
+    return rest_identity(commit) if "commit" in commit else graphql_identity(commit)
+
+
+class Attribution:
+    def __init__(self, students: Iterable[Tuple[str, str]]):
+        """students: (login, full name) pairs; a student's id is its position."""
+        self._logins: List[str] = []
+        self._tokens: List[List[str]] = []
+        for login, full_name in students:
+            self._logins.append((login or "").lower())
+            tokens = [t for t in _NAME_SPLIT.split((full_name or "").lower()) if t]
+            # Fewer than two tokens can never reach two hits
+            self._tokens.append(tokens if len(tokens) >= 2 else [])
+        self._memo: Dict[Tuple[Identity, int], bool] = {}
+
+    def _decide(self, ident: Identity, sid: int) -> bool:
+        a_login, c_login, locals_, names = ident
+        login_l = self._logins[sid]
+        if a_login == login_l or c_login == login_l:
+            return True
+        if any(login_l in local for local in locals_):
+            return True
+        tokens = self._tokens[sid]
+        return bool(tokens) and sum(1 for t in tokens if t in names) >= 2
+
+    def belongs(self, ident: Identity, sid: int) -> bool:
+        key = (ident, sid)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._memo[key] = self._decide(ident, sid)
+        return hit
+
+    def classify(self, commits: Iterable[dict], sid: int) -> List[bool]:
+        """Decision for every commit of a page (REST objects or GraphQL nodes), in order."""
+        return [self.belongs(identity(c), sid) for c in commits]
+
+    def selector(self, sid: int) -> Callable[[List[dict]], List[dict]]:
+        """A page filter keeping only the commits attributed to student sid."""
+
+        def select(page: List[dict]) -> List[dict]:
+            return [c for c, keep in zip(page, self.classify(page, sid)) if keep]
+
+        return select
+
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Compare GitHub call throughput: one process per call vs the pooled client.
+
+Against the local stub (default) the "before" column spawns one Python
+process per call that opens a fresh connection, which approximates the cost
+of forking `gh api` without needing gh installed. With --target github both
+columns hit api.github.com/rate_limit (free to call): gh CLI vs pooled HTTP.
+
+    python3 tools/bench_gh_client.py --calls 200 --concurrency 8
+"""
+import argparse
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import gh_client
+import gh_stub
+
+SPAWN_SNIPPET = "import sys, urllib.request; urllib.request.urlopen(sys.argv[1]).read()"
+
+
+def calls_per_sec(fn: Callable[[], object], calls: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fn(), range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark GitHub API calls/sec before and after connection pooling.")
+    ap.add_argument("--target", choices=("stub", "github"), default="stub")
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    if args.target == "stub":
+        server = gh_stub.serve(gh_stub.SyntheticGitHub())
+        base = f"http://127.0.0.1:{server.server_port}"
+        url = f"{base}/rate_limit"
+        before_label = "process per call"
+
+        def before():
+            subprocess.run([sys.executable, "-c", SPAWN_SNIPPET, url], check=True)
+
+        client = gh_client.GitHubClient(gh_client.HttpBackend(token="stub"))
+        path = url
+    else:
+        token = gh_client.token_from_env()
+        if not token:
+            sys.exit("Set GH_TOKEN or GITHUB_TOKEN to benchmark against api.github.com")
+        before_label = "gh api per call"
+        gh = gh_client.GitHubClient(gh_client.GhCliBackend())
+
+        def before():
+            gh.get("/rate_limit")
+
+        client = gh_client.GitHubClient(gh_client.HttpBackend(token))
+        path = "/rate_limit"
+
+    after = calls_per_sec(lambda: client.get(path), args.calls, args.concurrency)
+    baseline = calls_per_sec(before, args.calls, args.concurrency)
+    print(f"target={args.target} calls={args.calls} concurrency={args.concurrency}")
+    print(f"{before_label:>20}: {baseline:8.1f} calls/sec")
+    print(f"{'pooled http client':>20}: {after:8.1f} calls/sec ({after / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
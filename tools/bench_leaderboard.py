@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Benchmark build_from_csv end to end without touching GitHub.
+
+By default each size gets a synthetic roster (Student i -> user{i}/repo{i})
+and runs against a local gh_stub server started in a subprocess, so the
+stub's own work does not show up in the timings or memory figures. With
+--replay the build instead runs against a fixture recorded with
+`build_leaderboard.py --record`, using the CSV the fixture was recorded from.
+
+Reports wall time (best of --repeat runs), API calls per rate-limit bucket
+and peak traced Python memory (measured in a separate run, since tracemalloc
+slows everything down).
+
+    python3 tools/bench_leaderboard.py --sizes 10,100,1000,10000
+    python3 tools/bench_leaderboard.py --collector graphql --latency 0.02
+    python3 tools/bench_leaderboard.py --replay .cache/run.jsonl.gz --csv data/students.csv --latency 0.05
+"""
+import argparse
+import csv
+import datetime as dt
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+import build_leaderboard
+import gh_client
+import gh_replay
+import rate_limit
+
+DEFAULT_SIZES = "10,100,1000,10000"
+UNLIMITED = str(10 ** 9)
+
+
+class CountingBackend:
+    """Counts requests per rate-limit bucket on their way to another backend."""
+
+    def __init__(self, inner):
+        self.name = inner.name
+        self.inner = inner
+        self.calls: Dict[str, int] = {"core": 0, "search": 0, "graphql": 0}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers, body):
+        bucket = rate_limit.bucket_for(url, gh_client.graphql_url())
+        with self._lock:
+            self.calls[bucket] += 1
+        return self.inner.request(method, url, headers, body)
+
+
+def synthetic_csv(path: str, students: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Name", "App URL", "Github URL"])
+        for i in range(students):
+            w.writerow([f"Student {i}", f"https://app{i}.bolt.host", f"https://github.com/user{i}/repo{i}"])
+
+
+def start_stub(latency: float) -> subprocess.Popen:
+    """Run gh_stub on a free port with rate limits lifted; sets GITHUB_API_URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cmd = [sys.executable, os.path.join(os.path.dirname(__file__), "gh_stub.py"), "--port", str(port)]
+    cmd += ["--latency", str(latency), "--core-limit", UNLIMITED, "--search-limit", UNLIMITED, "--graphql-limit", UNLIMITED]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base}/rate_limit").read()
+            break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        proc.kill()
+        sys.exit("gh_stub did not start")
+    os.environ["GITHUB_API_URL"] = base
+    os.environ.pop("GITHUB_GRAPHQL_URL", None)
+    return proc
+
+
+def run_once(csv_path: str, make_backend: Callable[[], object], args, now: Optional[dt.datetime], trace: bool) -> dict:
+    counter = CountingBackend(make_backend())
+    gh_client.set_client(gh_client.GitHubClient(counter))
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    data = build_leaderboard.build_from_csv(
+        csv_path,
+        subdomains_path=os.devnull,
+        concurrency=args.concurrency,
+        collector=args.collector,
+        batch_size=args.batch_size,
+        now=now,
+    )
+    wall = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"wall": wall, "calls": dict(counter.calls), "peak": peak, "students": len(data["students"])}
+
+
+def bench(students: int, csv_path: str, make_backend: Callable[[], object], args, now: Optional[dt.datetime]) -> dict:
+    runs = [run_once(csv_path, make_backend, args, now, trace=False) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda r: r["wall"])
+    peak = run_once(csv_path, make_backend, args, now, trace=True)["peak"] if args.memory else 0
+    return {
+        "rows": students,
+        "collector": args.collector,
+        "wall_s": round(best["wall"], 3),
+        "calls": best["calls"],
+        "total_calls": sum(best["calls"].values()),
+        "peak_mib": round(peak / 2 ** 20, 1),
+    }
+
+
+def print_table(results: List[dict]) -> None:
+    print(f"{'rows':>7} {'collector':>9} {'wall s':>9} {'calls':>8} {'core':>8} {'search':>7} {'graphql':>7} {'calls/row':>9} {'peak MiB':>9}")
+    for r in results:
+        c = r["calls"]
+        per_row = r["total_calls"] / r["rows"] if r["rows"] else 0
+        print(
+            f"{r['rows']:>7} {r['collector']:>9} {r['wall_s']:>9.3f} {r['total_calls']:>8} {c['core']:>8} "
+            f"{c['search']:>7} {c['graphql']:>7} {per_row:>9.2f} {r['peak_mib']:>9.1f}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark build_from_csv against a synthetic stub or a recorded fixture.")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Synthetic roster sizes (default {DEFAULT_SIZES})")
+    ap.add_argument("--replay", help="Fixture archive from build_leaderboard.py --record (requires --csv)")
+    ap.add_argument("--csv", help="CSV the fixture was recorded from")
+    ap.add_argument("--latency", type=float, default=0.0, help="Seconds of artificial latency per request")
+    ap.add_argument("--collector", choices=build_leaderboard.COLLECTORS, default="rest")
+    ap.add_argument("--batch-size", type=int, default=build_leaderboard.GRAPHQL_BATCH_SIZE)
+    ap.add_argument("--concurrency", type=int, default=build_leaderboard.DEFAULT_CONCURRENCY)
+    ap.add_argument("--repeat", type=int, default=1, help="Timed runs per size; the fastest is reported (default 1)")
+    ap.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the extra tracemalloc run")
+    ap.add_argument("--json", help="Also write the results to this JSON file")
+    args = ap.parse_args()
+
+    results = []
+    if args.replay:
+        if not args.csv:
+            ap.error("--replay needs the --csv it was recorded from")
+        fixture = gh_replay.load(args.replay)
+        with open(args.csv, newline="", encoding="utf-8") as f:
+            rows = sum(1 for _ in csv.DictReader(f))
+        results.append(bench(rows, args.csv, lambda: gh_replay.ReplayBackend(fixture, latency=args.latency), args, fixture.now))
+    else:
+        stub = start_stub(args.latency)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+                    path = os.path.join(tmp, f"students-{n}.csv")
+                    synthetic_csv(path, n)
+                    results.append(bench(n, path, lambda: gh_client.HttpBackend(token="stub"), args, None))
+                    print(f"{n} rows: {results[-1]['wall_s']:.3f}s", file=sys.stderr)
+        finally:
+            stub.kill()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,26 @@
 #!/usr/bin/env python3
 import argparse
-import csv
 import datetime as dt
-import json
 import os
-import re
-import subprocess
+import sqlite3
 import sys
-from typing import Dict, List, Optional, Tuple
+import urllib.parse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
-
-def sh(cmd: list, input: Optional[str] = None, env: Optional[dict] = None) -> Tuple[int, str, str]:
-    # If env is provided, merge with existing environment
-    run_env = None
-    if env:
-        run_env = os.environ.copy()
-        run_env.update(env)
-    p = subprocess.run(cmd, input=input, text=True, capture_output=True, env=run_env)
-    return p.returncode, p.stdout, p.stderr
-
-
-def parse_csv(csv_path: str) -> List[dict]:
-    rows: List[dict] = []
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            rows.append(r)
-    return rows
-
-
-def normalize_repo(url: str) -> Optional[Tuple[str, str]]:
-    if not url:
-        return None
-    url = url.strip()
-    if not url:
-        return None
-    if "://" in url:
-        m = re.search(r"github\.com/([^/]+)/([^/#?]+)", url, re.I)
-        if not m:
-            return None
-        owner, repo = m.group(1), m.group(2)
-    else:
-        parts = url.split("/")
-        if len(parts) != 2:
-            return None
-        owner, repo = parts
-    if repo.endswith(".git"):
-        repo = repo[:-4]
-    return owner, repo
+import attribution
+import commit_store
+import discovery
+import gh_client
+import gh_replay
+import history
+import publish
+import ranking
+import roster
+import scoring
+import subdomain_index
+import timing
 
 
 def iso(dt_obj: dt.datetime) -> str:
@@ -61,43 +34,199 @@ def iso(dt_obj: dt.datetime) -> str:
 VERBOSE = os.getenv("LEADERBOARD_VERBOSE") == "1"
 
 
-def gh_json(args: list) -> Optional[object]:
-    # GitHub CLI automatically uses GH_TOKEN or GITHUB_TOKEN from environment
-    # Just pass the environment through
-    code, out, err = sh(["gh", "api", *args])
-    if code != 0:
-        if VERBOSE and err:
-            print(f"Warning: GitHub API call failed: {err}", file=sys.stderr)
+def gh_json(path: str, params: Optional[Dict[str, object]] = None) -> Optional[object]:
+    # Token comes from GH_TOKEN or GITHUB_TOKEN (see gh_client)
+    resp = gh_client.client().get(path, params)
+    if not resp.ok:
+        if VERBOSE:
+            print(f"Warning: GitHub API call failed: {resp.status} {resp.text()}", file=sys.stderr)
         return None
-    try:
-        return json.loads(out)
-    except Exception as e:
+    data = resp.json()
+    if data is None and VERBOSE:
+        print(f"Warning: Failed to parse JSON from {path}", file=sys.stderr)
+    return data
+
+
+def gh_graphql(query: str, variables: Dict[str, object]) -> Optional[dict]:
+    resp = gh_client.client().graphql(query, variables)
+    data = resp.json()
+    if not resp.ok or not isinstance(data, dict):
         if VERBOSE:
-            print(f"Warning: Failed to parse JSON: {e}", file=sys.stderr)
+            print(f"Warning: GraphQL call failed: {resp.status} {resp.text()}", file=sys.stderr)
+        return None
+    return data
+
+
+CACHE_BUCKET = dt.timedelta(days=7)
+
+
+def _cache_friendly_since(since_iso: str) -> str:
+    """Round a since timestamp down to a fixed 7-day bucket.
+
+    The window start moves every run, which would give each daily request a new
+    URL and defeat the ETag cache. Asking for a slightly wider, bucket-aligned
+    range keeps the URL stable for a week; the exact window is applied locally.
+    """
+    since = dt.datetime.strptime(since_iso, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc)
+    epoch = dt.datetime(1970, 1, 5, tzinfo=dt.timezone.utc)  # a Monday
+    return iso(since - (since - epoch) % CACHE_BUCKET)
+
+
+PAGE_PREFETCH = 4
+
+
+def _committed(c: dict) -> str:
+    return ((c.get("commit") or {}).get("committer") or {}).get("date") or ""
+
+
+class FetchError(Exception):
+    """A listing could not be fetched completely (a page failed part-way)."""
+
+
+def failed(reason: str) -> Dict:
+    """Raw data for a repo whose fetch failed; scored as skipped, never stored."""
+    return {"failed": reason}
+
+
+def _commit_page(path: str, params: Optional[Dict[str, object]] = None) -> Tuple[List[dict], Dict[str, str]]:
+    """Fetch one page of a commit listing; returns (commits, Link relations).
+
+    Raises FetchError when the page cannot be read, so a failure is never
+    mistaken for the end of the listing.
+    """
+    resp = gh_client.client().get(path, params)
+    if resp.status == 409:
+        # Empty repository: there is no history to list
+        return [], {}
+    data = resp.json()
+    if not resp.ok or not isinstance(data, list):
+        raise FetchError(f"commit page {path} failed: {resp.status} {resp.text()[:200]}")
+    return data, gh_client.parse_link_header(resp.headers.get("link"))
+
+
+def _page_url(url: str, n: int) -> str:
+    parts = urllib.parse.urlsplit(url)
+    query = dict(urllib.parse.parse_qsl(parts.query))
+    query["page"] = str(n)
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def _page_number(url: Optional[str]) -> Optional[int]:
+    if not url:
         return None
+    page = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query)).get("page")
+    return int(page) if page and page.isdigit() else None
+
 
+def iter_commit_pages(
+    owner: str,
+    repo: str,
+    since_iso: str,
+    author: Optional[str] = None,
+    page_pool: Optional[ThreadPoolExecutor] = None,
+) -> Iterator[List[dict]]:
+    """Yield the repo's commits since since_iso one page (up to 100) at a time.
 
-def commits_since(owner: str, repo: str, since_iso: str, author: Optional[str]) -> List[dict]:
-    # Build query string for GitHub API
-    query_params = f"since={since_iso}&per_page=100"
+    Follows `Link: rel="next"` to the end, so busy repos are not truncated.
+    When the first page advertises rel="last" and a page_pool is given, the
+    remaining pages are fetched a few at a time in parallel but still yielded
+    in order. Only one page per in-flight request is held in memory.
+    Raises FetchError if any page fails.
+    """
+    cached = gh_client.client().cache is not None
+    params: Dict[str, object] = {
+        "since": _cache_friendly_since(since_iso) if cached else since_iso,
+        "per_page": 100,
+    }
     if author:
-        query_params += f"&author={author}"
-    args = [f"/repos/{owner}/{repo}/commits?{query_params}"]
-    data = gh_json(args)
-    if not isinstance(data, list):
-        return []
-    return data
+        params["author"] = author
+
+    def fresh(page: List[dict]) -> Optional[List[dict]]:
+        # With the cache a wider, bucket-aligned range was requested: trim it
+        # (`since` filters on the committer date) and signal a stop once a
+        # whole page predates the window, since the rest will too.
+        if not cached:
+            return page
+        kept = [c for c in page if _committed(c) >= since_iso]
+        return kept if kept or not page else None
+
+    page, links = _commit_page(f"/repos/{owner}/{repo}/commits", params)
+    while True:
+        kept = fresh(page)
+        if kept is None:
+            return
+        if kept:
+            yield kept
+        next_url = links.get("next")
+        if not next_url:
+            return
+        last = _page_number(links.get("last"))
+        if page_pool is not None and last:
+            break
+        page, links = _commit_page(next_url)
+
+    pending: Deque[Future] = deque()
+    n = _page_number(next_url) or 2
+    while n <= last or pending:
+        while n <= last and len(pending) < PAGE_PREFETCH:
+            pending.append(page_pool.submit(_commit_page, _page_url(next_url, n)))
+            n += 1
+        try:
+            page, _links = pending.popleft().result()
+        except FetchError:
+            for f in pending:
+                f.cancel()
+            raise
+        kept = fresh(page)
+        if kept is None or not page:
+            for f in pending:
+                f.cancel()
+            return
+        yield kept
+
+
+def commits_since(
+    owner: str,
+    repo: str,
+    since_iso: str,
+    author: Optional[str],
+    page_pool: Optional[ThreadPoolExecutor] = None,
+) -> List[dict]:
+    """All commits since since_iso as one list (see iter_commit_pages to stream)."""
+    return [c for page in iter_commit_pages(owner, repo, since_iso, author, page_pool) for c in page]
 
 
 def search_total(q: str) -> int:
-    data = gh_json(["/search/issues", "-F", f"q={q}"])
+    data = gh_json("/search/issues", {"q": q})
     if not isinstance(data, dict):
-        return 0
+        raise FetchError(f"search {q!r} failed")
     return int(data.get("total_count", 0))
 
 
+def search_dates(q: str, merged: bool = False) -> Tuple[int, Optional[List[str]]]:
+    """Total matching PRs plus their created (or merged) timestamps.
+
+    The timestamps are None when the results did not fit on one page.
+    Raises FetchError when the search fails.
+    """
+    data = gh_json("/search/issues", {"q": q, "per_page": 100})
+    if not isinstance(data, dict):
+        raise FetchError(f"search {q!r} failed")
+    items = [i for i in data.get("items") or [] if isinstance(i, dict)]
+    total = int(data.get("total_count", 0))
+    if total > len(items):
+        return total, None
+    if merged:
+        return total, [(i.get("pull_request") or {}).get("merged_at") or "" for i in items]
+    return total, [i.get("created_at") or "" for i in items]
+
+
 def commits_all_time(owner: str, repo: str) -> int:
-    """Return total commits on the default branch (all-time) via GraphQL."""
+    """Return total commits on the default branch (all-time) via GraphQL.
+
+    A repo without a default branch (nothing pushed yet) has 0; raises
+    FetchError when the query fails.
+    """
     query = (
         "query($owner:String!,$repo:String!){"
         "  repository(owner:$owner,name:$repo){"
@@ -109,38 +238,22 @@ def commits_all_time(owner: str, repo: str) -> int:
         "  }"
         "}"
     )
-    data = gh_json(["graphql", "-F", f"owner={owner}", "-F", f"repo={repo}", "-f", f"query={query}"])
-    try:
-        return int(
-            data["data"]["repository"]["defaultBranchRef"]["target"]["history"]["totalCount"]
-        )
-    except Exception:
+    data = gh_graphql(query, {"owner": owner, "repo": repo})
+    repository = _dig(data, "data", "repository")
+    if not isinstance(repository, dict):
+        raise FetchError(f"all-time commit count of {owner}/{repo} failed")
+    if repository.get("defaultBranchRef") is None:
         return 0
+    total = _dig(repository, "defaultBranchRef", "target", "history", "totalCount")
+    if total is None:
+        raise FetchError(f"all-time commit count of {owner}/{repo} failed")
+    return int(total)
 
 
 def owner_is_org(owner: str) -> bool:
     """Return True if the GitHub owner is an Organization account."""
-    code, out, err = sh([
-        "gh",
-        "api",
-        f"/users/{owner}",
-        "--jq",
-        ".type",
-    ])
-    if code != 0:
-        return False
-    return out.strip() == "Organization"
-
-
-def pick_login(row: dict, owner: str) -> str:
-    """Choose the GitHub username used to attribute work.
-    Priority: explicit CSV column 'GitHub Username' -> repo owner.
-    """
-    for key in ("GitHub Username", "github username", "github_user", "username"):
-        v = row.get(key)
-        if v and v.strip():
-            return v.strip()
-    return owner
+    data = gh_json(f"/users/{owner}")
+    return isinstance(data, dict) and data.get("type") == "Organization"
 
 
 def commit_belongs_to_student(commit: dict, login: str, full_name: str) -> bool:
@@ -148,235 +261,646 @@ def commit_belongs_to_student(commit: dict, login: str, full_name: str) -> bool:
     - Match author.login or committer.login == login
     - Match noreply email localpart containing login
     - Weak fallback: both first and last name substrings appear in author/committer names
+    Builds with --attribute use one shared attribution.Attribution instead.
     """
-    login_l = (login or "").lower()
-    # Direct login matches
-    auth = (commit.get("author") or {})
-    comm = (commit.get("committer") or {})
-    if (auth.get("login") or "").lower() == login_l:
-        return True
-    if (comm.get("login") or "").lower() == login_l:
-        return True
-
-    # Email/noreply patterns
-    ca = (commit.get("commit") or {}).get("author", {}) or {}
-    cc = (commit.get("commit") or {}).get("committer", {}) or {}
-    emails = [str(ca.get("email") or "").lower(), str(cc.get("email") or "").lower()]
-
-    def noreply_match(e: str) -> bool:
-        if not e:
-            return False
-        if not e.endswith("@users.noreply.github.com"):
-            return False
-        local = e.split("@", 1)[0]
-        return login_l in local
-
-    if any(noreply_match(e) for e in emails):
-        return True
-
-    # Name fallback: require at least two tokens to match
-    name_field = (str(ca.get("name") or "") + " " + str(cc.get("name") or "")).lower()
-    tokens = [t for t in re.split(r"[ ,]+", (full_name or "").lower()) if t]
-    if len(tokens) >= 2:
-        hits = sum(1 for t in tokens if t and t in name_field)
-        if hits >= 2:
-            return True
-    return False
+    return attribution.Attribution([(login, full_name)]).belongs(attribution.rest_identity(commit), 0)
 
 
 def has_repo_access(owner: str, repo: str) -> bool:
     """Return True if the current token can view the repo (public or collaborator)."""
-    code, out, err = sh([
-        "gh",
-        "repo",
-        "view",
-        f"{owner}/{repo}",
-        "--json",
-        "name",
-        "-q",
-        ".name",
-    ])
-    return code == 0 and (out.strip() != "")
-
-
-def load_subdomains(subdomains_path: str = "subdomains.json") -> Dict[str, str]:
-    """Load subdomain mappings from JSON file"""
-    try:
-        with open(subdomains_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("subdomains", {})
-    except Exception:
-        return {}
+    data = gh_json(f"/repos/{owner}/{repo}")
+    return isinstance(data, dict) and bool(data.get("name"))
+
 
+def _gather(pool: ThreadPoolExecutor, *calls: Callable[[], Any]) -> List[Any]:
+    """Run zero-argument callables on the pool and return their results in order."""
+    futures = [pool.submit(c) for c in calls]
+    return [f.result() for f in futures]
+
+
+def commit_records(commits: Iterable[dict]) -> List[Tuple[str, str, str]]:
+    """(sha, committer date, author date) for REST commit objects."""
+    out = []
+    for c in commits:
+        info = c.get("commit") or {}
+        out.append(
+            (
+                c.get("sha") or "",
+                (info.get("committer") or {}).get("date") or "",
+                (info.get("author") or {}).get("date") or "",
+            )
+        )
+    return out
 
-def extract_bolt_project_id(app_url: str) -> Optional[str]:
-    """Extract bolt.host project ID from URL"""
-    if not app_url:
+
+# Committer dates come from the committer's clock, so allow for some skew
+# before trusting pushed_at to rule out new commits.
+PUSH_SLACK = dt.timedelta(days=1)
+
+
+def collect_rest(
+    owner: str,
+    repo: str,
+    login: str,
+    since7: dt.datetime,
+    fetch_since: dt.datetime,
+    call_pool: ThreadPoolExecutor,
+    page_pool: Optional[ThreadPoolExecutor] = None,
+    select: Optional[Callable[[List[dict]], List[dict]]] = None,
+    access: Optional[bool] = None,
+    pushed_at: Optional[str] = None,
+) -> Optional[Dict]:
+    """Collect one repo's raw activity with the REST/search endpoints.
+
+    Returns None when the repo is missing or not visible to the token, and
+    a failed() marker when the commit listing broke off part-way or a PR
+    search or the all-time count failed.
+    Every GitHub call is dispatched through call_pool so the total number of
+    in-flight requests stays bounded regardless of how many repos run at once.
+    Commits are listed once, from fetch_since (the widest window, or the
+    commit store's high-water mark), and streamed into compact records.
+    With select (an attribution page filter) only the student's own commits are kept.
+    access and pushed_at come from discovery when known; access=None means probe.
+    """
+    if access is None:
+        (access,) = _gather(call_pool, lambda: has_repo_access(owner, repo))
+    if not access:
         return None
-    app_url = app_url.strip().rstrip("/")
-    # Match patterns like https://project-id.bolt.host or project-id.bolt.host
-    import re
-    match = re.search(r"([a-z0-9-]+)\.bolt\.host", app_url, re.I)
-    if match:
-        return match.group(1)
-    return None
-
-
-def find_subdomain_for_bolt_id(bolt_id: str, subdomains: Dict[str, str]) -> Optional[str]:
-    """Find subdomain name that maps to this bolt project ID"""
-    for subdomain, mapped_id in subdomains.items():
-        # Handle both project IDs and full URLs
-        if mapped_id == bolt_id:
-            return subdomain
-        # Also check if mapped_id contains the bolt_id (for full URLs)
-        if bolt_id in mapped_id:
-            return subdomain
-    return None
-
-
-def build_from_csv(csv_path: str, days_window: int = 7, subdomains_path: str = "subdomains.json") -> Dict:
-    rows = parse_csv(csv_path)
-    subdomains = load_subdomains(subdomains_path)
-    now = dt.datetime.now(dt.timezone.utc)
-    since7 = now - dt.timedelta(days=days_window)
-    since30 = now - dt.timedelta(days=30)
+    # Nothing pushed since the fetch start means no commits to list
+    untouched = bool(pushed_at) and pushed_at < iso(fetch_since - PUSH_SLACK)
 
-    students: List[Dict] = []
-    skipped: List[Dict] = []
-    for r in rows:
-        name = (r.get("Name") or r.get("name") or "").strip()
-        url = (r.get("Github URL") or r.get("github url") or r.get("github") or "").strip()
-        if not url:
-            continue
-        nr = normalize_repo(url)
-        if not nr:
-            continue
-        owner, repo = nr
-        # Skip quietly if no access (private or missing)
-        if not has_repo_access(owner, repo):
-            skipped.append({"name": name or owner, "repo": f"{owner}/{repo}", "reason": "no_access_or_missing"})
-            continue
-        # Pick login (allows CSV override) and attribute commits using heuristics.
-        login = pick_login(r, owner)
+    # PRs opened and merged in last 7 (filter by chosen login)
+    since_date = since7.date().isoformat()
+    q_opened = f"repo:{owner}/{repo} is:pr author:{login} created:>={since_date}"
+    q_merged = f"repo:{owner}/{repo} is:pr author:{login} is:merged merged:>={since_date}"
 
-        # Commits in window(s): remove author filtering, count all repo commits
-        commits7 = commits_since(owner, repo, iso(since7), author=None)
-        commits30 = commits_since(owner, repo, iso(since30), author=None)
+    def commits() -> Iterator[dict]:
+        if untouched:
+            return
+        # List every repo commit; attribution (if any) happens locally, a page at a time
+        for page in iter_commit_pages(owner, repo, iso(fetch_since), author=None, page_pool=page_pool):
+            yield from select(page) if select else page
 
-        # Unique commit days for last 7
-        days7 = set()
-        for c in commits7:
-            try:
-                d = c["commit"]["author"]["date"][:10]
-                days7.add(d)
-            except Exception:
-                pass
-
-        # PRs opened and merged in last 7 (filter by chosen login)
-        since_date = since7.date().isoformat()
-        q_opened = f"repo:{owner}/{repo} is:pr author:{login} created:>={since_date}"
-        q_merged = f"repo:{owner}/{repo} is:pr author:{login} is:merged merged:>={since_date}"
-        pr_opened_7d = search_total(q_opened)
-        pr_merged_7d = search_total(q_merged)
-
-        # Streak (based on last 30 days commit dates)
-        dayset = set()
-        for c in commits30:
-            try:
-                d = c["commit"]["author"]["date"][:10]
-                dayset.add(d)
-            except Exception:
-                pass
-        streak = 0
-        cur = now.date()
-        while True:
-            key = cur.isoformat()
-            if key in dayset:
-                streak += 1
-                cur = cur - dt.timedelta(days=1)
-            else:
-                break
-
-        # Score
-        commits_7d = len(commits7)
-        commit_days_7d = len(days7)
-        score = (
-            commits_7d * 1
-            + commit_days_7d * 2
-            + pr_opened_7d * 3
-            + pr_merged_7d * 5
+    # The calls are independent, so issue them together
+    try:
+        records, (pr_opened_7d, opened_at), (pr_merged_7d, merged_at), all_time = _gather(
+            call_pool,
+            lambda: commit_records(commits()),
+            lambda: search_dates(q_opened),
+            lambda: search_dates(q_merged, merged=True),
+            lambda: commits_all_time(owner, repo),
         )
+    except FetchError as exc:
+        # Partial commits or zeroed counts would score low without any sign of it
+        print(f"Warning: {owner}/{repo}: {exc}", file=sys.stderr)
+        return failed(str(exc))
+    return {
+        "commits": records,
+        "pr_opened_7d": pr_opened_7d,
+        "pr_merged_7d": pr_merged_7d,
+        "pr_opened_at": opened_at,
+        "pr_merged_at": merged_at,
+        "commits_all_time": all_time,
+    }
+
+
+GRAPHQL_BATCH_SIZE = 25
+
+_REPO_FIELDS = """
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          all: history { totalCount }
+          recent: history(first: 100, since: $SINCE) {
+            totalCount
+            nodes { oid authoredDate committedDate $WHO }
+            pageInfo { hasNextPage endCursor }
+          }
+        }
+      }
+    }
+    pullRequests(first: 100, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      nodes { author { login } createdAt mergedAt updatedAt }
+      pageInfo { hasNextPage endCursor }
+    }
+"""
+
+_MORE_HISTORY = """
+query($owner:String!,$repo:String!,$since:GitTimestamp!,$after:String){
+  repository(owner:$owner,name:$repo){
+    defaultBranchRef{ target{ ... on Commit {
+      history(first:100, since:$since, after:$after){
+        nodes { oid authoredDate committedDate $WHO }
+        pageInfo { hasNextPage endCursor }
+      }
+    } } }
+  }
+}
+"""
+
+_MORE_PULLS = """
+query($owner:String!,$repo:String!,$after:String){
+  repository(owner:$owner,name:$repo){
+    pullRequests(first:100, after:$after, orderBy:{field:UPDATED_AT, direction:DESC}){
+      nodes { author { login } createdAt mergedAt updatedAt }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+def _dig(data: object, *keys: str) -> object:
+    for k in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(k)
+    return data
+
+
+def _with_authors(query: str, authors: bool) -> str:
+    """Select commit author/committer identities only when attributing commits."""
+    return query.replace("$WHO", attribution.GRAPHQL_FIELDS if authors else "")
+
+
+def _more_history(owner: str, repo: str, since: str, after: str, authors: bool = False) -> List[dict]:
+    """Fetch the remaining pages of a history the batch query cut off at 100."""
+    nodes: List[dict] = []
+    query = _with_authors(_MORE_HISTORY, authors)
+    while after:
+        data = gh_graphql(query, {"owner": owner, "repo": repo, "since": since, "after": after})
+        if data is None:
+            raise FetchError(f"history page of {owner}/{repo} failed")
+        hist = _dig(data, "data", "repository", "defaultBranchRef", "target", "history") or {}
+        nodes.extend(hist.get("nodes") or [])
+        page = hist.get("pageInfo") or {}
+        after = page.get("endCursor") if page.get("hasNextPage") else None
+    return nodes
+
+
+def _more_pulls(owner: str, repo: str, since_date: str, after: str) -> List[dict]:
+    """Keep paging PRs (newest update first) until they predate the window."""
+    nodes: List[dict] = []
+    while after:
+        data = gh_graphql(_MORE_PULLS, {"owner": owner, "repo": repo, "after": after})
+        if data is None:
+            raise FetchError(f"pull request page of {owner}/{repo} failed")
+        prs = _dig(data, "data", "repository", "pullRequests") or {}
+        batch = prs.get("nodes") or []
+        nodes.extend(batch)
+        page = prs.get("pageInfo") or {}
+        stale = batch and (batch[-1].get("updatedAt") or "")[:10] < since_date
+        after = page.get("endCursor") if page.get("hasNextPage") and not stale else None
+    return nodes
+
+
+def _pr_dates(nodes: List[dict], login: str, since_date: str) -> Tuple[List[str], List[str]]:
+    """Timestamps of PRs by login opened / merged on or after since_date, like the search qualifiers."""
+    login_l = login.lower()
+    opened: List[str] = []
+    merged: List[str] = []
+    for pr in nodes:
+        if ((pr.get("author") or {}).get("login") or "").lower() != login_l:
+            continue
+        if (pr.get("createdAt") or "")[:10] >= since_date:
+            opened.append(pr["createdAt"])
+        if pr.get("mergedAt") and pr["mergedAt"][:10] >= since_date:
+            merged.append(pr["mergedAt"])
+    return opened, merged
 
-        # Badges
-        badges = []
-        if streak >= 7:
-            badges.append("week-warrior")
-        if pr_opened_7d >= 1:
-            badges.append("pr-starter")
-        if pr_merged_7d >= 1:
-            badges.append("merge-master")
-        if commits_7d >= 5:
-            badges.append("commit-cadence")
-
-        # Get App URL and find subdomain
-        app_url = (r.get("App URL") or r.get("app url") or "").strip()
-        bolt_id = extract_bolt_project_id(app_url)
-        subdomain_name = None
-        illinihunt_url = None
-        
-        if bolt_id:
-            # Find subdomain that maps to this bolt project ID
-            subdomain_name = find_subdomain_for_bolt_id(bolt_id, subdomains)
-            if subdomain_name:
-                illinihunt_url = f"https://{subdomain_name}.illinihunt.org"
-        
-        # Normalize bolt URL
-        bolt_url = None
-        if app_url:
-            app_url = app_url.strip().rstrip("/")
-            if "bolt.host" in app_url:
-                if not app_url.startswith("http"):
-                    bolt_url = f"https://{app_url}"
-                else:
-                    bolt_url = app_url
-            elif app_url.startswith("http"):
-                # Full URL (e.g., Vercel)
-                bolt_url = app_url
 
-        students.append(
+def collect_graphql_batch(
+    targets: List[Tuple[str, str, str]],
+    since7: dt.datetime,
+    fetch_since: List[dt.datetime],
+    selects: Optional[List[Callable[[List[dict]], List[dict]]]] = None,
+) -> List[Optional[Dict]]:
+    """Collect raw activity for several (owner, repo, login) targets in one aliased query.
+
+    Produces the same raw shape as collect_rest (None = no access, failed()
+    when a follow-up page broke off), with each
+    target's history starting at its fetch_since entry. PR counts come from
+    each repo's pullRequests connection filtered locally, so the rate-limited
+    search API is not used at all. If the batch request itself fails, the
+    chunk falls back to the REST collector, as does any repo that came back
+    null without a NOT_FOUND error. selects holds one attribution page
+    filter per target when only the students' own commits should count.
+    """
+    if not targets:
+        return []
+    decls = []
+    fields = []
+    variables: Dict[str, object] = {}
+    for i, (owner, repo, _login) in enumerate(targets):
+        decls += [f"$o{i}:String!", f"$n{i}:String!", f"$s{i}:GitTimestamp!"]
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = repo
+        variables[f"s{i}"] = iso(fetch_since[i])
+        body = _with_authors(_REPO_FIELDS, selects is not None).replace("$SINCE", f"$s{i}")
+        fields.append(f"r{i}: repository(owner:$o{i}, name:$n{i}) {{{body}}}")
+    query = f"query({','.join(decls)}){{\n" + "\n".join(fields) + "\n}"
+    data = gh_graphql(query, variables)
+    repos = _dig(data, "data")
+
+    def rest(i: int) -> Optional[Dict]:
+        owner, repo, login = targets[i]
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return collect_rest(owner, repo, login, since7, fetch_since[i], pool, select=selects[i] if selects else None)
+
+    if not isinstance(repos, dict):
+        return [rest(i) for i in range(len(targets))]
+
+    missing = gh_client.not_found_paths(data)
+    since_date = since7.date().isoformat()
+    out: List[Optional[Dict]] = []
+    for i, (owner, repo, login) in enumerate(targets):
+        node = repos.get(f"r{i}")
+        if not isinstance(node, dict):
+            # Only NOT_FOUND means no access; other nulls were errors, so ask REST
+            out.append(None if (f"r{i}",) in missing else rest(i))
+            continue
+        target = _dig(node, "defaultBranchRef", "target") or {}
+        recent = target.get("recent") or {}
+        history = list(recent.get("nodes") or [])
+        page = recent.get("pageInfo") or {}
+        prs = node.get("pullRequests") or {}
+        pr_nodes = list(prs.get("nodes") or [])
+        pr_page = prs.get("pageInfo") or {}
+        try:
+            if page.get("hasNextPage"):
+                history += _more_history(owner, repo, variables[f"s{i}"], page.get("endCursor"), selects is not None)
+            if pr_page.get("hasNextPage") and pr_nodes and (pr_nodes[-1].get("updatedAt") or "")[:10] >= since_date:
+                pr_nodes += _more_pulls(owner, repo, since_date, pr_page.get("endCursor"))
+        except FetchError as exc:
+            print(f"Warning: {exc}", file=sys.stderr)
+            out.append(failed(str(exc)))
+            continue
+        if selects:
+            history = selects[i](history)
+        opened, merged = _pr_dates(pr_nodes, login, since_date)
+        out.append(
             {
-                "name": name or owner,
-                "repo": f"{owner}/{repo}",
-                "owner": owner,
-                "metrics": {
-                    "commits_7d": commits_7d,
-                    "commit_days_7d": commit_days_7d,
-                    "commits_30d": len(commits30),
-                    "commits_all_time": commits_all_time(owner, repo),
-                    "pr_opened_7d": pr_opened_7d,
-                    "pr_merged_7d": pr_merged_7d,
-                    "streak": streak,
-                    "score": score,
-                },
-                "badges": badges,
-                "urls": {
-                    "bolt": bolt_url,
-                    "illinihunt": illinihunt_url,
-                },
+                "commits": [(h.get("oid") or "", h.get("committedDate") or "", h.get("authoredDate") or "") for h in history],
+                "pr_opened_7d": len(opened),
+                "pr_merged_7d": len(merged),
+                "pr_opened_at": opened,
+                "pr_merged_at": merged,
+                "commits_all_time": int((target.get("all") or {}).get("totalCount") or 0),
             }
         )
+    return out
+
+
+def unchanged_snapshot(raw: Dict, pushed_at: Optional[str], login: str, since_date: str) -> Optional[Dict]:
+    """What the next incremental run needs to reuse raw while the repo stays idle."""
+    if not pushed_at or raw.get("pr_opened_at") is None or raw.get("pr_merged_at") is None:
+        return None
+    return {
+        "pushed_at": pushed_at,
+        "login": login.lower(),
+        "pr_since": since_date,
+        "pr_opened": raw["pr_opened_at"],
+        "pr_merged": raw["pr_merged_at"],
+        "all_time": raw["commits_all_time"],
+    }
+
+
+def reuse_unchanged(
+    store: commit_store.CommitStore, key: str, pushed_at: Optional[str], login: str, since_date: str
+) -> Optional[Dict]:
+    """Raw data for a repo nobody has pushed to since the last run, re-aged to since_date.
+
+    Commits come from the store and PR timestamps from the snapshot, so only
+    time-dependent counts change. Returns None when the repo must be fetched.
+    (A PR opened from a fork does not move pushed_at, so it shows up once the
+    repo is next pushed to, at the latest when the PR is merged.)
+    """
+    snap = store.snapshot(key)
+    if not snap or not pushed_at or snap.get("pushed_at") != pushed_at:
+        return None
+    if snap.get("login") != login.lower() or since_date < (snap.get("pr_since") or "9999"):
+        return None
+    opened = [d for d in snap.get("pr_opened") or [] if d[:10] >= since_date]
+    merged = [d for d in snap.get("pr_merged") or [] if d[:10] >= since_date]
+    return {
+        "commits": store.records(key),
+        "pr_opened_7d": len(opened),
+        "pr_merged_7d": len(merged),
+        "pr_opened_at": opened,
+        "pr_merged_at": merged,
+        "commits_all_time": int(snap.get("all_time") or 0),
+    }
+
+
+def reaged(raw: Dict, since_date: str) -> Dict:
+    """raw with its PR counts recomputed for a later window start (when the timestamps are known)."""
+    out = dict(raw)
+    if raw.get("pr_opened_at") is not None:
+        out["pr_opened_at"] = [d for d in raw["pr_opened_at"] if d[:10] >= since_date]
+        out["pr_opened_7d"] = len(out["pr_opened_at"])
+    if raw.get("pr_merged_at") is not None:
+        out["pr_merged_at"] = [d for d in raw["pr_merged_at"] if d[:10] >= since_date]
+        out["pr_merged_7d"] = len(out["pr_merged_at"])
+    return out
+
+
+def activity_metrics(
+    raw: Dict,
+    now: dt.datetime,
+    since7: dt.datetime,
+    since30: dt.datetime,
+    extra_windows: Iterable[int] = (),
+) -> Dict:
+    """Derive the metrics dict (everything but the score) from one repo's raw activity.
+
+    Every window-based metric comes from one CommitIndex over the commits
+    fetched for the widest window. extra_windows (days) add
+    commits_<N>d / commit_days_<N>d fields counted over exactly N days. The
+    *_7d fields cover since7 (the --days window), so a 7-day extra window is
+    only allowed when since7 is 7 days back.
+    """
+    index = commit_store.CommitIndex(raw["commits"])
+
+    # Unique commit days for last 7
+    days7 = index.days(since7)
+
+    # Streak (based on last 30 days commit dates)
+    dayset = index.days(since30)
+    streak = 0
+    cur = now.date()
+    while True:
+        key = cur.isoformat()
+        if key in dayset:
+            streak += 1
+            cur = cur - dt.timedelta(days=1)
+        else:
+            break
+
+    metrics = {
+        "commits_7d": index.count(since7),
+        "commit_days_7d": len(days7),
+        "commits_30d": index.count(since30),
+        "commits_all_time": raw["commits_all_time"],
+        "pr_opened_7d": raw["pr_opened_7d"],
+        "pr_merged_7d": raw["pr_merged_7d"],
+        "streak": streak,
+    }
+    for days in extra_windows:
+        since = now - dt.timedelta(days=days)
+        if days == 7 and since != since7:
+            raise ValueError("a 7-day window clashes with commits_7d, which covers the --days window")
+        metrics[f"commits_{days}d"] = index.count(since)
+        metrics[f"commit_days_{days}d"] = len(index.days(since))
+    return metrics
+
+
+def compute_metrics(
+    raw: Dict,
+    now: dt.datetime,
+    since7: dt.datetime,
+    since30: dt.datetime,
+    extra_windows: Iterable[int] = (),
+    profile: scoring.Profile = scoring.DEFAULT,
+) -> Tuple[Dict, List[str]]:
+    """Metrics (with the profile's score) and badges for one repo; builds score whole chunks at once."""
+    metrics = activity_metrics(raw, now, since7, since30, extra_windows)
+    return metrics, profile.apply([metrics])[0]
+
+
+def app_urls(app_url: str, subdomains: subdomain_index.SubdomainIndex) -> Dict[str, Optional[str]]:
+    """Resolve the bolt/app URL and illinihunt subdomain URL for a CSV row's App URL."""
+    # Find the subdomain serving this app (bolt project or other host)
+    app_url = (app_url or "").strip()
+    subdomain_name = subdomains.lookup(app_url) if app_url else None
+    illinihunt_url = f"https://{subdomain_name}.illinihunt.org" if subdomain_name else None
+
+    # Normalize bolt URL
+    bolt_url = None
+    if app_url:
+        app_url = app_url.strip().rstrip("/")
+        if "bolt.host" in app_url:
+            if not app_url.startswith("http"):
+                bolt_url = f"https://{app_url}"
+            else:
+                bolt_url = app_url
+        elif app_url.startswith("http"):
+            # Full URL (e.g., Vercel)
+            bolt_url = app_url
+    return {"bolt": bolt_url, "illinihunt": illinihunt_url}
+
+
+DEFAULT_CONCURRENCY = 8
+COLLECTORS = ("rest", "graphql")
+# Roster rows collected and scored per round
+CHUNK_ROWS = 500
+
+
+def build_from_csv(
+    csv_path: str,
+    days_window: int = 7,
+    subdomains_path: str = "subdomains.json",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    collector: str = "rest",
+    batch_size: int = GRAPHQL_BATCH_SIZE,
+    state_path: Optional[str] = None,
+    windows: Iterable[int] = (),
+    now: Optional[dt.datetime] = None,
+    attribute: bool = False,
+    discover: bool = True,
+    raw_sink: Optional[Callable[[roster.Target, Dict, Dict], None]] = None,
+    profile: scoring.Profile = scoring.DEFAULT,
+    retain_days: Optional[int] = None,
+) -> Dict:
+    """Collect, score and rank every roster row (score and badges from profile).
+
+    raw_sink(target, raw, student), if given, sees each scored student together
+    with the raw activity it was scored from (the long-running service keeps them).
+    """
+    with timing.span("load", "phase"):
+        subdomains = subdomain_index.SubdomainIndex.load(subdomains_path)
+    # Replays pin the reference time so every window matches the recording
+    now = now or dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    since7 = now - dt.timedelta(days=days_window)
+    since_date = since7.date().isoformat()
+    windows = sorted(set(windows))
+    # One commit listing per repo covers every window
+    horizon = now - dt.timedelta(days=max([30, days_window, *windows]))
+
+    # Incremental mode: only ask for commits past each repo's high-water mark
+    store = commit_store.CommitStore.load(state_path) if state_path else None
+
+    # Repos are fanned out on one pool and their individual GitHub calls on another,
+    # so a repo worker blocking on its calls can never starve the calls themselves.
+    # executor.map yields in CSV order, which keeps the output deterministic.
+    workers = max(1, concurrency)
+    size = max(1, batch_size)
+
+    def pool(prefix: str) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix, initializer=timing.thread_started)
+
+    # Learn access and last-push times for every repo up front. The REST collector
+    # uses them instead of probing; incremental builds use pushed_at to spot idle repos.
+    # (GraphQL batches learn access from their own query.)
+    discovering = discover and (collector != "graphql" or store is not None)
+    viewer_repos: Optional[Dict[str, Dict]] = None
+
+    def collect(chunk: List[roster.Target]) -> List[Optional[Dict]]:
+        """Raw data for one chunk of roster rows (None = no access)."""
+        nonlocal viewer_repos
+        # With attribute, only each student's own commits count
+        selects: Optional[List[Callable[[List[dict]], List[dict]]]] = None
+        if attribute:
+            index = attribution.Attribution((t.login, t.name) for t in chunk)
+            selects = [index.selector(i) for i in range(len(chunk))]
+        keys = [f"{t.owner}/{t.repo}".lower() for t in chunk]
+        if attribute:
+            # Attributed histories differ per student, so they are stored separately
+            keys = [f"{key}#{t.login.lower()}" for key, t in zip(keys, chunk)]
+        fetch_since = [store.fetch_since(k, horizon) if store else horizon for k in keys]
+
+        known: Dict[str, Optional[Dict]] = {}
+        if discovering:
+            with timing.span("discover", "phase"):
+                if viewer_repos is None:
+                    viewer_repos = discovery.list_viewer_repos()
+                known = discovery.discover([(t.owner, t.repo) for t in chunk], concurrency=workers, listed=viewer_repos)
+
+        def info(i: int) -> Optional[Dict]:
+            return known.get(discovery.repo_key(chunk[i].owner, chunk[i].repo))
+
+        def batch(part: List[int]) -> List[Optional[Dict]]:
+            first = chunk[part[0]]
+            with timing.span(f"batch {first.owner}/{first.repo} +{len(part) - 1}", "batch", repos=len(part)):
+                return collect_graphql_batch(
+                    [(chunk[i].owner, chunk[i].repo, chunk[i].login) for i in part],
+                    since7,
+                    [fetch_since[i] for i in part],
+                    [selects[i] for i in part] if selects else None,
+                )
+
+        def one_repo(i: int) -> Optional[Dict]:
+            t = chunk[i]
+            key = discovery.repo_key(t.owner, t.repo)
+            with timing.span(key, "repo"):
+                return collect_rest(
+                    t.owner,
+                    t.repo,
+                    t.login,
+                    since7,
+                    fetch_since[i],
+                    call_pool,
+                    page_pool,
+                    select=selects[i] if selects else None,
+                    access=(known[key] is not None) if key in known else None,
+                    pushed_at=(info(i) or {}).get("pushed_at"),
+                )
 
-    # Leaderboard
-    students.sort(key=lambda s: (-s["metrics"]["score"], -s["metrics"]["streak"], s["name"].lower()))
-    leaderboard = []
-    rank = 0
-    last_score = None
-    for s in students:
-        sc = s["metrics"]["score"]
-        if sc != last_score:
-            rank = len(leaderboard) + 1
-            last_score = sc
-        leaderboard.append({"name": s["name"], "repo": s["repo"], "score": sc, "rank": rank})
+        raws: List[Optional[Dict]] = [None] * len(chunk)
+        todo = []
+        reused = set()
+        for i, t in enumerate(chunk):
+            key = discovery.repo_key(t.owner, t.repo)
+            if key in known and known[key] is None:
+                continue  # missing or no access
+            if store is not None:
+                raws[i] = reuse_unchanged(store, keys[i], (info(i) or {}).get("pushed_at"), t.login, since_date)
+                if raws[i] is not None:
+                    reused.add(i)
+                    continue
+            todo.append(i)
+
+        with timing.span("collect", "phase", collector=collector, repos=len(todo), reused=len(reused)):
+            if collector == "graphql":
+                parts = [todo[j:j + size] for j in range(0, len(todo), size)]
+                collected = [raw for results in repo_pool.map(batch, parts) for raw in results]
+            else:
+                collected = list(repo_pool.map(one_repo, todo))
+        for i, raw in zip(todo, collected):
+            raws[i] = raw
+
+        if store is not None:
+            # Fold the new commits in and derive every window from the store
+            with timing.span("store", "phase"):
+                for i, (key, raw) in enumerate(zip(keys, raws)):
+                    if raw is None or raw.get("failed"):
+                        # A failed fetch must not move high_water or leave a snapshot to reuse
+                        continue
+                    if i not in reused:
+                        store.merge(key, raw["commits"])
+                        raw["commits"] = store.records(key)
+                        pushed_at = (info(i) or {}).get("pushed_at")
+                        store.set_snapshot(key, unchanged_snapshot(raw, pushed_at, chunk[i].login, since_date))
+                    # What --from-cache needs to rescore this repo later without GitHub
+                    store.record_raw(key, raw, now, fetch_since[i], since_date)
+        return raws
+
+    students: List[Dict] = []
+    skipped: List[Dict] = []
+    # Roster rows stream in and are collected and scored a chunk at a time, so
+    # raw commit data is only ever held for one chunk.
+    # Extra commit pages go to a third pool for the same reason.
+    with pool("repo") as repo_pool, pool("call") as call_pool, pool("page") as page_pool:
+        for chunk in roster.chunked(roster.iter_targets(csv_path), CHUNK_ROWS):
+            raws = collect(chunk)
+            with timing.span("score", "phase"):
+                # Skip quietly if no access (private or missing)
+                students += score_chunk(chunk, raws, now, days_window, windows, profile, subdomains, skipped, "no_access_or_missing", raw_sink)
+
+    if store is not None:
+        with timing.span("store", "phase"):
+            # Keep commits back to the widest window, or longer for later --from-cache runs
+            store.prune(min(horizon, now - dt.timedelta(days=retain_days or 0)))
+            store.save(state_path)
+
+    return ranked_result(students, skipped, now, days_window)
+
+
+def score_chunk(
+    chunk: List[roster.Target],
+    raws: List[Optional[Dict]],
+    now: dt.datetime,
+    days_window: int,
+    windows: Iterable[int],
+    profile: scoring.Profile,
+    subdomains: subdomain_index.SubdomainIndex,
+    skipped: List[Dict],
+    reason: str,
+    raw_sink: Optional[Callable[[roster.Target, Dict, Dict], None]] = None,
+) -> List[Dict]:
+    """Students for the rows with raw data (the others go to skipped with reason, or fetch_failed)."""
+    since7 = now - dt.timedelta(days=days_window)
+    since30 = now - dt.timedelta(days=30)
+    scored = []
+    for t, raw in zip(chunk, raws):
+        if raw is None or raw.get("failed"):
+            why = reason if raw is None else "fetch_failed"
+            skipped.append({"name": t.name or t.owner, "repo": f"{t.owner}/{t.repo}", "reason": why})
+            continue
+        scored.append((t, raw))
+    # All of the chunk's metrics first, then one scoring pass over them
+    rows = [activity_metrics(raw, now, since7, since30, windows) for _t, raw in scored]
+    students = []
+    for (t, raw), metrics, badges in zip(scored, rows, profile.apply(rows)):
+        student = {
+            "name": t.name or t.owner,
+            "repo": f"{t.owner}/{t.repo}",
+            "owner": t.owner,
+            "metrics": metrics,
+            "badges": badges,
+            "urls": app_urls(t.app_url, subdomains),
+        }
+        students.append(student)
+        if raw_sink is not None:
+            raw_sink(t, raw, student)
+    return students
+
+
+def ranked_result(students: List[Dict], skipped: List[Dict], now: dt.datetime, days_window: int) -> Dict:
+    with timing.span("rank", "phase"):
+        # Leaderboard
+        ranked = ranking.RankedIndex(students)
+        students = list(ranked)
+        leaderboard = ranked.rows()
 
     return {
         "generated_at": iso(now),
@@ -387,19 +911,341 @@ def build_from_csv(csv_path: str, days_window: int = 7, subdomains_path: str = "
     }
 
 
+def build_from_cache(
+    csv_path: str,
+    state_path: str,
+    days_window: int = 7,
+    subdomains_path: str = "subdomains.json",
+    windows: Iterable[int] = (),
+    now: Optional[dt.datetime] = None,
+    attribute: bool = False,
+    profile: scoring.Profile = scoring.DEFAULT,
+    raw_sink: Optional[Callable[[roster.Target, Dict, Dict], None]] = None,
+) -> Dict:
+    """Score every roster row from the raw data recorded in a --state store; no GitHub calls.
+
+    now may be any time the store has history for; rows never recorded are
+    skipped, and rows whose history does not reach back to the window start
+    are scored from what there is (counted in the result's "partial").
+    """
+    with timing.span("load", "phase"):
+        subdomains = subdomain_index.SubdomainIndex.load(subdomains_path)
+        store = commit_store.CommitStore.load(state_path)
+    now = now or dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    since_date = (now - dt.timedelta(days=days_window)).date().isoformat()
+    windows = sorted(set(windows))
+    horizon = now - dt.timedelta(days=max([30, days_window, *windows]))
+
+    students: List[Dict] = []
+    skipped: List[Dict] = []
+    partial = 0
+    for chunk in roster.chunked(roster.iter_targets(csv_path), CHUNK_ROWS):
+        with timing.span("score", "phase"):
+            keys = [f"{t.owner}/{t.repo}".lower() for t in chunk]
+            if attribute:
+                keys = [f"{key}#{t.login.lower()}" for key, t in zip(keys, chunk)]
+            raws = [store.cached_raw(key, now, since_date) for key in keys]
+            partial += sum(1 for key, raw in zip(keys, raws) if raw is not None and not store.covers(key, horizon, since_date))
+            students += score_chunk(chunk, raws, now, days_window, windows, profile, subdomains, skipped, "not_in_cache", raw_sink)
+    result = ranked_result(students, skipped, now, days_window)
+    result["partial"] = partial
+    return result
+
+
 def main():
     ap = argparse.ArgumentParser(description="Build a static leaderboard JSON from a frozen CSV.")
     ap.add_argument("csv", help="Path to CSV, e.g. data/students.csv")
     ap.add_argument("out", help="Output JSON path, e.g. web/leaderboard.json")
     ap.add_argument("--days", type=int, default=7, help="Window in days (default 7)")
     ap.add_argument("--subdomains", default="subdomains.json", help="Path to subdomains.json (default: subdomains.json)")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum GitHub requests in flight (default {DEFAULT_CONCURRENCY}; 1 = serial)",
+    )
+    ap.add_argument(
+        "--collector",
+        choices=COLLECTORS,
+        default="rest",
+        help="rest: ~6 REST/search calls per repo; graphql: one aliased query per batch of repos",
+    )
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=GRAPHQL_BATCH_SIZE,
+        help=f"Repos per GraphQL query with --collector graphql (default {GRAPHQL_BATCH_SIZE})",
+    )
+    ap.add_argument(
+        "--state",
+        help="JSON commit store for incremental builds: only commits past each repo's high-water mark are fetched",
+    )
+    ap.add_argument(
+        "--retain-days",
+        type=int,
+        help="Keep this many days of commits and PR timestamps in the --state store instead of only the widest window, "
+        "so --from-cache can rebuild older or longer windows",
+    )
+    ap.add_argument(
+        "--from-cache",
+        action="store_true",
+        help="Rebuild from the raw data recorded in the --state store without any GitHub calls (any --days, --windows, "
+        "--now or --scoring-profile)",
+    )
+    ap.add_argument(
+        "--now",
+        type=lambda v: dt.datetime.fromisoformat(v.replace("Z", "+00:00")),
+        help="Reference time for --from-cache, e.g. 2025-10-20 or 2025-10-20T06:00:00Z (default: now)",
+    )
+    ap.add_argument("--cache", help="SQLite file for conditional-request (ETag) caching of GET responses")
+    ap.add_argument("--cache-ttl-days", type=float, default=7, help="Drop cache entries not revalidated for this long (default 7)")
+    ap.add_argument("--cache-max-mb", type=float, default=200, help="Evict least recently used entries above this size (default 200)")
+    ap.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit non-zero if any GitHub request still failed after retries or a repo was skipped as fetch_failed (the JSON is written either way)",
+    )
+    ap.add_argument(
+        "--windows",
+        type=lambda v: [int(d) for d in v.split(",") if d.strip()],
+        default=[],
+        help="Extra commit windows in days, e.g. 7,14,30 (adds commits_<N>d / commit_days_<N>d)",
+    )
+    ap.add_argument("--record", help="Save every GitHub response of this run to a fixture archive (.jsonl.gz)")
+    ap.add_argument(
+        "--replay",
+        help="Serve GitHub responses from a fixture archive instead of the network (use the same CSV, flags and --state file)",
+    )
+    ap.add_argument("--replay-latency", type=float, default=0.0, help="Seconds of artificial latency per replayed request")
+    ap.add_argument(
+        "--no-discover",
+        dest="discover",
+        action="store_false",
+        help="Probe each repo with GET /repos/{owner}/{repo} instead of bulk discovery (REST collector)",
+    )
+    ap.add_argument(
+        "--attribute",
+        action="store_true",
+        help="Count only commits attributed to the student (login, noreply email or name match) instead of all repo commits",
+    )
+    ap.add_argument(
+        "--timing",
+        action="store_true",
+        help="Write per-call spans (<out>.trace.json, Chrome trace format) and phase/endpoint/repo aggregates (<out>.timing.json)",
+    )
+    ap.add_argument("--profile", action="store_true", help="Like --timing, plus a cProfile summary across all threads (<out>.profile.txt)")
+    ap.add_argument(
+        "--no-split",
+        dest="split",
+        action="store_false",
+        help="Only write <out>; skip the minified <out>.summary.json, <out>.details/ shards and .gz/.br copies",
+    )
+    ap.add_argument(
+        "--shard-size",
+        type=int,
+        default=publish.SHARD_SIZE,
+        help=f"Students per detail shard (default {publish.SHARD_SIZE})",
+    )
+    ap.add_argument(
+        "--scoring-profile",
+        action="append",
+        default=[],
+        metavar="JSON",
+        help="Scoring profile file (repeatable; see tools/scoring.py). The first profile scores <out>; "
+        "each further one is written to <out stem>.<name>.json from the same metrics",
+    )
+    ap.add_argument(
+        "--history",
+        metavar="SQLITE",
+        help="Append this build to a history file and write <out>.history.json (rank changes, moving averages, commits per day)",
+    )
+    ap.add_argument(
+        "--history-days",
+        type=int,
+        default=history.DEFAULT_DAYS,
+        help=f"Days of history in <out>.history.json (default {history.DEFAULT_DAYS})",
+    )
+    ap.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="After the build, keep running and apply GitHub push/pull_request webhooks POSTed to this address",
+    )
+    ap.add_argument(
+        "--events",
+        metavar="JSONL",
+        help='After the build, apply webhook deliveries from a file ({"event": ..., "payload": ...} per line)',
+    )
+    ap.add_argument(
+        "--webhook-secret",
+        help="Secret for X-Hub-Signature-256 checks with --serve (default: $LEADERBOARD_WEBHOOK_SECRET)",
+    )
+    ap.add_argument("--debounce", type=float, default=5.0, help="Seconds to batch webhook updates before rewriting the output (default 5)")
+    ap.add_argument("--rescore-every", type=float, default=300.0, help="Seconds between re-aging every window with --serve (default 300)")
     args = ap.parse_args()
+    if args.record and args.replay:
+        ap.error("--record and --replay are mutually exclusive")
+    if args.from_cache and not args.state:
+        ap.error("--from-cache needs the --state store to read from")
+    if args.from_cache and (args.record or args.replay):
+        ap.error("--from-cache makes no GitHub calls to record or replay")
+    if args.now and not args.from_cache:
+        ap.error("--now only applies to --from-cache")
+    if 7 in args.windows and args.days != 7:
+        ap.error(f"--windows 7 clashes with --days {args.days}: commits_7d already holds the {args.days}-day count")
+    try:
+        profiles = scoring.load_profiles(args.scoring_profile) or [scoring.DEFAULT]
+    except (OSError, ValueError) as exc:
+        ap.error(str(exc))
+    # Catch a misspelt metric before spending any API calls
+    epoch = dt.datetime.now(dt.timezone.utc)
+    known = activity_metrics(
+        {"commits": [], "commits_all_time": 0, "pr_opened_7d": 0, "pr_merged_7d": 0},
+        epoch,
+        epoch - dt.timedelta(days=args.days),
+        epoch - dt.timedelta(days=30),
+        args.windows,
+    )
+    for p in profiles:
+        if p is not profiles[0] and p.name in ("summary", "details", "history", "trace", "timing"):
+            ap.error(f"scoring profile name {p.name!r} clashes with another output file")
+        unknown = [m for m in p.metrics() if m not in known]
+        if unknown:
+            ap.error(f"scoring profile {p.name}: unknown metric(s) {', '.join(unknown)}; available: {', '.join(known)}")
+
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    recorder = replayer = None
+    if args.replay:
+        fixture = gh_replay.load(args.replay)
+        now = fixture.now
+        replayer = gh_replay.ReplayBackend(fixture, latency=args.replay_latency)
+        gh_client.set_client(gh_client.GitHubClient(replayer))
+    elif args.record:
+        recorder = gh_replay.RecordingBackend(gh_client.client().backend, now)
+        gh_client.client().backend = recorder
+    if args.timing or args.profile:
+        timing.enable(profile=args.profile)
+    if args.cache:
+        gh_client.enable_cache(
+            args.cache,
+            ttl=args.cache_ttl_days * 86400,
+            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        )
+    # Raw activity is only kept around when webhooks will update it afterwards
+    live = bool(args.serve or args.events)
+    sunk: List[Tuple[roster.Target, Dict, Dict]] = []
+    activity: Dict[str, Dict[str, int]] = {}
+
+    def sink(t: roster.Target, raw: Dict, student: Dict) -> None:
+        if live:
+            sunk.append((t, raw, student))
+        if args.history:
+            # One series per repo, like the snapshots; the first roster row wins
+            activity.setdefault(student["repo"].lower(), history.daily_counts(raw["commits"]))
 
-    data = build_from_csv(args.csv, days_window=args.days, subdomains_path=args.subdomains)
-    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    if args.from_cache:
+        if args.now:
+            now = (args.now if args.now.tzinfo else args.now.replace(tzinfo=dt.timezone.utc)).astimezone(dt.timezone.utc)
+        data = build_from_cache(
+            args.csv,
+            args.state,
+            days_window=args.days,
+            subdomains_path=args.subdomains,
+            windows=args.windows,
+            now=now,
+            attribute=args.attribute,
+            profile=profiles[0],
+            raw_sink=sink if live or args.history else None,
+        )
+        partial = data.pop("partial")
+        print(f"Rebuilt from {args.state} as of {iso(now)}: {len(data['students'])} students, {len(data['skipped'])} not in the store")
+        if partial:
+            print(f"Warning: {partial} repo(s) have less recorded history than the window; their counts may be low", file=sys.stderr)
+    else:
+        data = build_from_csv(
+            args.csv,
+            days_window=args.days,
+            subdomains_path=args.subdomains,
+            concurrency=args.concurrency,
+            collector=args.collector,
+            batch_size=args.batch_size,
+            state_path=args.state,
+            windows=args.windows,
+            now=now,
+            attribute=args.attribute,
+            discover=args.discover,
+            raw_sink=sink if live or args.history else None,
+            profile=profiles[0],
+            retain_days=args.retain_days,
+        )
+    with timing.span("write", "phase"):
+        written = publish.write_leaderboard(data, args.out, args.split, args.shard_size)
+        # Further profiles re-score the same metrics; nothing is fetched again
+        rescored = []
+        for p in profiles[1:]:
+            path = timing.sidecar(args.out, f"{p.name}.json")
+            publish.write_leaderboard(scoring.rescore(data, p), path, args.split, args.shard_size)
+            rescored.append(path)
+    trends: Optional[Dict] = None
+    if args.history:
+        with timing.span("history", "phase"):
+            history_path = timing.sidecar(args.out, "history.json")
+            try:
+                store = history.HistoryStore(args.history)
+                try:
+                    # Days from the oldest one fetched are complete in this build
+                    fetched_from = now - dt.timedelta(days=max([30, args.days, *args.windows]))
+                    store.record(data, activity, fetched_from.date().isoformat())
+                    trends = store.trends(args.history_days)
+                finally:
+                    store.close()
+                publish.write_file(history_path, publish.minified(trends), compress=args.split)
+            except (sqlite3.Error, OSError) as exc:
+                # The leaderboard is already written; trends are optional
+                print(f"Warning: history not updated ({args.history}): {exc}", file=sys.stderr)
+                trends = None
     print(f"Wrote {args.out}")
+    for path in rescored:
+        print(f"Wrote {path}")
+    if trends is not None:
+        print(f"Wrote {history_path} ({len(trends['days'])} days, {len(trends['students'])} students)")
+    if args.split:
+        print(f"Wrote {timing.sidecar(args.out, 'summary.json')} and {len(written) - 1} more split/compressed files")
+    if timing.enabled():
+        timing.write_trace(timing.sidecar(args.out, "trace.json"))
+        timing.write_summary(timing.sidecar(args.out, "timing.json"))
+        phases = timing.summary()["phases_s"]
+        print("Timing: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in phases.items()))
+        if args.profile:
+            timing.write_profile(timing.sidecar(args.out, "profile.txt"))
+    if recorder is not None:
+        print(f"Recorded {recorder.save(args.record)} responses to {args.record}")
+    if replayer is not None:
+        print(f"Replayed {replayer.calls} requests, {len(replayer.misses)} not in the fixture")
+        for key in replayer.misses:
+            print(f"Warning: not recorded: {key}", file=sys.stderr)
+    scheduler = gh_client.client().scheduler
+    print(scheduler.summary())
+    for failure in scheduler.failures:
+        print(f"Warning: gave up on {failure}", file=sys.stderr)
+    if live:
+        # Imported here: the service module imports this one
+        import leaderboard_service
+
+        # A replayed build keeps its recorded reference time for the events too
+        leaderboard_service.run(data, sunk, args, profiles[0], clock=(lambda: now) if replayer is not None else None)
+    cache = gh_client.client().cache
+    if cache is not None:
+        st = cache.stats
+        print(f"HTTP cache: {st['revalidated']} revalidated (304), {st['fetched']} fetched, {st['evicted']} evicted")
+        cache.close()
+    failed_rows = sum(1 for s in data["skipped"] if s["reason"] == "fetch_failed")
+    if failed_rows:
+        print(f"Warning: {failed_rows} repo(s) could not be fetched completely and were skipped (fetch_failed)", file=sys.stderr)
+    if args.strict and (scheduler.failures or failed_rows):
+        sys.exit(
+            f"{len(scheduler.failures)} GitHub request(s) failed after retries, {failed_rows} repo(s) skipped as fetch_failed; "
+            "counts may be incomplete"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+"""Per-repo commit history: windowed views and the incremental-build store.
+
+CommitIndex answers "how many commits / distinct days since T" for any
+number of windows from a single fetch of the widest one.
+
+For every repo the store keeps the SHAs it has seen with their committer and
+author dates, plus a high-water mark (the newest committer date seen). A run
+only needs to ask GitHub for commits after the high-water mark; every
+windowed metric is then derived locally from the store.
+
+An optional snapshot records the repo's pushed_at and the rest of its raw
+data (PR timestamps, all-time commit count) so a repo nobody has pushed to
+since the last run can be rebuilt without any GitHub calls.
+
+The raw section accumulates every PR timestamp seen across runs, the latest
+all-time count, and since when commits and PRs are known without gaps, so a
+leaderboard for any window or reference time inside that span can be
+recomputed offline (build_leaderboard.py --from-cache).
+
+File format (JSON):
+
+    {"version": 1,
+     "repos": {"owner/repo": {"high_water": "2025-11-03T12:00:00Z",
+                              "commits": {"<sha>": ["<committed>", "<authored>"]},
+                              "snapshot": {"pushed_at": "...", "login": "...", "pr_since": "2025-10-27",
+                                           "pr_opened": [...], "pr_merged": [...], "all_time": 42},
+                              "raw": {"fetched_at": "...", "commits_from": "...", "prs_from": "2025-10-01",
+                                      "pr_opened": [...], "pr_merged": [...], "all_time": 42}}}}
+"""
+import bisect
+import datetime as dt
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+VERSION = 1
+# Commits can reach the default branch with a committer date older than the
+# high-water mark (late pushes of local work), so re-scan a little overlap.
+OVERLAP = dt.timedelta(days=2)
+
+CommitRecord = Tuple[str, str, str]  # (sha, committed ISO date, authored ISO date)
+
+
+def _iso(t: dt.datetime) -> str:
+    return t.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CommitIndex:
+    """Commit records sorted by committer date, for bisect-based window queries.
+
+    Windows follow the GitHub `since` semantics (committer date >= start) and
+    report author dates, matching what the per-window REST listings produced.
+    """
+
+    def __init__(self, records: Iterable[CommitRecord]):
+        ordered = sorted((committed, authored) for _sha, committed, authored in records)
+        self._committed = [c for c, _a in ordered]
+        self._authored = [a for _c, a in ordered]
+
+    def _start(self, since: dt.datetime) -> int:
+        return bisect.bisect_left(self._committed, _iso(since))
+
+    def count(self, since: dt.datetime) -> int:
+        return len(self._committed) - self._start(since)
+
+    def dates(self, since: dt.datetime) -> List[str]:
+        """Author dates of commits in the window (oldest committed first)."""
+        return self._authored[self._start(since):]
+
+    def days(self, since: dt.datetime) -> Set[str]:
+        """Distinct author days (YYYY-MM-DD) with commits in the window."""
+        return {a[:10] for a in self._authored[self._start(since):] if a}
+
+
+class CommitStore:
+    def __init__(self, repos: Optional[Dict[str, dict]] = None):
+        self.repos: Dict[str, dict] = repos or {}
+
+    @classmethod
+    def load(cls, path: str) -> "CommitStore":
+        """Load a store, starting empty if the file is missing or from another version."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            return cls()
+        return cls(data.get("repos") or {})
+
+    def save(self, path: str) -> None:
+        """Write atomically so an interrupted run never leaves a truncated store."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "repos": self.repos}, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def fetch_since(self, repo: str, floor: dt.datetime) -> dt.datetime:
+        """Where the next fetch for repo should start: just before the high-water mark, never before floor."""
+        hw = (self.repos.get(repo) or {}).get("high_water")
+        if not hw:
+            return floor
+        start = dt.datetime.strptime(hw, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc) - OVERLAP
+        return max(start, floor)
+
+    def merge(self, repo: str, records: Iterable[CommitRecord]) -> int:
+        """Add newly fetched commits; returns how many SHAs were new."""
+        entry = self.repos.setdefault(repo, {"high_water": None, "commits": {}})
+        commits = entry["commits"]
+        added = 0
+        for sha, committed, authored in records:
+            if not sha:
+                continue
+            if sha not in commits:
+                added += 1
+            commits[sha] = [committed, authored]
+            if committed and (not entry["high_water"] or committed > entry["high_water"]):
+                entry["high_water"] = committed
+        return added
+
+    def records(self, repo: str) -> List[CommitRecord]:
+        commits = (self.repos.get(repo) or {}).get("commits") or {}
+        return [(sha, committed, authored) for sha, (committed, authored) in commits.items()]
+
+    def snapshot(self, repo: str) -> Optional[dict]:
+        return (self.repos.get(repo) or {}).get("snapshot")
+
+    def set_snapshot(self, repo: str, snapshot: Optional[dict]) -> None:
+        """Remember (or with None, forget) the repo's unchanged-run snapshot."""
+        entry = self.repos.setdefault(repo, {"high_water": None, "commits": {}})
+        if snapshot is None:
+            entry.pop("snapshot", None)
+        else:
+            entry["snapshot"] = snapshot
+
+    def record_raw(self, repo: str, raw: dict, fetched_at: dt.datetime, fetched_from: dt.datetime, pr_since: str) -> None:
+        """Fold one run's raw data into the repo's offline-rescoring history.
+
+        fetched_from is where this run's commit listing started and pr_since
+        the first day its PR timestamps cover. Coverage only extends backwards
+        while runs overlap; a gap restarts it from this run.
+        """
+        entry = self.repos.setdefault(repo, {"high_water": None, "commits": {}})
+        prev = entry.get("raw") or {}
+        last = prev.get("fetched_at") or ""
+        start = _iso(fetched_from)
+        commits_from = min(prev["commits_from"], start) if prev.get("commits_from") and start <= last else start
+        opened, merged = raw.get("pr_opened_at"), raw.get("pr_merged_at")
+        if opened is None or merged is None:
+            # Only counts were available: timestamps are incomplete from here on
+            prs_from = None
+            opened, merged = prev.get("pr_opened") or [], prev.get("pr_merged") or []
+        else:
+            prs_from = min(prev["prs_from"], pr_since) if prev.get("prs_from") and pr_since <= last[:10] else pr_since
+            opened = sorted(set(prev.get("pr_opened") or []) | set(opened))
+            merged = sorted(set(prev.get("pr_merged") or []) | set(merged))
+        entry["raw"] = {
+            "fetched_at": _iso(fetched_at),
+            "commits_from": commits_from,
+            "prs_from": prs_from,
+            "pr_opened": opened,
+            "pr_merged": merged,
+            "all_time": raw["commits_all_time"],
+        }
+
+    def cached_raw(self, repo: str, now: dt.datetime, since_date: str) -> Optional[dict]:
+        """Raw data as a build at `now` with PR window since_date would have seen it (None if never recorded)."""
+        entry = self.repos.get(repo) or {}
+        saved = entry.get("raw")
+        if not saved:
+            return None
+        cutoff = _iso(now)
+        records = self.records(repo)
+        commits = [r for r in records if r[1] <= cutoff]
+        opened = [d for d in saved["pr_opened"] if since_date <= d[:10] and d <= cutoff]
+        merged = [d for d in saved["pr_merged"] if since_date <= d[:10] and d <= cutoff]
+        return {
+            "commits": commits,
+            "pr_opened_7d": len(opened),
+            "pr_merged_7d": len(merged),
+            "pr_opened_at": opened,
+            "pr_merged_at": merged,
+            # Commits made after `now` were not there yet
+            "commits_all_time": max(0, int(saved["all_time"]) - (len(records) - len(commits))),
+        }
+
+    def covers(self, repo: str, commits_since: dt.datetime, pr_since: str) -> bool:
+        """Whether the recorded history reaches back to both window starts without gaps."""
+        saved = (self.repos.get(repo) or {}).get("raw") or {}
+        commits_from, prs_from = saved.get("commits_from"), saved.get("prs_from")
+        return bool(commits_from and prs_from) and commits_from <= _iso(commits_since) and prs_from <= pr_since
+
+    def prune(self, before: dt.datetime) -> None:
+        """Forget commits (and recorded PR timestamps) older than every window still being computed."""
+        cutoff = _iso(before)
+        for entry in self.repos.values():
+            commits = entry.get("commits") or {}
+            for sha in [s for s, (committed, _a) in commits.items() if committed < cutoff]:
+                del commits[sha]
+            saved = entry.get("raw")
+            if saved:
+                saved["commits_from"] = max(saved["commits_from"], cutoff)
+                if saved["prs_from"]:
+                    saved["prs_from"] = max(saved["prs_from"], cutoff[:10])
+                saved["pr_opened"] = [d for d in saved["pr_opened"] if d[:10] >= cutoff[:10]]
+                saved["pr_merged"] = [d for d in saved["pr_merged"] if d[:10] >= cutoff[:10]]
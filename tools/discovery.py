@@ -0,0 +1,149 @@
+"""Bulk discovery of repository visibility and permissions.
+
+Instead of one GET /repos/{owner}/{repo} probe per CSV row, discover() lists
+every repository the token is affiliated with in one paginated /user/repos
+pass, then asks GraphQL about the remaining wanted repos (typically public
+student repos the token has no role on) in batches grouped by owner.
+
+The resulting index maps lowercased "owner/repo" to
+
+    {"visibility": "PUBLIC", "viewerPermission": "READ",
+     "default_branch": "main", "pushed_at": "2025-11-03T12:00:00Z"}
+
+or None when the repo is missing or invisible to the token. Repos whose
+lookup failed outright are left out, so callers can fall back to probing.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import gh_client
+
+AFFILIATION = "owner,collaborator,organization_member"
+BATCH_SIZE = 50
+
+_FIELDS = "nameWithOwner visibility viewerPermission pushedAt defaultBranchRef { name }"
+
+RepoInfo = Dict[str, Optional[str]]
+
+
+def repo_key(owner: str, repo: str) -> str:
+    return f"{owner}/{repo}".lower()
+
+
+def _from_rest(data: dict) -> RepoInfo:
+    return {
+        "visibility": (data.get("visibility") or ("private" if data.get("private") else "public")).upper(),
+        "viewerPermission": gh_client.permission_name(data.get("permissions")),
+        "default_branch": data.get("default_branch"),
+        "pushed_at": data.get("pushed_at"),
+    }
+
+
+def _from_graphql(node: dict) -> RepoInfo:
+    return {
+        "visibility": node.get("visibility"),
+        "viewerPermission": node.get("viewerPermission") or "NONE",
+        "default_branch": (node.get("defaultBranchRef") or {}).get("name"),
+        "pushed_at": node.get("pushedAt"),
+    }
+
+
+def list_viewer_repos() -> Dict[str, RepoInfo]:
+    """Everything the token owns, collaborates on or sees through an org, in one paginated pass.
+
+    Tokens that cannot list /user/repos (e.g. the Actions GITHUB_TOKEN) just yield nothing.
+    """
+    out: Dict[str, RepoInfo] = {}
+    for page in gh_client.client().paginate("/user/repos", {"affiliation": AFFILIATION, "per_page": 100}):
+        data = page.json()
+        if not page.ok or not isinstance(data, list):
+            break
+        for repo in data:
+            if isinstance(repo, dict) and repo.get("full_name"):
+                out[repo["full_name"].lower()] = _from_rest(repo)
+    return out
+
+
+def owner_batches(repos: Iterable[Tuple[str, str]], size: int = BATCH_SIZE) -> List[List[Tuple[str, List[str]]]]:
+    """Group repos by owner, then pack owners into batches of at most size repos."""
+    by_owner: Dict[str, Tuple[str, List[str]]] = {}
+    for owner, repo in repos:
+        by_owner.setdefault(owner.lower(), (owner, []))[1].append(repo)
+    batches: List[List[Tuple[str, List[str]]]] = []
+    current: List[Tuple[str, List[str]]] = []
+    room = size
+    for owner, names in by_owner.values():
+        while names:
+            if room == 0:
+                batches.append(current)
+                current, room = [], size
+            take, names = names[:room], names[room:]
+            current.append((owner, take))
+            room -= len(take)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def query_batch(batch: List[Tuple[str, List[str]]]) -> Dict[str, Optional[RepoInfo]]:
+    """Look up one batch with a single aliased query (repositoryOwner -> repository)."""
+    decls: List[str] = []
+    fields: List[str] = []
+    variables: Dict[str, object] = {}
+    for j, (owner, names) in enumerate(batch):
+        decls.append(f"$u{j}:String!")
+        variables[f"u{j}"] = owner
+        inner = []
+        for k, name in enumerate(names):
+            decls.append(f"$u{j}r{k}:String!")
+            variables[f"u{j}r{k}"] = name
+            inner.append(f"r{k}: repository(name:$u{j}r{k}) {{ {_FIELDS} }}")
+        fields.append(f"u{j}: repositoryOwner(login:$u{j}) {{ {' '.join(inner)} }}")
+    query = f"query({','.join(decls)}){{\n" + "\n".join(fields) + "\n}"
+    resp = gh_client.client().graphql(query, variables)
+    data = resp.json() if resp.ok else None
+    found = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(found, dict):
+        # The whole request failed; leave these repos unknown
+        return {}
+    # Only NOT_FOUND means missing; other null fields stay unknown
+    missing = gh_client.not_found_paths(data)
+    out: Dict[str, Optional[RepoInfo]] = {}
+    for j, (owner, names) in enumerate(batch):
+        owner_node = found.get(f"u{j}")
+        for k, name in enumerate(names):
+            node = owner_node.get(f"r{k}") if isinstance(owner_node, dict) else None
+            if isinstance(node, dict):
+                out[repo_key(owner, name)] = _from_graphql(node)
+            elif (f"u{j}",) in missing or (f"u{j}", f"r{k}") in missing:
+                out[repo_key(owner, name)] = None
+    return out
+
+
+def discover(
+    repos: Iterable[Tuple[str, str]],
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = 4,
+    listed: Optional[Dict[str, RepoInfo]] = None,
+) -> Dict[str, Optional[RepoInfo]]:
+    """Index the wanted (owner, repo) pairs; see the module docstring for the shape.
+
+    listed is a list_viewer_repos() result to reuse across calls.
+    """
+    wanted: Dict[str, Tuple[str, str]] = {}
+    for owner, repo in repos:
+        wanted.setdefault(repo_key(owner, repo), (owner, repo))
+    if not wanted:
+        return {}
+    index: Dict[str, Optional[RepoInfo]] = {}
+    if listed is None:
+        listed = list_viewer_repos()
+    for key in wanted:
+        if key in listed:
+            index[key] = listed[key]
+    rest = [pair for key, pair in wanted.items() if key not in index]
+    batches = owner_batches(rest, max(1, batch_size))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for found in pool.map(query_batch, batches):
+            index.update(found)
+    return index
@@ -0,0 +1,353 @@
+"""Shared GitHub API client for the scripts in tools/.
+
+Requests go over persistent HTTPS connections (one keep-alive connection per
+worker thread and host) authenticated with GH_TOKEN or GITHUB_TOKEN. When no
+token is set, or LEADERBOARD_GH_BACKEND=gh, calls fall back to the gh CLI so
+a locally logged-in `gh auth` session keeps working.
+
+GITHUB_API_URL / GITHUB_GRAPHQL_URL override the endpoints (they are set
+automatically on GitHub Actions, and point at a local stub server in tests).
+"""
+import http.client
+import json
+import os
+import subprocess
+import threading
+import urllib.parse
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+import http_cache
+import rate_limit
+import timing
+
+USER_AGENT = "practicum-leaderboard"
+DEFAULT_TIMEOUT = 30
+REDIRECT_STATUSES = (301, 302, 307, 308)
+MAX_REDIRECTS = 5
+
+
+class Response:
+    """A fully-read HTTP response. status is 0 when no response was received."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        # Header names are lowercased so lookups don't depend on the backend
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json(self) -> Optional[object]:
+        """Decode the body as JSON, or None if it is empty or malformed."""
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", "replace")
+
+
+def token_from_env() -> Optional[str]:
+    return os.getenv("GH_TOKEN") or os.getenv("GITHUB_TOKEN") or None
+
+
+def api_url() -> str:
+    return os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+
+def graphql_url() -> str:
+    return os.getenv("GITHUB_GRAPHQL_URL") or f"{api_url()}/graphql"
+
+
+class HttpBackend:
+    """Talks to the API directly over pooled keep-alive connections.
+
+    Each thread owns its connections (http.client connections are not
+    thread-safe), so a worker pool of N threads holds at most N open sockets
+    per host and every request after the first skips the TCP/TLS handshake.
+    """
+
+    name = "http"
+
+    def __init__(self, token: Optional[str], timeout: float = DEFAULT_TIMEOUT):
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+        return conn
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conn = self._local.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        """Send one request; GET redirects are followed like the gh CLI does.
+
+        GitHub answers 301 for renamed or transferred repos. The token is only
+        sent on to the same host.
+        """
+        origin = urllib.parse.urlsplit(url).netloc
+        for _hop in range(MAX_REDIRECTS):
+            resp = self._send(method, url, headers, body, urllib.parse.urlsplit(url).netloc == origin)
+            location = resp.headers.get("location")
+            if method != "GET" or resp.status not in REDIRECT_STATUSES or not location:
+                return resp
+            url = urllib.parse.urljoin(url, location)
+        return self._send(method, url, headers, body, urllib.parse.urlsplit(url).netloc == origin)
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes], auth: bool = True) -> Response:
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = dict(headers)
+        if self.token and auth:
+            headers["Authorization"] = f"Bearer {self.token}"
+        # A pooled connection may have been closed by the server while idle;
+        # that surfaces on the next request, so retry once on a fresh socket.
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 0:
+                    continue
+                return Response(0, {}, str(e).encode())
+            except (OSError, http.client.HTTPException) as e:
+                self._drop(parts.scheme, parts.netloc)
+                return Response(0, {}, str(e).encode())
+            if resp.will_close:
+                self._drop(parts.scheme, parts.netloc)
+            return Response(resp.status, dict(resp.getheaders()), data)
+        return Response(0, {}, b"unreachable")
+
+
+class GhCliBackend:
+    """Fallback that shells out to `gh api`, one process per request."""
+
+    name = "gh"
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        if url == graphql_url():
+            endpoint = "graphql"
+        else:
+            # gh resolves paths against its own configured host
+            endpoint = url[len(api_url()):] if url.startswith(api_url()) else url
+        cmd = ["gh", "api", "--include", "-X", method, endpoint]
+        for k, v in headers.items():
+            if k.lower() in ("user-agent", "content-type"):
+                continue
+            cmd += ["-H", f"{k}: {v}"]
+        if body is not None:
+            cmd += ["--input", "-"]
+        try:
+            p = subprocess.run(cmd, input=body, capture_output=True)
+        except OSError as e:
+            return Response(0, {}, str(e).encode())
+        status, resp_headers, data = _parse_included(p.stdout)
+        if status == 0:
+            # No HTTP response at all (not logged in, network down, ...)
+            return Response(0, {}, p.stderr or p.stdout)
+        return Response(status, resp_headers, data)
+
+
+def _parse_included(raw: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """Split `gh api --include` output into status, headers and body."""
+    head, sep, body = raw.partition(b"\r\n\r\n")
+    if not sep:
+        head, sep, body = raw.partition(b"\n\n")
+    lines = head.decode("latin-1").splitlines()
+    if not lines or not lines[0].startswith("HTTP/"):
+        return 0, {}, raw
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        return 0, {}, raw
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        k, _, v = line.partition(":")
+        if k:
+            headers[k.strip()] = v.strip()
+    return status, headers, body
+
+
+class GitHubClient:
+    def __init__(self, backend, cache=None, scheduler: Optional[rate_limit.Scheduler] = None):
+        self.backend = backend
+        # Optional http_cache.ResponseCache; GET requests become conditional
+        self.cache = cache
+        # Paces requests per rate-limit bucket and retries transient failures
+        self.scheduler = scheduler or rate_limit.Scheduler()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, object]] = None,
+        body: Optional[object] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """Send one request. path is relative to the API root or an absolute URL."""
+        url = path if "://" in path else f"{api_url()}{path}"
+        if params:
+            sep = "&" if "?" in url else "?"
+            url += sep + urllib.parse.urlencode(params)
+        hdrs = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": USER_AGENT,
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+        if headers:
+            hdrs.update(headers)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            hdrs["Content-Type"] = "application/json"
+        cached = None
+        if self.cache is not None and method == "GET":
+            cached = self.cache.lookup(url)
+            if cached:
+                hdrs.update(cached[0])
+
+        def send() -> Response:
+            if not timing.enabled():
+                return self.backend.request(method, url, hdrs, data)
+            # One span per attempt, so retries and throttling show up separately
+            with timing.span(timing.endpoint(method, url), "http", url=url, repo=timing.repo_of(url, body)) as info:
+                r = self.backend.request(method, url, hdrs, data)
+                info["status"] = r.status
+                info["bytes"] = len(r.body)
+            return r
+
+        resp = self.scheduler.run(rate_limit.bucket_for(url, graphql_url()), f"{method} {url}", send)
+        if cached and resp.status == 304:
+            self.cache.touch(url)
+            # Serve the stored page, but keep the fresh rate-limit headers
+            merged = dict(cached[1])
+            merged.update({k: v for k, v in resp.headers.items() if k.startswith("x-ratelimit")})
+            return Response(200, merged, cached[2])
+        if self.cache is not None and method == "GET" and resp.status == 200:
+            self.cache.store(url, resp.headers, resp.body)
+        return resp
+
+    def get(self, path: str, params: Optional[Dict[str, object]] = None) -> Response:
+        return self.request("GET", path, params)
+
+    def graphql(self, query: str, variables: Optional[Dict[str, object]] = None) -> Response:
+        return self.request("POST", graphql_url(), body={"query": query, "variables": variables or {}})
+
+    def paginate(self, path: str, params: Optional[Dict[str, object]] = None) -> Iterator[Response]:
+        """Yield each page of a list endpoint, following `Link: rel="next"`."""
+        resp = self.get(path, params)
+        while True:
+            yield resp
+            nxt = next_link(resp)
+            if not resp.ok or not nxt:
+                return
+            resp = self.get(nxt)
+
+
+def parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    """Parse an RFC 8288 Link header into {rel: url}."""
+    links: Dict[str, str] = {}
+    for part in (value or "").split(","):
+        segs = part.strip().split(";")
+        if len(segs) < 2:
+            continue
+        url = segs[0].strip().lstrip("<").rstrip(">")
+        for s in segs[1:]:
+            k, _, v = s.strip().partition("=")
+            if k == "rel":
+                links[v.strip('"')] = url
+    return links
+
+
+def next_link(resp: Response) -> Optional[str]:
+    return parse_link_header(resp.headers.get("link")).get("next")
+
+
+def not_found_paths(data: object) -> Set[Tuple[str, ...]]:
+    """Paths a GraphQL response reported as NOT_FOUND, e.g. ("r3",) for an aliased field.
+
+    A null field without such an error failed for some other reason (timeout,
+    rate limit, SAML enforcement) and says nothing about whether it exists.
+    """
+    errors = data.get("errors") if isinstance(data, dict) else None
+    return {
+        tuple(str(p) for p in e["path"])
+        for e in errors or []
+        if isinstance(e, dict) and e.get("type") == "NOT_FOUND" and isinstance(e.get("path"), list)
+    }
+
+
+def make_backend(name: Optional[str] = None):
+    """Pick a backend: explicit name, LEADERBOARD_GH_BACKEND, else http if a token is set."""
+    name = name or os.getenv("LEADERBOARD_GH_BACKEND")
+    token = token_from_env()
+    if name == "gh" or (name is None and not token):
+        return GhCliBackend()
+    return HttpBackend(token)
+
+
+_client: Optional[GitHubClient] = None
+_client_lock = threading.Lock()
+
+
+def client() -> GitHubClient:
+    """Process-wide client, created on first use.
+
+    LEADERBOARD_HTTP_CACHE=path enables the on-disk conditional-request cache.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient(make_backend())
+            cache_path = os.getenv("LEADERBOARD_HTTP_CACHE")
+            if cache_path:
+                _client.cache = http_cache.ResponseCache(cache_path)
+        return _client
+
+
+def enable_cache(path: str, ttl: float = http_cache.DEFAULT_TTL, max_bytes: int = http_cache.DEFAULT_MAX_BYTES) -> None:
+    """Attach an on-disk response cache to the process-wide client."""
+    c = client()
+    if c.cache is not None:
+        c.cache.close()
+    c.cache = http_cache.ResponseCache(path, ttl=ttl, max_bytes=max_bytes)
+
+
+def set_client(c: Optional[GitHubClient]) -> None:
+    """Replace the process-wide client (None resets to the environment default)."""
+    global _client
+    with _client_lock:
+        _client = c
+
+
+def permission_name(perms: Optional[Dict[str, bool]]) -> str:
+    """Map a REST `permissions` object to the GraphQL viewerPermission spelling."""
+    perms = perms or {}
+    for key, label in (
+        ("admin", "ADMIN"),
+        ("maintain", "MAINTAIN"),
+        ("push", "WRITE"),
+        ("triage", "TRIAGE"),
+        ("pull", "READ"),
+    ):
+        if perms.get(key):
+            return label
+    return "NONE"
@@ -0,0 +1,123 @@
+"""Record GitHub API traffic to a fixture archive and replay it offline.
+
+A fixture is a gzipped JSON-lines file: a header line with the run's
+reference time, then one line per request/response pair. Builds replayed
+from a fixture reuse the recorded reference time, so every `since` window
+and GraphQL variable matches the recorded request exactly.
+"""
+import base64
+import datetime as dt
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import gh_client
+from gh_client import Response
+
+FORMAT = "gh-fixture/1"
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+    """Identify a request by method, URL and body digest (headers are ignored)."""
+    digest = hashlib.sha256(body).hexdigest()[:16] if body else "-"
+    return f"{method} {url} {digest}"
+
+
+def _relative(url: str) -> str:
+    # Keys are relative to the API root, so a fixture recorded against
+    # api.github.com replays against any GITHUB_API_URL and vice versa
+    base = gh_client.api_url()
+    return url[len(base):] if url.startswith(base) else url
+
+
+class RecordingBackend:
+    """Wraps another backend and keeps every exchange for save()."""
+
+    def __init__(self, inner, now: dt.datetime):
+        self.name = f"record({inner.name})"
+        self.inner = inner
+        self.now = now
+        self._lock = threading.Lock()
+        self._entries: List[dict] = []
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        resp = self.inner.request(method, url, headers, body)
+        entry = {
+            "key": request_key(method, _relative(url), body),
+            "status": resp.status,
+            "headers": resp.headers,
+            "body": base64.b64encode(resp.body).decode("ascii"),
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return resp
+
+    def save(self, path: str) -> int:
+        """Write the archive; returns the number of recorded exchanges."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            entries = list(self._entries)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": FORMAT, "now": self.now.strftime("%Y-%m-%dT%H:%M:%SZ")}) + "\n")
+            for e in entries:
+                f.write(json.dumps(e, separators=(",", ":")) + "\n")
+        return len(entries)
+
+
+class Fixture:
+    def __init__(self, now: dt.datetime, responses: Dict[str, List[Tuple[int, Dict[str, str], bytes]]]):
+        self.now = now
+        self.responses = responses
+
+
+def load(path: str) -> Fixture:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a {FORMAT} archive")
+        responses: Dict[str, List[Tuple[int, Dict[str, str], bytes]]] = {}
+        for line in f:
+            e = json.loads(line)
+            responses.setdefault(e["key"], []).append((e["status"], e["headers"], base64.b64decode(e["body"])))
+    now = dt.datetime.strptime(header["now"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc)
+    return Fixture(now, responses)
+
+
+class ReplayBackend:
+    """Serves recorded responses, optionally after an artificial delay.
+
+    Repeated requests get the recorded responses in order (the last one
+    repeats). Requests missing from the fixture get a 404 and are counted in
+    misses, so a stale fixture shows up in the output instead of hanging.
+    """
+
+    name = "replay"
+
+    def __init__(self, fixture: Fixture, latency: float = 0.0):
+        self.fixture = fixture
+        self.latency = latency
+        self.calls = 0
+        self.misses: List[str] = []
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        if self.latency:
+            time.sleep(self.latency)
+        key = request_key(method, _relative(url), body)
+        recorded = self.fixture.responses.get(key)
+        with self._lock:
+            self.calls += 1
+            if not recorded:
+                self.misses.append(key)
+                return Response(404, {}, b'{"message": "Not recorded in fixture"}')
+            i = self._served.get(key, 0)
+            self._served[key] = i + 1
+        status, resp_headers, data = recorded[min(i, len(recorded) - 1)]
+        # Recorded rate-limit budgets are stale; don't let them pace the replay
+        resp_headers = {k: v for k, v in resp_headers.items() if not k.startswith("x-ratelimit")}
+        return Response(status, resp_headers, data)
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Minimal synthetic GitHub API server for benchmarks and offline runs.
+
+Serves deterministic fake data for the endpoints the tools use. Point the
+client at it with GITHUB_API_URL=http://127.0.0.1:PORT (any token works):
+
+    python3 tools/gh_stub.py --port 8765
+    GITHUB_API_URL=http://127.0.0.1:8765 GH_TOKEN=x \\
+        python3 tools/build_leaderboard.py data/students.csv /tmp/lb.json
+"""
+import argparse
+import datetime as dt
+import functools
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+def _h(s: str) -> int:
+    return int(hashlib.md5(s.encode("utf-8")).hexdigest(), 16)
+
+
+def _iso(t: dt.datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SyntheticGitHub:
+    """Deterministic fake repos. Every repo's data derives from a hash of its name."""
+
+    # Requests per 60-second window for each rate-limit bucket
+    LIMITS = {"core": 5000, "search": 30, "graphql": 5000}
+
+    def __init__(
+        self,
+        now: Optional[dt.datetime] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        self.now = now or dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.limits = dict(self.LIMITS, **(limits or {}))
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._used: Dict[str, int] = {}
+        self._window = 0
+        self._rng = random.Random(0)
+        # Pending invitations to userN/repoN, by id N + 1; accepting one removes it
+        self._pending = set(range(1, self.INVITES + 1))
+        # A build asks for the same repo several times in a row; don't regenerate it each time
+        self.commits = functools.lru_cache(maxsize=256)(self._commits)
+
+    def rate_headers(self, path: str) -> Tuple[Dict[str, str], bool]:
+        """X-RateLimit-* headers for the request's bucket, and whether the budget is exhausted."""
+        bucket = "graphql" if path == "/graphql" else "search" if path.startswith("/search/") else "core"
+        with self._lock:
+            window = int(time.time()) // 60
+            if window != self._window:
+                self._window, self._used = window, {}
+            used = self._used[bucket] = self._used.get(bucket, 0) + 1
+        limit = self.limits[bucket]
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(0, limit - used)),
+            "X-RateLimit-Reset": str((window + 1) * 60),
+            "X-RateLimit-Resource": bucket,
+        }
+        return headers, used > limit
+
+    def injected_error(self) -> Optional[Tuple[int, object, Dict[str, str]]]:
+        """With error_rate set, randomly fail like GitHub does under load."""
+        with self._lock:
+            roll = self._rng.random()
+        if roll >= self.error_rate:
+            return None
+        if roll < self.error_rate / 2:
+            return 502, {"message": "Server Error"}, {}
+        return 403, {"message": "You have exceeded a secondary rate limit."}, {"Retry-After": "1"}
+
+    def has_repo(self, owner: str, repo: str) -> bool:
+        return _h(f"{owner}/{repo}".lower()) % 7 != 0
+
+    # userN/repoN-old is the name userN/repoN had before a rename
+    RENAMED_SUFFIX = "-old"
+
+    def current_name(self, owner: str, repo: str) -> str:
+        """The repo's name after a rename (REST redirects to it, GraphQL resolves it)."""
+        if repo.endswith(self.RENAMED_SUFFIX):
+            new = repo[: -len(self.RENAMED_SUFFIX)]
+            if self.has_repo(owner, new):
+                return new
+        return repo
+
+    def _commits(self, owner: str, repo: str) -> List[dict]:
+        """Newest-first commit list: one commit every ~17 hours, or every 2 hours for busy repos."""
+        full = f"{owner}/{repo}".lower()
+        busy = _h(full) % 5 == 0
+        n = 300 + _h(full) % 200 if busy else _h(full) % 160
+        spacing = 2 if busy else 17
+        out = []
+        for i in range(n):
+            t = self.now - dt.timedelta(hours=spacing * i + (_h(f"{full}{i}") % 2 if busy else _h(f"{full}{i}") % 5))
+            # About one commit in four comes from a collaborator rather than the owner
+            login, name, email = (
+                ("pair-helper", "Pair Helper", "helper@example.com")
+                if _h(f"{full}by{i}") % 4 == 0
+                else (owner, owner, f"{owner}@users.noreply.github.com")
+            )
+            out.append(
+                {
+                    "sha": "%040x" % (_h(f"{full}#{i}") & ((1 << 160) - 1)),
+                    "commit": {
+                        "author": {"name": name, "email": email, "date": _iso(t)},
+                        "committer": {"name": name, "email": email, "date": _iso(t)},
+                        "message": f"commit {i}",
+                    },
+                    "author": {"login": login},
+                    "committer": {"login": login},
+                }
+            )
+        return out
+
+    def repo_info(self, owner: str, repo: str) -> dict:
+        commits = self.commits(owner, repo)
+        return {
+            "name": repo,
+            "full_name": f"{owner}/{repo}",
+            "visibility": "public",
+            "default_branch": "main",
+            "pushed_at": commits[0]["commit"]["committer"]["date"] if commits else None,
+            "permissions": {"pull": True},
+        }
+
+    def pulls(self, owner: str, repo: str) -> List[dict]:
+        full = f"{owner}/{repo}".lower()
+        out = []
+        for i in range(_h(full + "pr") % 6):
+            created = self.now - dt.timedelta(days=(_h(f"{full}pr{i}") % 20), hours=i)
+            merged = created + dt.timedelta(hours=3) if i % 2 == 0 else None
+            if merged is not None and merged > self.now:
+                merged = None
+            out.append(
+                {
+                    "number": i + 1,
+                    "user": {"login": owner},
+                    "created_at": _iso(created),
+                    "merged_at": _iso(merged) if merged else None,
+                    "pull_request": {"merged_at": _iso(merged) if merged else None},
+                }
+            )
+        return out
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Optional[dict]) -> Tuple[int, object, Dict[str, str]]:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parts = [p for p in path.split("/") if p]
+        if path == "/rate_limit":
+            return 200, {"resources": {"core": {"limit": 5000, "remaining": 5000}}}, {}
+        if path == "/graphql" and method == "POST":
+            return 200, self.graphql(body or {}), {}
+        if path == "/search/issues":
+            return 200, self.search(query.get("q", "")), {}
+        if len(parts) == 2 and parts[0] == "users":
+            return 200, {"login": parts[1], "type": "User"}, {}
+        if path == "/user/repos":
+            return self.viewer_repos(path, query)
+        if path == "/user/repository_invitations":
+            return self.invitations(path, query)
+        if len(parts) == 3 and parts[:2] == ["user", "repository_invitations"] and method == "PATCH":
+            with self._lock:
+                if parts[2].isdigit() and int(parts[2]) in self._pending:
+                    self._pending.discard(int(parts[2]))
+                    return 204, None, {}
+            return 404, {"message": "Not Found"}, {}
+        if len(parts) >= 3 and parts[0] == "repos":
+            owner, repo = parts[1], parts[2]
+            if self.current_name(owner, repo) != repo:
+                moved = "/".join(["", "repos", owner, self.current_name(owner, repo), *parts[3:]])
+                query_string = f"?{urllib.parse.urlencode(query)}" if query else ""
+                return 301, {"message": "Moved Permanently", "url": moved}, {"Location": moved + query_string}
+            if not self.has_repo(owner, repo):
+                return 404, {"message": "Not Found"}, {}
+            if len(parts) == 3:
+                return 200, self.repo_info(owner, repo), {}
+            if parts[3:] == ["commits"]:
+                return self.commit_page(owner, repo, path, query)
+        return 404, {"message": "Not Found"}, {}
+
+    INVITES = 120
+
+    def invitations(self, path: str, query: Dict[str, str]) -> Tuple[int, object, Dict[str, str]]:
+        with self._lock:
+            pending = sorted(self._pending)
+        invites = [
+            {
+                "id": n,
+                "repository": {"full_name": f"user{n - 1}/repo{n - 1}"},
+                "inviter": {"login": f"user{n - 1}"},
+                "created_at": _iso(self.now - dt.timedelta(hours=n)),
+            }
+            for n in pending
+        ]
+        per_page = min(int(query.get("per_page", 30)), 100)
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(invites):
+            headers["Link"] = f'<{path}?{urllib.parse.urlencode(dict(query, page=str(page + 1)))}>; rel="next"'
+        return 200, invites[(page - 1) * per_page: page * per_page], headers
+
+    # The viewer collaborates on the first few synthetic roster repos (userN/repoN);
+    # everything else is only reachable as a public repo.
+    VIEWER_REPOS = 40
+
+    def viewer_repos(self, path: str, query: Dict[str, str]) -> Tuple[int, object, Dict[str, str]]:
+        repos = [
+            dict(self.repo_info(f"user{i}", f"repo{i}"), permissions={"pull": True, "push": True}, private=False)
+            for i in range(self.VIEWER_REPOS)
+            if self.has_repo(f"user{i}", f"repo{i}")
+        ]
+        per_page = min(int(query.get("per_page", 30)), 100)
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(repos):
+            q = dict(query, page=str(page + 1))
+            headers["Link"] = f'<{path}?{urllib.parse.urlencode(q)}>; rel="next"'
+        return 200, repos[(page - 1) * per_page: page * per_page], headers
+
+    def commit_page(self, owner: str, repo: str, path: str, query: Dict[str, str]) -> Tuple[int, object, Dict[str, str]]:
+        commits = self.commits(owner, repo)
+        since = query.get("since")
+        if since:
+            commits = [c for c in commits if c["commit"]["committer"]["date"] >= since]
+        per_page = min(int(query.get("per_page", 30)), 100)
+        page = int(query.get("page", 1))
+        chunk = commits[(page - 1) * per_page: page * per_page]
+        headers = {}
+        last = max(1, -(-len(commits) // per_page))
+        if page < last:
+            q = dict(query)
+            links = []
+            for rel, n in (("next", page + 1), ("last", last)):
+                q["page"] = str(n)
+                links.append(f'<{path}?{urllib.parse.urlencode(q)}>; rel="{rel}"')
+            headers["Link"] = ", ".join(links)
+        return 200, chunk, headers
+
+    def search(self, q: str) -> dict:
+        terms = dict(t.split(":", 1) for t in q.split() if ":" in t and not t.startswith("is:"))
+        owner, _, repo = terms.get("repo", "/").partition("/")
+        repo = self.current_name(owner, repo)
+        since = None
+        field = "created_at"
+        for key in ("created", "merged"):
+            if key in terms:
+                since = terms[key].lstrip(">=")
+                field = f"{key}_at"
+        items = []
+        for pr in self.pulls(owner, repo):
+            if pr["user"]["login"].lower() != terms.get("author", "").lower():
+                continue
+            if pr.get(field) and since and pr[field][:10] >= since:
+                items.append(pr)
+        return {"total_count": len(items), "items": items}
+
+    def graphql(self, body: dict) -> dict:
+        """Answer the handful of query shapes the tools send (recognised by their variables)."""
+        q = body.get("query") or ""
+        v = body.get("variables") or {}
+        if "o0" in v:
+            data = {}
+            i = 0
+            while f"o{i}" in v:
+                data[f"r{i}"] = self.repo_node(v[f"o{i}"], self.current_name(v[f"o{i}"], v[f"n{i}"]), v.get(f"s{i}"))
+                i += 1
+            return self._with_errors(data)
+        if "u0" in v:
+            return self._with_errors(self.discovery(v))
+        owner = v.get("owner", "")
+        repo = self.current_name(owner, v.get("repo", ""))
+        if not self.has_repo(owner, repo):
+            return {"data": {"repository": None}, "errors": [{"type": "NOT_FOUND"}]}
+        if "pullRequests" in q:
+            return {"data": {"repository": {"pullRequests": self._page(self.pr_nodes(owner, repo), v.get("after"))}}}
+        if "after:$after" in q:
+            hist = self._page(self.history_nodes(owner, repo, v.get("since")), v.get("after"))
+            return {"data": {"repository": {"defaultBranchRef": {"target": {"history": hist}}}}}
+        total = len(self.commits(owner, repo))
+        return {"data": {"repository": {"defaultBranchRef": {"target": {"history": {"totalCount": total}}}}}}
+
+    @staticmethod
+    def _with_errors(data: dict) -> dict:
+        """Report every null aliased field as NOT_FOUND at its path, like GitHub does."""
+        errors = []
+
+        def walk(node: dict, path: List[str]) -> None:
+            for alias, value in node.items():
+                if alias[:1] not in ("r", "u") or not alias[1:].isdigit():
+                    continue
+                if value is None:
+                    errors.append({"type": "NOT_FOUND", "path": path + [alias], "message": "Could not resolve to a Repository"})
+                elif alias[0] == "u":
+                    walk(value, path + [alias])
+
+        walk(data, [])
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def discovery(self, v: Dict[str, str]) -> dict:
+        """repositoryOwner(login:$uJ) { rK: repository(name:$uJrK) {...} } batches."""
+        data = {}
+        j = 0
+        while f"u{j}" in v:
+            owner = v[f"u{j}"]
+            node = {}
+            k = 0
+            while f"u{j}r{k}" in v:
+                repo = self.current_name(owner, v[f"u{j}r{k}"])
+                info = self.repo_info(owner, repo) if self.has_repo(owner, repo) else None
+                node[f"r{k}"] = info and {
+                    "nameWithOwner": info["full_name"],
+                    "visibility": "PUBLIC",
+                    "viewerPermission": "READ",
+                    "pushedAt": info["pushed_at"],
+                    "defaultBranchRef": {"name": info["default_branch"]},
+                }
+                k += 1
+            data[f"u{j}"] = node
+            j += 1
+        return data
+
+    def history_nodes(self, owner: str, repo: str, since: Optional[str]) -> List[dict]:
+        return [
+            {
+                "oid": c["sha"],
+                "authoredDate": c["commit"]["author"]["date"],
+                "committedDate": c["commit"]["committer"]["date"],
+                "author": {"name": c["commit"]["author"]["name"], "email": c["commit"]["author"]["email"], "user": c["author"]},
+                "committer": {
+                    "name": c["commit"]["committer"]["name"],
+                    "email": c["commit"]["committer"]["email"],
+                    "user": c["committer"],
+                },
+            }
+            for c in self.commits(owner, repo)
+            if not since or c["commit"]["committer"]["date"] >= since
+        ]
+
+    def pr_nodes(self, owner: str, repo: str) -> List[dict]:
+        nodes = [
+            {
+                "author": {"login": pr["user"]["login"]},
+                "createdAt": pr["created_at"],
+                "mergedAt": pr["merged_at"],
+                "updatedAt": pr["merged_at"] or pr["created_at"],
+            }
+            for pr in self.pulls(owner, repo)
+        ]
+        nodes.sort(key=lambda n: n["updatedAt"], reverse=True)
+        return nodes
+
+    @staticmethod
+    def _page(nodes: List[dict], after: Optional[str], first: int = 100) -> dict:
+        """Connection-style page; cursors are plain offsets."""
+        start = int(after or 0)
+        end = start + first
+        return {
+            "totalCount": len(nodes),
+            "nodes": nodes[start:end],
+            "pageInfo": {"hasNextPage": end < len(nodes), "endCursor": str(end)},
+        }
+
+    def repo_node(self, owner: str, repo: str, since: Optional[str]) -> Optional[dict]:
+        if not self.has_repo(owner, repo):
+            return None
+        all_nodes = self.history_nodes(owner, repo, None)
+        return {
+            "defaultBranchRef": {
+                "target": {
+                    "all": {"totalCount": len(all_nodes)},
+                    "recent": self._page(self.history_nodes(owner, repo, since), None),
+                }
+            },
+            "pullRequests": self._page(self.pr_nodes(owner, repo), None),
+        }
+
+
+def make_handler(api: SyntheticGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out as separate writes; without this, Nagle plus
+            # delayed ACKs add ~40ms to every keep-alive request
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self, method: str) -> None:
+            parts = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(parts.query))
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            limit_headers, exhausted = api.rate_headers(parts.path)
+            if exhausted:
+                status, payload, headers = 403, {"message": "API rate limit exceeded"}, {}
+            else:
+                status, payload, headers = api.injected_error() or api.handle(method, parts.path, query, body)
+            headers = dict(limit_headers, **headers)
+            data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            if method == "GET" and status == 200:
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                headers = dict(headers, ETag=etag)
+                if self.headers.get("If-None-Match") == etag:
+                    status, data = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, val in headers.items():
+                self.send_header(k, val)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+        def do_PATCH(self):
+            self._serve("PATCH")
+
+    return Handler
+
+
+def serve(api: SyntheticGitHub, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread and return the server (server_port is the bound port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve a synthetic GitHub API on localhost.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="Seconds of artificial latency per request")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 502 / secondary rate limit")
+    for bucket, limit in SyntheticGitHub.LIMITS.items():
+        ap.add_argument(f"--{bucket}-limit", type=int, default=limit, help=f"{bucket} requests per minute (default {limit})")
+    args = ap.parse_args()
+    limits = {bucket: getattr(args, f"{bucket}_limit") for bucket in SyntheticGitHub.LIMITS}
+    api = SyntheticGitHub(latency=args.latency, error_rate=args.error_rate, limits=limits)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(api))
+    print(f"Serving synthetic GitHub API on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
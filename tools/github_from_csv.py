@@ -1,129 +1,136 @@
 #!/usr/bin/env python3
 import argparse
-import csv
+import json
 import os
-import re
-import subprocess
 import sys
-from typing import Iterable, List, Set
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Set, Tuple
 
+import discovery
+import gh_client
+import roster
 
-def _clean_headers(row: dict) -> dict:
-    cleaned = {}
-    for k, v in row.items():
-        if k is None:
-            continue
-        key = re.sub(r"[\s_]+", " ", k.strip().strip(",").lower())
-        cleaned[key] = (v or "").strip()
-    return cleaned
+DEFAULT_CONCURRENCY = 8
+RESULTS = ("accepted", "already_accepted", "failed")
 
 
 def extract_repos(csv_path: str) -> List[str]:
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found: {csv_path}")
-    seen: Set[str] = set()
-    repos: List[str] = []
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for raw in reader:
-            row = _clean_headers(raw)
-            url = (
-                row.get("github url")
-                or row.get("github")
-                or row.get("repo url")
-                or row.get("repository url")
-                or row.get("repo")
-                or ""
-            ).strip()
-            if not url:
-                continue
-            # Normalize OWNER/REPO from URL or raw owner/repo
-            owner_repo = None
-            if "://" in url:
-                # URL form
-                m = re.search(r"github\.com/([^/]+)/([^/#?]+)", url, re.I)
-                if m:
-                    owner = m.group(1)
-                    repo = m.group(2).removesuffix(".git")
-                    owner_repo = f"{owner}/{repo}"
-            else:
-                # Possibly already OWNER/REPO
-                m = re.match(r"^[^/]+/[^/]+$", url)
-                if m:
-                    owner_repo = url
-            if not owner_repo:
-                continue
-            if owner_repo not in seen:
-                repos.append(owner_repo)
-                seen.add(owner_repo)
-    return repos
+    return list(roster.iter_repos(csv_path))
 
 
-def run(cmd: List[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, check=False, text=True, capture_output=True)
-
-
-def list_pending_invites(repos: Iterable[str]) -> List[tuple]:
-    # Query all pending invites
-    q = run([
-        "gh",
-        "api",
-        "-H",
-        "Accept: application/vnd.github+json",
-        "/user/repository_invitations",
-        "--paginate",
-        "--jq",
-        ".[ ] | map([.id, .repository.full_name, .inviter.login, .created_at] | @tsv) | .[]",
-    ])
-    if q.returncode != 0:
-        print(q.stderr.strip() or q.stdout.strip(), file=sys.stderr)
-        return []
+def iter_pending_invites(repos: Iterable[str]) -> Iterator[tuple]:
+    """Yield (id, full_name, inviter, created_at) for CSV repos page by page as the listing arrives."""
     wanted = set(repos)
-    out: List[tuple] = []
-    for line in q.stdout.splitlines():
-        if not line.strip():
-            continue
-        parts = line.split("\t")
-        if len(parts) < 4:
-            continue
-        inv_id, full, inviter, created = parts[:4]
-        if full in wanted:
-            out.append((inv_id, full, inviter, created))
-    return out
+    for page in gh_client.client().paginate("/user/repository_invitations", {"per_page": 100}):
+        if not page.ok:
+            print(page.text().strip(), file=sys.stderr)
+            return
+        for inv in page.json() or []:
+            full = (inv.get("repository") or {}).get("full_name")
+            if full in wanted:
+                inviter = (inv.get("inviter") or {}).get("login") or ""
+                yield (str(inv.get("id")), full, inviter, inv.get("created_at") or "")
 
 
-def accept_invites(ids: Iterable[str]) -> int:
-    count = 0
-    for inv_id in ids:
-        if not inv_id:
-            continue
-        r = run(["gh", "api", "-X", "PATCH", f"/user/repository_invitations/{inv_id}"])
-        if r.returncode == 0:
-            count += 1
-        else:
-            print(f"Failed to accept {inv_id}: {r.stderr or r.stdout}", file=sys.stderr)
-    return count
+def list_pending_invites(repos: Iterable[str]) -> List[tuple]:
+    return list(iter_pending_invites(repos))
+
+
+def accept_invite(inv_id: str) -> str:
+    """Accept one invitation: "accepted", "already_accepted" (404: gone) or "failed".
+
+    Transient failures (5xx, dropped connections, rate limits) are retried by
+    the client's scheduler before a result is reported.
+    """
+    r = gh_client.client().request("PATCH", f"/user/repository_invitations/{inv_id}")
+    if r.ok:
+        return "accepted"
+    if r.status == 404:
+        return "already_accepted"
+    print(f"Failed to accept {inv_id}: {r.status} {r.text()}", file=sys.stderr)
+    return "failed"
+
+
+def accept_invites(
+    invites: Iterable[tuple], concurrency: int = DEFAULT_CONCURRENCY, dry_run: bool = False
+) -> Dict[str, List[dict]]:
+    """Accept invitations on a bounded pool while the listing is still being paged.
+
+    Returns {"accepted": [...], "already_accepted": [...], "failed": [...]} (or
+    {"would_accept": [...]} with dry_run), each entry {"id", "repo", "inviter"}
+    in listing order.
+    """
+    report: Dict[str, List[dict]] = {"would_accept": []} if dry_run else {k: [] for k in RESULTS}
+    pending: Deque[Tuple[dict, Future]] = deque()
+
+    def settle(entry: dict, fut: Future) -> None:
+        report[fut.result()].append(entry)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for inv_id, full, inviter, _created in invites:
+            if not inv_id:
+                continue
+            entry = {"id": inv_id, "repo": full, "inviter": inviter}
+            if dry_run:
+                report["would_accept"].append(entry)
+                continue
+            pending.append((entry, pool.submit(accept_invite, inv_id)))
+            # Bound the backlog so a huge listing never queues everything at once
+            while len(pending) > 2 * max(1, concurrency):
+                settle(*pending.popleft())
+        while pending:
+            settle(*pending.popleft())
+    return report
+
+
+def accept_pending(repos: List[str], concurrency: int = DEFAULT_CONCURRENCY, dry_run: bool = False) -> Dict[str, List[dict]]:
+    """Stream-accept every pending invitation for repos.
+
+    Accepting removes invitations from the listing while it is being paged,
+    which shifts later pages, so the listing is walked again until a pass
+    turns up no invitation that has not been tried yet.
+    """
+    report: Dict[str, List[dict]] = {}
+    tried: Set[str] = set()
+
+    def untried() -> Iterator[tuple]:
+        for inv in iter_pending_invites(repos):
+            if inv[0] not in tried:
+                tried.add(inv[0])
+                yield inv
+
+    while True:
+        found = accept_invites(untried(), concurrency=concurrency, dry_run=dry_run)
+        for k, entries in found.items():
+            report.setdefault(k, []).extend(entries)
+        if dry_run or not any(found.values()):
+            return report
 
 
 def report_access(repos: Iterable[str]) -> None:
+    repos = [r for r in repos if r]
+    # One bulk discovery pass; only repos it could not settle are probed individually
+    known = discovery.discover(tuple(r.split("/", 1)) for r in repos)
     print("Repo\tVisibility\tViewerPermission")
     for r in repos:
-        if not r:
+        key = r.lower()
+        if key in known:
+            info = known[key]
+            if info is None:
+                print(f"{r}\tUNKNOWN\tNO_ACCESS_OR_NOT_FOUND")
+            else:
+                print(f"{r}\t{info['visibility']}\t{info['viewerPermission']}")
             continue
-        q = run([
-            "gh",
-            "repo",
-            "view",
-            r,
-            "--json",
-            "visibility,viewerPermission",
-            "-q",
-            f"\"{r}\t\" + .visibility + \"\t\" + (.viewerPermission // \"NONE\")",
-        ])
-        if q.returncode != 0:
+        q = gh_client.client().get(f"/repos/{r}")
+        data = q.json()
+        if not q.ok or not isinstance(data, dict):
             print(f"{r}\tUNKNOWN\tNO_ACCESS_OR_NOT_FOUND")
         else:
-            sys.stdout.write(q.stdout)
+            visibility = (data.get("visibility") or ("private" if data.get("private") else "public")).upper()
+            print(f"{r}\t{visibility}\t{gh_client.permission_name(data.get('permissions'))}")
 
 
 def main():
@@ -133,32 +140,50 @@ def main():
 
     sub.add_parser("list-repos", help="Print normalized OWNER/REPO lines from CSV")
     sub.add_parser("pending", help="List pending invitations among CSV repos")
-    sub.add_parser("accept", help="Accept pending invitations for CSV repos")
+    accept = sub.add_parser("accept", help="Accept pending invitations for CSV repos")
+    accept.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Invitations accepted in parallel (default {DEFAULT_CONCURRENCY})")
+    accept.add_argument("--dry-run", action="store_true", help="List the invitations that would be accepted without accepting them")
+    accept.add_argument("--json", action="store_true", help="Print the result report as JSON")
     sub.add_parser("access", help="Show visibility and your permission for CSV repos")
 
     args = ap.parse_args()
-    repos = extract_repos(args.csv)
-
     if args.cmd == "list-repos":
-        print("\n".join(repos))
+        if not os.path.exists(args.csv):
+            raise FileNotFoundError(f"CSV not found: {args.csv}")
+        for owner_repo in roster.iter_repos(args.csv):
+            print(owner_repo)
         return
+    repos = extract_repos(args.csv)
 
-    if args.cmd in ("pending", "accept"):
+    if args.cmd == "pending":
         pending = list_pending_invites(repos)
-        if args.cmd == "pending":
-            if not pending:
-                print("No pending invitations for repos in CSV.")
-                return
-            print("Pending invites:")
-            for inv_id, full, inviter, created in pending:
-                print(f"- {full} — ID={inv_id}, inviter={inviter}, created={created}")
-            return
-        # accept
         if not pending:
-            print("No pending invitations to accept for repos in CSV.")
+            print("No pending invitations for repos in CSV.")
             return
-        accepted = accept_invites([p[0] for p in pending])
-        print(f"Accepted {accepted} invitation(s).")
+        print("Pending invites:")
+        for inv_id, full, inviter, created in pending:
+            print(f"- {full} — ID={inv_id}, inviter={inviter}, created={created}")
+        return
+
+    if args.cmd == "accept":
+        report = accept_pending(repos, concurrency=args.concurrency, dry_run=args.dry_run)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        elif not any(report.values()):
+            print("No pending invitations to accept for repos in CSV.")
+        elif args.dry_run:
+            for e in report["would_accept"]:
+                print(f"- would accept {e['repo']} — ID={e['id']}, inviter={e['inviter']}")
+            print(f"Would accept {len(report['would_accept'])} invitation(s).")
+        else:
+            for e in report["failed"]:
+                print(f"- failed: {e['repo']} — ID={e['id']}")
+            print(
+                f"Accepted {len(report['accepted'])} invitation(s), "
+                f"{len(report['already_accepted'])} already accepted, {len(report['failed'])} failed."
+            )
+        if report.get("failed"):
+            sys.exit(1)
         return
 
     if args.cmd == "access":
@@ -0,0 +1,185 @@
+"""Leaderboard history: a compact snapshot per build and the trends derived from it.
+
+Each build appends one row per student (rank, score and the 7-day metrics) to
+a SQLite file, plus the student's commits per day over the window it fetched.
+The trends are computed in SQL over the whole table at once: the latest run
+of each day stands for that day, rank changes compare against the previous
+day and a week earlier, and the score's moving average is a window function.
+
+trends() returns what the page needs, column-wise per student so the file
+stays small:
+
+    {"version": 1, "generated_at": "...", "days": ["2025-10-20", ...],
+     "moving_average_days": 7,
+     "students": {"owner/repo": {"rank_change": 2, "rank_change_7d": -1,
+                                 "ranks": [...], "scores": [...],
+                                 "score_avg": [...], "commits": [...]}}}
+
+Arrays are aligned with days; null marks a day without a build. A positive
+rank change means the student moved up.
+"""
+import collections
+import datetime as dt
+import os
+import sqlite3
+from typing import Dict, Iterable, Optional, Tuple
+
+VERSION = 1
+DEFAULT_DAYS = 30
+MOVING_AVERAGE_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    generated_at TEXT NOT NULL UNIQUE,
+    day TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_day ON runs (day);
+CREATE TABLE IF NOT EXISTS snapshots (
+    run INTEGER NOT NULL,
+    repo TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    streak INTEGER NOT NULL,
+    commits_7d INTEGER NOT NULL,
+    commit_days_7d INTEGER NOT NULL,
+    pr_opened_7d INTEGER NOT NULL,
+    pr_merged_7d INTEGER NOT NULL,
+    PRIMARY KEY (run, repo)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS activity (
+    repo TEXT NOT NULL,
+    day TEXT NOT NULL,
+    commits INTEGER NOT NULL,
+    PRIMARY KEY (repo, day)
+) WITHOUT ROWID;
+"""
+
+_METRICS = ("streak", "commits_7d", "commit_days_7d", "pr_opened_7d", "pr_merged_7d")
+
+
+def daily_counts(commits: Iterable[Tuple[str, str, str]]) -> Dict[str, int]:
+    """Commits per UTC day (by committer date) from compact commit records."""
+    return dict(collections.Counter(committed[:10] for _sha, committed, _authored in commits))
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def record(self, data: Dict, activity: Dict[str, Dict[str, int]], covered_from: Optional[str] = None) -> int:
+        """Append a build's leaderboard; returns the run id.
+
+        activity maps repo -> {day: commits}; every day from covered_from (the
+        oldest day the build fetched) to the build's own day is replaced.
+        Recording the same generated_at twice replaces the earlier copy.
+        History is per repo: when roster rows share a repo, its best-ranked
+        row stands for it.
+        """
+        generated_at = data["generated_at"]
+        best: Dict[str, Tuple[Dict, Dict]] = {}
+        for s, row in zip(data["students"], data["leaderboard"]):
+            best.setdefault(s["repo"].lower(), (s, row))
+        with self._db:
+            old = self._db.execute("SELECT id FROM runs WHERE generated_at = ?", (generated_at,)).fetchone()
+            if old is not None:
+                self._db.execute("DELETE FROM snapshots WHERE run = ?", old)
+                self._db.execute("DELETE FROM runs WHERE id = ?", old)
+            run = self._db.execute(
+                "INSERT INTO runs (generated_at, day) VALUES (?, ?)", (generated_at, generated_at[:10])
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run, repo, row["rank"], s["metrics"]["score"], *(s["metrics"].get(m, 0) for m in _METRICS))
+                    for repo, (s, row) in best.items()
+                ),
+            )
+            if covered_from:
+                self._db.executemany(
+                    "DELETE FROM activity WHERE repo = ? AND day BETWEEN ? AND ?",
+                    ((repo.lower(), covered_from, generated_at[:10]) for repo in activity),
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO activity VALUES (?, ?, ?)",
+                ((repo.lower(), day, n) for repo, days in activity.items() for day, n in days.items()),
+            )
+        return run
+
+    def trends(self, days: int = DEFAULT_DAYS, ma_days: int = MOVING_AVERAGE_DAYS) -> Dict:
+        """Per-student series over the last `days` days up to the newest run."""
+        latest = self._db.execute("SELECT id, generated_at, day FROM runs ORDER BY generated_at DESC LIMIT 1").fetchone()
+        if latest is None:
+            return {"version": VERSION, "generated_at": None, "days": [], "moving_average_days": ma_days, "students": {}}
+        run, generated_at, today = latest
+        end = dt.date.fromisoformat(today)
+        day_list = [(end - dt.timedelta(days=n)).isoformat() for n in range(days - 1, -1, -1)]
+        slot = {d: i for i, d in enumerate(day_list)}
+        start = day_list[0]
+        # The average for the first day shown needs the days before it too
+        lead_in = (end - dt.timedelta(days=days + ma_days)).isoformat()
+
+        students: Dict[str, Dict] = {}
+        for repo, prev, week in self._db.execute(
+            """
+            SELECT c.repo, p.rank - c.rank, w.rank - c.rank
+            FROM snapshots c
+            LEFT JOIN snapshots p ON p.repo = c.repo
+                AND p.run = (SELECT id FROM runs WHERE day < :today ORDER BY generated_at DESC LIMIT 1)
+            LEFT JOIN snapshots w ON w.repo = c.repo
+                AND w.run = (SELECT id FROM runs WHERE day <= date(:today, '-7 days') ORDER BY generated_at DESC LIMIT 1)
+            WHERE c.run = :run
+            """,
+            {"run": run, "today": today},
+        ):
+            students[repo] = {
+                "rank_change": prev,
+                "rank_change_7d": week,
+                "ranks": [None] * days,
+                "scores": [None] * days,
+                "score_avg": [None] * days,
+                "commits": [0] * days,
+            }
+
+        # ma_days is an int; frame bounds cannot be bound parameters
+        for repo, day, rank, score, avg in self._db.execute(
+            f"""
+            WITH daily AS (
+                SELECT day, id AS run FROM runs r
+                WHERE day BETWEEN ? AND ? AND generated_at = (SELECT MAX(generated_at) FROM runs WHERE day = r.day)
+            )
+            SELECT s.repo, d.day, s.rank, s.score,
+                   AVG(s.score) OVER (
+                       PARTITION BY s.repo ORDER BY julianday(d.day)
+                       RANGE BETWEEN {int(ma_days) - 1} PRECEDING AND CURRENT ROW
+                   )
+            FROM daily d JOIN snapshots s ON s.run = d.run
+            """,
+            (lead_in, today),
+        ):
+            series = students.get(repo)
+            i = slot.get(day)
+            if series is None or i is None:
+                continue
+            series["ranks"][i] = rank
+            series["scores"][i] = score
+            series["score_avg"][i] = round(avg, 2)
+
+        for repo, day, n in self._db.execute("SELECT repo, day, commits FROM activity WHERE day >= ? AND day <= ?", (start, today)):
+            series = students.get(repo)
+            if series is not None:
+                series["commits"][slot[day]] = n
+
+        return {
+            "version": VERSION,
+            "generated_at": generated_at,
+            "days": day_list,
+            "moving_average_days": ma_days,
+            "students": students,
+        }
+
+    def close(self) -> None:
+        self._db.close()
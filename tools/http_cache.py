@@ -0,0 +1,114 @@
+"""Persistent HTTP response cache for conditional GitHub requests.
+
+Stores the body, headers, ETag and Last-Modified of successful GET responses
+in a SQLite file. The next request for the same URL is sent with
+If-None-Match / If-Modified-Since; a 304 reply is served from the cache and
+does not count against GitHub's primary rate limit.
+
+Entries that have not been (re)validated within the TTL are dropped, and the
+least recently used entries are evicted once the stored bodies exceed
+max_bytes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+PRUNE_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+)
+"""
+
+
+class ResponseCache:
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"revalidated": 0, "fetched": 0, "stored": 0, "evicted": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection shared by all worker threads, serialised by a lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._puts = 0
+        with self._lock, self._db:
+            self._db.execute(_SCHEMA)
+        self.prune()
+
+    def lookup(self, key: str) -> Optional[Tuple[Dict[str, str], Dict[str, str], bytes]]:
+        """Return (validator headers, cached headers, body) for a live entry, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body, stored_at = row
+        if time.time() - stored_at > self.ttl:
+            return None
+        validators = {}
+        if etag:
+            validators["If-None-Match"] = etag
+        if last_modified:
+            validators["If-Modified-Since"] = last_modified
+        return validators, json.loads(headers), bytes(body)
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated (a 304 confirmed it is still current)."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("UPDATE responses SET stored_at = ?, used_at = ? WHERE key = ?", (now, now, key))
+            self.stats["revalidated"] += 1
+
+    def store(self, key: str, headers: Dict[str, str], body: bytes) -> None:
+        """Remember a 200 response if it carries a validator."""
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        now = time.time()
+        with self._lock, self._db:
+            self.stats["fetched"] += 1
+            if not etag and not last_modified:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, json.dumps(headers), body, len(body), now, now),
+            )
+            self.stats["stored"] += 1
+            self._puts += 1
+            due = self._puts % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired entries, then evict least recently used ones over the size cap."""
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+            evicted = cur.rowcount
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall():
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    evicted += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            self.stats["evicted"] += max(evicted, 0)
+
+    def close(self) -> None:
+        self.prune()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,439 @@
+"""Long-running leaderboard service fed by GitHub webhooks.
+
+After one normal build, every student's raw activity (commit records, PR
+timestamps) stays in memory. GitHub push and pull_request webhook payloads,
+POSTed to a local endpoint or replayed from a JSONL file, then update only the
+student(s) whose repo the event is about:
+
+- push to the default branch: the payload's commits are merged into the
+  student's records (no API call); forced or truncated pushes refetch that
+  one repo;
+- pull_request opened/reopened or merged: the PR's timestamp is added when
+  the PR author is the student.
+
+The updated student moves to its new place in a ranking.RankedIndex, and
+leaderboard.json (plus the split files) is rewritten atomically at most once
+per debounce interval. A periodic rescore re-ages every window as time passes,
+also without API calls.
+
+Replay files hold one delivery per line:
+
+    {"event": "push", "payload": {...}}
+"""
+import datetime as dt
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import attribution
+import build_leaderboard
+import publish
+import ranking
+import roster
+import scoring
+
+# GitHub lists at most this many commits in a push payload
+PUSH_COMMIT_LIMIT = 2048
+DEFAULT_DEBOUNCE = 5.0
+DEFAULT_RESCORE_EVERY = 300.0
+
+def _utc(timestamp: str) -> str:
+    """Webhook timestamps carry the committer's offset; the records use UTC."""
+    t = dt.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return build_leaderboard.iso(t if t.tzinfo else t.replace(tzinfo=dt.timezone.utc))
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check an X-Hub-Signature-256 header."""
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return bool(signature) and hmac.compare_digest(expected, signature)
+
+
+class _Entry:
+    """One scored roster row: its target, raw activity and the student dict written out."""
+
+    __slots__ = ("target", "raw", "student", "rid")
+
+    def __init__(self, target: roster.Target, raw: Dict, student: Dict, rid: int):
+        self.target = target
+        self.raw = raw
+        self.student = student
+        # Id in the RankedIndex
+        self.rid = rid
+
+
+class LeaderboardService:
+    def __init__(
+        self,
+        build: Dict,
+        sunk: Iterable[Tuple[roster.Target, Dict, Dict]],
+        out_path: str,
+        days_window: int = 7,
+        windows: Iterable[int] = (),
+        attribute: bool = False,
+        debounce: float = DEFAULT_DEBOUNCE,
+        split: bool = True,
+        shard_size: int = publish.SHARD_SIZE,
+        profile: scoring.Profile = scoring.DEFAULT,
+        clock: Callable[[], dt.datetime] = lambda: dt.datetime.now(dt.timezone.utc).replace(microsecond=0),
+    ):
+        """build: build_from_csv's result; sunk: the (target, raw, student) triples its raw_sink saw."""
+        self.out_path = out_path
+        self.days_window = days_window
+        self.windows = sorted(set(windows))
+        self.debounce = debounce
+        self.split = split
+        self.shard_size = shard_size
+        self.profile = profile
+        self.clock = clock
+        self.skipped = build.get("skipped", [])
+
+        # Seeded in the build's order, so equal keys keep their places
+        self.ranking = ranking.RankedIndex(build["students"])
+        position = {id(s): i for i, s in enumerate(build["students"])}
+        self.entries = [_Entry(t, raw, student, position[id(student)]) for t, raw, student in sunk]
+        self.by_repo: Dict[str, List[_Entry]] = {}
+        for e in self.entries:
+            self.by_repo.setdefault(f"{e.target.owner}/{e.target.repo}".lower(), []).append(e)
+        # Attribution ids are positions in self.entries
+        self.attribution = attribution.Attribution((e.target.login, e.target.name) for e in self.entries) if attribute else None
+        self.sid = {id(e): i for i, e in enumerate(self.entries)}
+
+        self.lock = threading.RLock()
+        self.dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refetch")
+        self._calls = ThreadPoolExecutor(max_workers=8, thread_name_prefix="call")
+        self.stats = {"events": 0, "applied": 0, "ignored": 0, "refetches": 0, "flushes": 0}
+
+    # -- scoring -----------------------------------------------------------
+
+    def _windows(self, now: dt.datetime) -> Tuple[dt.datetime, dt.datetime, dt.datetime]:
+        since7 = now - dt.timedelta(days=self.days_window)
+        since30 = now - dt.timedelta(days=30)
+        horizon = now - dt.timedelta(days=max([30, self.days_window, *self.windows]))
+        return since7, since30, horizon
+
+    def _rescore(self, e: _Entry, now: dt.datetime) -> bool:
+        """Recompute one student's metrics and move it in the ranking; True if anything changed."""
+        since7, since30, horizon = self._windows(now)
+        raw = build_leaderboard.reaged(e.raw, since7.date().isoformat())
+        # Commits older than every window can never count again
+        cutoff = build_leaderboard.iso(horizon)
+        raw["commits"] = [r for r in raw["commits"] if r[1] >= cutoff]
+        e.raw = raw
+        metrics, badges = build_leaderboard.compute_metrics(raw, now, since7, since30, self.windows, self.profile)
+        if metrics == e.student["metrics"] and badges == e.student["badges"]:
+            return False
+        e.student["metrics"] = metrics
+        e.student["badges"] = badges
+        self.ranking.update(e.rid)
+        return True
+
+    def rescore_all(self) -> int:
+        """Re-age every student to the current time; returns how many changed."""
+        with self.lock:
+            now = self.clock()
+            changed = sum(1 for e in self.entries if self._rescore(e, now))
+            if changed:
+                self._changed()
+            return changed
+
+    # -- events --------------------------------------------------------------
+
+    def handle(self, event: str, payload: Dict) -> Dict:
+        """Apply one webhook delivery; returns a small status document."""
+        with self.lock:
+            self.stats["events"] += 1
+            repo = (payload.get("repository") or {}).get("full_name") or ""
+            entries = self.by_repo.get(repo.lower())
+            if event == "push" and entries:
+                status = self._on_push(entries, payload)
+            elif event == "pull_request" and entries:
+                status = self._on_pull_request(entries, payload)
+            elif event == "ping":
+                status = "pong"
+            else:
+                status = "ignored"
+            self.stats["applied" if status in ("updated", "refetching") else "ignored"] += 1
+            return {"event": event, "repo": repo, "status": status}
+
+    def _on_push(self, entries: List[_Entry], payload: Dict) -> str:
+        repository = payload.get("repository") or {}
+        default = repository.get("default_branch") or repository.get("master_branch")
+        if default and payload.get("ref") != f"refs/heads/{default}":
+            return "not default branch"
+        commits = [c for c in payload.get("commits") or [] if c.get("id") and c.get("timestamp")]
+        if payload.get("forced") or len(commits) >= PUSH_COMMIT_LIMIT:
+            # History was rewritten or the payload is truncated: ask GitHub for this repo only
+            self.stats["refetches"] += 1
+            self._pool.submit(self._refetch, entries)
+            return "refetching"
+        now = self.clock()
+        changed = False
+        for e in entries:
+            known = {r[0] for r in e.raw["commits"]}
+            fresh = [c for c in commits if c["id"] not in known]
+            if not fresh:
+                continue
+            mine = fresh
+            if self.attribution is not None:
+                sid = self.sid[id(e)]
+                mine = [c for c in fresh if self.attribution.belongs(attribution.webhook_identity(c), sid)]
+            records = [(c["id"], _utc(c["timestamp"]), _utc(c["timestamp"])) for c in mine]
+            e.raw = dict(
+                e.raw,
+                commits=e.raw["commits"] + records,
+                commits_all_time=e.raw["commits_all_time"] + len(fresh),
+            )
+            changed = self._rescore(e, now) or changed
+        if changed:
+            self._changed()
+        return "updated" if changed else "no change"
+
+    def _on_pull_request(self, entries: List[_Entry], payload: Dict) -> str:
+        pr = payload.get("pull_request") or {}
+        action = payload.get("action")
+        author = ((pr.get("user") or {}).get("login") or "").lower()
+        if action in ("opened", "reopened"):
+            field, stamp = "pr_opened", pr.get("created_at")
+        elif action == "closed" and pr.get("merged"):
+            field, stamp = "pr_merged", pr.get("merged_at")
+        else:
+            return "ignored"
+        if not stamp:
+            return "ignored"
+        now = self.clock()
+        since_date = self._windows(now)[0].date().isoformat()
+        if stamp[:10] < since_date:
+            return "no change"
+        changed = False
+        for e in entries:
+            if e.target.login.lower() != author:
+                continue
+            dates = e.raw.get(f"{field}_at")
+            if dates is None:
+                # Only the count is known; a reopened PR was counted when it was opened
+                if action == "reopened":
+                    continue
+                e.raw = dict(e.raw, **{f"{field}_7d": e.raw[f"{field}_7d"] + 1})
+            elif stamp in dates:
+                continue
+            else:
+                e.raw = dict(e.raw, **{f"{field}_at": dates + [stamp]})
+            changed = self._rescore(e, now) or changed
+        if changed:
+            self._changed()
+        return "updated" if changed else "no change"
+
+    def _refetch(self, entries: List[_Entry]) -> None:
+        now = self.clock()
+        since7, _since30, horizon = self._windows(now)
+        for e in entries:
+            t = e.target
+            select = self.attribution.selector(self.sid[id(e)]) if self.attribution is not None else None
+            try:
+                raw = build_leaderboard.collect_rest(t.owner, t.repo, t.login, since7, horizon, self._calls, select=select)
+            except Exception as exc:  # keep serving on a failed refetch
+                print(f"Refetch of {t.owner}/{t.repo} failed: {exc}", file=sys.stderr)
+                continue
+            if raw is None or raw.get("failed"):
+                continue
+            with self.lock:
+                e.raw = raw
+                if self._rescore(e, self.clock()):
+                    self._changed()
+
+    def replay(self, path: str) -> int:
+        """Apply every delivery of a JSONL file in order; returns how many were read."""
+        n = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                self.handle(item.get("event") or item.get("name") or "", item.get("payload") or {})
+                n += 1
+        return n
+
+    # -- output --------------------------------------------------------------
+
+    def _changed(self) -> None:
+        self.dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def data(self) -> Dict:
+        """The current leaderboard document, as build_from_csv would return it."""
+        with self.lock:
+            return {
+                "generated_at": build_leaderboard.iso(self.clock()),
+                "window_days": self.days_window,
+                "students": list(self.ranking),
+                "leaderboard": self.ranking.rows(),
+                "skipped": self.skipped,
+            }
+
+    def flush(self) -> bool:
+        """Write the leaderboard if anything changed since the last write."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return False
+            publish.write_leaderboard(self.data(), self.out_path, self.split, self.shard_size)
+            self.dirty = False
+            self.stats["flushes"] += 1
+            return True
+
+    def top(self, k: int = 10) -> List[Dict]:
+        """The first k leaderboard rows."""
+        with self.lock:
+            return self.ranking.rows(0, k)
+
+    def standing(self, repo: str, n: int = 2) -> Optional[Dict]:
+        """A repo's rank and the rows around it (n either side); None if it is not on the board."""
+        with self.lock:
+            entries = self.by_repo.get(repo.lower())
+            if not entries:
+                return None
+            rid = entries[0].rid
+            p = self.ranking.position(rid)
+            start = max(0, p - n)
+            return {"repo": entries[0].student["repo"], "rank": self.ranking.rank(rid), "position": p + 1, "around": self.ranking.rows(start, p + n + 1)}
+
+    def status(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, students=len(self.entries), pending=self.dirty)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self._calls.shutdown(wait=True)
+        self.flush()
+
+    # -- HTTP ----------------------------------------------------------------
+
+    def serve(self, host: str, port: int, secret: Optional[str] = None, rescore_every: float = DEFAULT_RESCORE_EVERY) -> None:
+        """Accept webhooks on POST (any path) until interrupted.
+
+        GET /healthz reports status, /top?k=10 the first rows and
+        /rank?repo=owner/name&around=2 a repo's rank with its neighbours.
+        """
+        server = ThreadingHTTPServer((host, port), make_handler(self, secret))
+        server.daemon_threads = True
+        stop = threading.Event()
+
+        def rescorer() -> None:
+            while not stop.wait(rescore_every):
+                self.rescore_all()
+
+        threading.Thread(target=rescorer, daemon=True).start()
+        print(f"Listening for GitHub webhooks on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            server.server_close()
+            self.close()
+
+
+def make_handler(service: LeaderboardService, secret: Optional[str]):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            if build_leaderboard.VERBOSE:
+                super().log_message(*args)
+
+        def _reply(self, status: int, doc: Dict) -> None:
+            body = json.dumps(doc).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            path = url.path.rstrip("/")
+            try:
+                if path in ("", "/healthz"):
+                    self._reply(200, service.status())
+                elif path == "/top":
+                    self._reply(200, {"leaderboard": service.top(int(query.get("k", 10)))})
+                elif path == "/rank":
+                    found = service.standing(query.get("repo", ""), int(query.get("around", 2)))
+                    self._reply(200 if found else 404, found or {"error": "repo not on the leaderboard"})
+                else:
+                    self._reply(404, {"error": "not found"})
+            except ValueError:
+                self._reply(400, {"error": "k and around must be integers"})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if secret and not verify_signature(secret, body, self.headers.get("X-Hub-Signature-256")):
+                self._reply(401, {"error": "bad signature"})
+                return
+            try:
+                if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                    body = urllib.parse.parse_qs(body.decode("utf-8")).get("payload", [""])[0].encode("utf-8")
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self._reply(400, {"error": "payload is not JSON"})
+                return
+            self._reply(202, service.handle(self.headers.get("X-GitHub-Event") or "", payload))
+
+    return Handler
+
+
+def parse_listen(value: str) -> Tuple[str, int]:
+    """'8080' or 'host:8080'."""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def run(
+    build: Dict,
+    sunk: List[Tuple[roster.Target, Dict, Dict]],
+    args,
+    profile: scoring.Profile = scoring.DEFAULT,
+    clock: Optional[Callable[[], dt.datetime]] = None,
+) -> None:
+    """The --serve / --events part of build_leaderboard's main."""
+    extra = {"clock": clock} if clock is not None else {}
+    service = LeaderboardService(
+        build,
+        sunk,
+        args.out,
+        days_window=args.days,
+        windows=args.windows,
+        attribute=args.attribute,
+        debounce=args.debounce,
+        split=args.split,
+        shard_size=args.shard_size,
+        profile=profile,
+        **extra,
+    )
+    if args.events:
+        started = time.perf_counter()
+        n = service.replay(args.events)
+        service.flush()
+        print(f"Replayed {n} webhook deliveries in {time.perf_counter() - started:.3f}s: {service.status()}")
+    if args.serve:
+        host, port = parse_listen(args.serve)
+        secret = args.webhook_secret or os.getenv("LEADERBOARD_WEBHOOK_SECRET")
+        service.serve(host, port, secret, args.rescore_every)
+    else:
+        service.close()
@@ -0,0 +1,141 @@
+"""Split leaderboard output for fast first paint.
+
+Next to the full leaderboard.json, the builder writes:
+
+    leaderboard.summary.json      minified: ranked rows (name, repo, score, rank,
+                                  urls) plus totals; enough to render the list
+    leaderboard.details/N.json    metrics and badges of the students ranked
+                                  N*shard_size .. (N+1)*shard_size-1, fetched
+                                  as their rows scroll into view
+
+Every file also gets a precompressed .gz sibling (and .br when the optional
+brotli package is installed) for hosts that serve those directly. With
+split=False only the full file is written, and split files from an earlier
+run are removed so the page does not keep rendering them.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional
+    brotli = None
+
+SHARD_SIZE = 50
+SUMMARY_VERSION = 1
+
+
+def _write(path: str, payload: bytes) -> None:
+    """Write atomically so a deploy never picks up a half-written file."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        # mkstemp creates 0600; these are served to the world
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_file(path: str, payload: bytes, compress: bool = True) -> List[str]:
+    """Write payload plus its precompressed siblings; returns the paths written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _write(path, payload)
+    written = [path]
+    if compress:
+        # mtime=0 keeps the .gz byte-identical across runs with the same data
+        _write(f"{path}.gz", gzip.compress(payload, compresslevel=9, mtime=0))
+        written.append(f"{path}.gz")
+        if brotli is not None:
+            _write(f"{path}.br", brotli.compress(payload))
+            written.append(f"{path}.br")
+    return written
+
+
+def minified(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def summary(data: Dict, shard_size: int = SHARD_SIZE, details: Optional[str] = None) -> Dict:
+    """The first-paint payload: ranked rows and aggregate totals, no metrics."""
+    students = data["students"]
+    rows = []
+    for s, row in zip(students, data["leaderboard"]):
+        rows.append(dict(row, urls=s.get("urls") or {}))
+    return {
+        "version": SUMMARY_VERSION,
+        "generated_at": data.get("generated_at"),
+        "window_days": data.get("window_days"),
+        "totals": {
+            "students": len(students),
+            "commits_7d": sum(s["metrics"].get("commits_7d", 0) for s in students),
+            "pr_merged_7d": sum(s["metrics"].get("pr_merged_7d", 0) for s in students),
+        },
+        "details": details,
+        "shard_size": shard_size,
+        "leaderboard": rows,
+    }
+
+
+def shards(data: Dict, shard_size: int = SHARD_SIZE) -> List[Dict]:
+    """Per-student details in rank order, shard_size students per shard."""
+    details = [
+        {"repo": s["repo"], "metrics": s["metrics"], "badges": s.get("badges") or []}
+        for s in data["students"]
+    ]
+    return [{"students": details[i:i + shard_size]} for i in range(0, len(details), shard_size)] or [{"students": []}]
+
+
+def write_split(data: Dict, out_path: str, shard_size: int = SHARD_SIZE, compress: bool = True) -> List[str]:
+    """Write the summary and detail shards beside out_path; returns the paths written."""
+    stem, _ext = os.path.splitext(out_path)
+    details_dir = f"{stem}.details"
+    written: List[str] = []
+    for n, shard in enumerate(shards(data, shard_size)):
+        written += write_file(os.path.join(details_dir, f"{n}.json"), minified(shard), compress)
+    # Drop shards left over from a bigger roster
+    keep = set(written)
+    for name in os.listdir(details_dir):
+        path = os.path.join(details_dir, name)
+        if path not in keep and os.path.isfile(path):
+            os.unlink(path)
+    summary_doc = summary(data, shard_size, os.path.basename(details_dir))
+    written += write_file(f"{stem}.summary.json", minified(summary_doc), compress)
+    return written
+
+
+def remove_split(out_path: str) -> List[str]:
+    """Delete what a split write left beside out_path (summary, shards, compressed copies); returns the paths removed."""
+    stem, _ext = os.path.splitext(out_path)
+    removed = [
+        path
+        for path in [f"{out_path}.gz", f"{out_path}.br", *(f"{stem}.summary.json{ext}" for ext in ("", ".gz", ".br"))]
+        if os.path.isfile(path)
+    ]
+    for path in removed:
+        os.unlink(path)
+    details_dir = f"{stem}.details"
+    if os.path.isdir(details_dir):
+        shutil.rmtree(details_dir)
+        removed.append(details_dir)
+    return removed
+
+
+def write_leaderboard(data: Dict, out_path: str, split: bool = True, shard_size: int = SHARD_SIZE) -> List[str]:
+    """Write the full leaderboard JSON and, with split, everything else above; returns the paths written."""
+    # The full file stays for other consumers; the page renders from the split files
+    full = json.dumps(data, indent=2).encode("utf-8")
+    if not split:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        _write(out_path, full)
+        # The page prefers the summary, so a stale one would hide this data
+        remove_split(out_path)
+        return [out_path]
+    return write_file(out_path, full) + write_split(data, out_path, max(1, shard_size))
@@ -0,0 +1,202 @@
+"""Leaderboard ordering that can be updated one student at a time.
+
+Students are ordered by score, then streak, then name (case-insensitive),
+with the order they were added as the final tie-break, so a one-shot build
+gives exactly what a stable sort would. Equal scores share a rank and the
+next score skips ahead ("competition" ranking: 1, 2, 2, 4).
+
+RankedIndex keeps the sort keys in a bucketed sorted list: runs of at most
+2 * LOAD keys, the last key of each run for choosing a bucket, and a Fenwick
+tree over the run lengths for positions. A score change is a binary search
+over the runs plus a delete/insert inside one bounded run, and a position (so
+a rank: the first key with the same score) is one binary search and a prefix
+sum, both O(log n). Runs are split when they double and dropped when empty;
+only then is the O(n / LOAD) run index rebuilt. Nothing is ever re-sorted.
+"""
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# (-score, -streak, lowercased name, insertion id)
+Key = Tuple[int, int, str, int]
+
+
+def rank_key(s: Dict) -> Tuple[int, int, str]:
+    """Leaderboard order: score, then streak, then name."""
+    return (-s["metrics"]["score"], -s["metrics"]["streak"], s["name"].lower())
+
+
+def row(s: Dict, rank: int) -> Dict:
+    """One leaderboard row."""
+    return {"name": s["name"], "repo": s["repo"], "score": s["metrics"]["score"], "rank": rank}
+
+
+class RankedIndex:
+    # Target run length; runs split at twice this
+    LOAD = 512
+
+    def __init__(self, students: Iterable[Dict] = ()):
+        """students: initial student dicts (name, repo, metrics); their ids are 0, 1, ..."""
+        self._students: Dict[int, Dict] = {}
+        self._keys: Dict[int, Key] = {}
+        for s in students:
+            sid = len(self._students)
+            self._students[sid] = s
+            self._keys[sid] = rank_key(s) + (sid,)
+        order = sorted(self._keys.values())
+        self._runs: List[List[Key]] = [order[i:i + self.LOAD] for i in range(0, len(order), self.LOAD)]
+        self._reindex()
+        self._next = len(self._students)
+
+    # -- bucketed sorted list ------------------------------------------------
+
+    def _reindex(self) -> None:
+        """Rebuild the run maxima and the Fenwick tree of run lengths."""
+        self._maxes: List[Key] = [run[-1] for run in self._runs]
+        tree = [0] + [len(run) for run in self._runs]
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _grow(self, r: int, delta: int) -> None:
+        i = r + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, r: int) -> int:
+        """Number of keys in the runs before run r."""
+        total = 0
+        while r:
+            total += self._tree[r]
+            r -= r & -r
+        return total
+
+    def _locate(self, pos: int) -> Tuple[int, int]:
+        """(run, offset) of the key at position pos."""
+        r = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            if r + step < len(self._tree) and self._tree[r + step] <= pos:
+                r += step
+                pos -= self._tree[r]
+            step >>= 1
+        return r, pos
+
+    def _insert(self, key: Key) -> None:
+        if not self._runs:
+            self._runs.append([key])
+            self._reindex()
+            return
+        r = min(bisect.bisect_left(self._maxes, key), len(self._runs) - 1)
+        run = self._runs[r]
+        bisect.insort(run, key)
+        self._maxes[r] = run[-1]
+        if len(run) > 2 * self.LOAD:
+            self._runs[r:r + 1] = [run[:self.LOAD], run[self.LOAD:]]
+            self._reindex()
+        else:
+            self._grow(r, 1)
+
+    def _delete(self, key: Key) -> None:
+        r = bisect.bisect_left(self._maxes, key)
+        run = self._runs[r]
+        del run[bisect.bisect_left(run, key)]
+        if run:
+            self._maxes[r] = run[-1]
+            self._grow(r, -1)
+        else:
+            del self._runs[r]
+            self._reindex()
+
+    def _index(self, key: Tuple) -> int:
+        """Number of keys sorting before key."""
+        r = bisect.bisect_left(self._maxes, key)
+        if r == len(self._runs):
+            return len(self._keys)
+        return self._before(r) + bisect.bisect_left(self._runs[r], key)
+
+    def _slice(self, start: int, stop: Optional[int]) -> List[Key]:
+        start, stop, _ = slice(start, stop).indices(len(self._keys))
+        keys: List[Key] = []
+        if start >= stop:
+            return keys
+        r, i = self._locate(start)
+        need = stop - start
+        while need > 0:
+            part = self._runs[r][i:i + need]
+            keys += part
+            need -= len(part)
+            r += 1
+            i = 0
+        return keys
+
+    # -- leaderboard ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Students in leaderboard order."""
+        return (self._students[k[-1]] for run in self._runs for k in run)
+
+    def add(self, student: Dict) -> int:
+        """Insert a student; returns its id."""
+        sid = self._next
+        self._next += 1
+        self._students[sid] = student
+        self._keys[sid] = key = rank_key(student) + (sid,)
+        self._insert(key)
+        return sid
+
+    def remove(self, sid: int) -> Dict:
+        self._delete(self._keys.pop(sid))
+        return self._students.pop(sid)
+
+    def update(self, sid: int) -> bool:
+        """Re-place a student after its metrics (or name) changed; True if it moved."""
+        old = self._keys[sid]
+        new = rank_key(self._students[sid]) + (sid,)
+        if new == old:
+            return False
+        self._delete(old)
+        self._insert(new)
+        self._keys[sid] = new
+        return True
+
+    def student(self, sid: int) -> Dict:
+        return self._students[sid]
+
+    def position(self, sid: int) -> int:
+        """0-based place in leaderboard order."""
+        return self._index(self._keys[sid])
+
+    def rank_of_score(self, score: int) -> int:
+        """The rank a student with this score has (or would have)."""
+        return self._index((-score,)) + 1
+
+    def rank(self, sid: int) -> int:
+        return self.rank_of_score(-self._keys[sid][0])
+
+    def top(self, k: int) -> List[Dict]:
+        return [self._students[key[-1]] for key in self._slice(0, max(0, k))]
+
+    def around(self, sid: int, n: int = 2) -> List[Dict]:
+        """The student with up to n neighbours on either side, in order."""
+        p = self.position(sid)
+        return [self._students[key[-1]] for key in self._slice(max(0, p - n), p + n + 1)]
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Leaderboard rows (name, repo, score, rank) for positions start..stop-1."""
+        keys = self._slice(start, stop)
+        out: List[Dict] = []
+        rank = 0
+        last = None
+        for i, key in enumerate(keys, start):
+            if key[0] != last:
+                # The first row of a slice may be mid-tie; later ties follow from position
+                rank = self.rank_of_score(-key[0]) if last is None else i + 1
+                last = key[0]
+            out.append(row(self._students[key[-1]], rank))
+        return out
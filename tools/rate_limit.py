@@ -0,0 +1,146 @@
+"""Rate-limit-aware request scheduling for the GitHub client.
+
+GitHub meters the core REST API, the search API and GraphQL as separate
+buckets and reports each one's budget in X-RateLimit-* headers. The
+scheduler tracks those per bucket and paces requests so a large run drains
+a bucket evenly instead of hitting zero. It retries secondary rate limits,
+exhausted primary limits, 5xx replies and dropped connections with jittered
+exponential backoff. Time spent waiting is recorded for the run summary.
+"""
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Start spreading requests out once a bucket is down to this share of its limit
+PACE_BELOW = 0.2
+RETRYABLE_STATUS = (0, 500, 502, 503, 504)
+
+
+class Bucket:
+    def __init__(self, name: str):
+        self.name = name
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+        self.next_slot = 0.0
+        self.throttled = 0.0
+
+
+class Scheduler:
+    def __init__(self, sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.time):
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.buckets: Dict[str, Bucket] = {}
+        self.retries = 0
+        self.failures: List[str] = []
+
+    def bucket(self, name: str) -> Bucket:
+        with self._lock:
+            b = self.buckets.get(name)
+            if b is None:
+                b = self.buckets[name] = Bucket(name)
+            return b
+
+    def _wait(self, b: Bucket, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            b.throttled += seconds
+        self._sleep(seconds)
+
+    def acquire(self, b: Bucket) -> None:
+        """Block until bucket b may send another request."""
+        with self._lock:
+            now = self._clock()
+            if b.reset is not None and now >= b.reset:
+                # Window rolled over; wait for the next response to learn the new budget
+                b.remaining = b.reset = None
+            wait = 0.0
+            if b.remaining is not None and b.reset is not None:
+                if b.remaining <= 0:
+                    wait = b.reset - now + 1
+                elif b.limit and b.remaining < b.limit * PACE_BELOW:
+                    # Spread what is left evenly over the rest of the window
+                    interval = (b.reset - now) / b.remaining
+                    slot = max(now, b.next_slot)
+                    b.next_slot = slot + interval
+                    wait = slot - now
+                # Count in-flight requests against the budget before replies arrive
+                b.remaining -= 1
+        self._wait(b, wait)
+
+    def update(self, b: Bucket, headers: Dict[str, str]) -> None:
+        """Record the budget reported by a response."""
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            b.remaining = remaining
+            b.reset = reset
+            if headers.get("x-ratelimit-limit", "").isdigit():
+                b.limit = int(headers["x-ratelimit-limit"])
+
+    def backoff(self, resp, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying resp, or None if it should not be retried."""
+        retry_after = resp.headers.get("retry-after", "")
+        limited = resp.status in (403, 429) and (
+            retry_after or resp.headers.get("x-ratelimit-remaining") == "0" or b"rate limit" in resp.body.lower()
+        )
+        # GraphQL reports an exhausted budget inside a 200 response
+        if resp.status == 200 and b'"RATE_LIMITED"' in resp.body:
+            limited = True
+        if not limited and resp.status not in RETRYABLE_STATUS:
+            return None
+        if retry_after.isdigit():
+            return float(retry_after)
+        if resp.headers.get("x-ratelimit-remaining") == "0" and resp.headers.get("x-ratelimit-reset"):
+            try:
+                return max(0.0, float(resp.headers["x-ratelimit-reset"]) - self._clock()) + 1
+            except ValueError:
+                pass
+        # Full jitter keeps parallel workers from retrying in lockstep
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def run(self, bucket_name: str, label: str, send: Callable[[], object]):
+        """Send a request through bucket bucket_name, retrying transient failures."""
+        b = self.bucket(bucket_name)
+        attempt = 0
+        while True:
+            self.acquire(b)
+            resp = send()
+            self.update(b, resp.headers)
+            delay = self.backoff(resp, attempt)
+            if delay is None:
+                return resp
+            if attempt >= MAX_RETRIES:
+                with self._lock:
+                    self.failures.append(f"{label} -> {resp.status}")
+                return resp
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            self._wait(b, delay)
+
+    def summary(self) -> str:
+        """One line for the end-of-run report."""
+        total = sum(b.throttled for b in self.buckets.values())
+        parts = ", ".join(f"{b.name} {b.throttled:.1f}s" for b in self.buckets.values() if b.throttled)
+        line = f"Rate limits: {total:.1f}s spent waiting (summed over workers)"
+        if parts:
+            line += f" ({parts})"
+        return line + f", {self.retries} retries, {len(self.failures)} failed requests"
+
+
+def bucket_for(url: str, graphql_url: str) -> str:
+    if url.startswith(graphql_url):
+        return "graphql"
+    if "/search/" in url:
+        return "search"
+    return "core"
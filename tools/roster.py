@@ -0,0 +1,128 @@
+"""Roster CSV ingestion shared by the tools.
+
+Rows are streamed straight off the file, never loaded as a whole, so a
+roster of any size is read in constant memory (.gz files are decompressed
+on the fly). Header names are normalised (case, spaces/underscores, stray
+commas) and matched against ALIASES once per file; each row then only picks
+values out by column index. Repo URLs go through one memoised normaliser.
+"""
+import csv
+import gzip
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, TypeVar
+
+# Normalised header names for each field, in priority order. A row takes the
+# first non-empty value among the columns present.
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    "name": ("name",),
+    "github": ("github url", "github", "repo url", "repository url", "repo"),
+    "app_url": ("app url",),
+    "login": ("github username", "github user", "username"),
+}
+
+_HEADER_SPACE = re.compile(r"[\s_]+")
+_GITHUB_URL = re.compile(r"github\.com/([^/]+)/([^/#?]+)", re.I)
+_OWNER_REPO = re.compile(r"^([^/]+)/([^/]+)$")
+
+T = TypeVar("T")
+
+
+class Row(NamedTuple):
+    name: str
+    github: str
+    app_url: str
+    login: str
+
+
+class Target(NamedTuple):
+    """A roster row with a parseable repo. login is the CSV override, else the repo owner."""
+
+    name: str
+    owner: str
+    repo: str
+    login: str
+    app_url: str
+
+
+def clean_header(name: str) -> str:
+    return _HEADER_SPACE.sub(" ", name.strip().strip(",").lower())
+
+
+def open_text(path: str) -> TextIO:
+    """Open a CSV for reading, transparently decompressing gzip."""
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
+
+
+def _columns(header: List[str]) -> List[List[int]]:
+    cleaned = [clean_header(h) for h in header]
+    return [[cleaned.index(a) for a in aliases if a in cleaned] for aliases in ALIASES.values()]
+
+
+def iter_rows(path: str) -> Iterator[Row]:
+    with open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _columns(header)
+        for rec in reader:
+            if not rec:
+                continue
+            values = []
+            for idxs in columns:
+                value = ""
+                for i in idxs:
+                    if i < len(rec) and rec[i].strip():
+                        value = rec[i].strip()
+                        break
+                values.append(value)
+            yield Row(*values)
+
+
+@lru_cache(maxsize=65536)
+def normalize_repo(url: str) -> Optional[Tuple[str, str]]:
+    """(owner, repo) from a GitHub URL or a bare owner/repo, without any .git suffix."""
+    url = (url or "").strip()
+    if not url:
+        return None
+    m = _GITHUB_URL.search(url) if "://" in url else _OWNER_REPO.match(url)
+    if not m:
+        return None
+    owner, repo = m.group(1), m.group(2)
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return owner, repo
+
+
+def iter_targets(path: str) -> Iterator[Target]:
+    """Rows with a parseable GitHub repo, in file order."""
+    for row in iter_rows(path):
+        nr = normalize_repo(row.github)
+        if nr:
+            owner, repo = nr
+            yield Target(row.name, owner, repo, row.login or owner, row.app_url)
+
+
+def iter_repos(path: str) -> Iterator[str]:
+    """Distinct OWNER/REPO strings, in first-seen order."""
+    seen = set()
+    for t in iter_targets(path):
+        owner_repo = f"{t.owner}/{t.repo}"
+        if owner_repo not in seen:
+            seen.add(owner_repo)
+            yield owner_repo
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
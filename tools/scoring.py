@@ -0,0 +1,163 @@
+"""Scores and badges from declarative scoring profiles.
+
+A profile is a JSON object: a weight per metric and badge thresholds, checked
+in order. The built-in default is the leaderboard's original rubric:
+
+    {"name": "default",
+     "weights": {"commits_7d": 1, "commit_days_7d": 2, "pr_opened_7d": 3, "pr_merged_7d": 5},
+     "badges": [{"badge": "week-warrior", "metric": "streak", "min": 7},
+                {"badge": "pr-starter", "metric": "pr_opened_7d", "min": 1},
+                {"badge": "merge-master", "metric": "pr_merged_7d", "min": 1},
+                {"badge": "commit-cadence", "metric": "commits_7d", "min": 5}]}
+
+Any metric in the students' metrics dicts can be weighted or thresholded
+(commits_30d, commits_all_time, streak, commits_<N>d with --windows, ...).
+A profile file holds one profile or {"profiles": [...]}.
+
+Profiles are applied to a whole batch of metrics at once, one column per
+metric, so scoring never touches the collectors and any number of profiles
+can re-score the same metrics without fetching anything. Run as a script it
+re-scores an existing leaderboard.json:
+
+    python3 tools/scoring.py web/leaderboard.json /tmp/section-b.json --profile section-b.json
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+import publish
+import ranking
+
+Number = Union[int, float]
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class Badge(NamedTuple):
+    badge: str
+    metric: str
+    min: Number
+
+
+class Profile(NamedTuple):
+    name: str
+    weights: Dict[str, Number]
+    badges: Tuple[Badge, ...]
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> "Profile":
+        try:
+            name = str(spec["name"])
+            weights = {str(k): v for k, v in dict(spec.get("weights") or {}).items()}
+            badges = tuple(Badge(str(b["badge"]), str(b["metric"]), b.get("min", 1)) for b in spec.get("badges") or [])
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            raise ValueError(f"invalid scoring profile {spec.get('name', '?') if isinstance(spec, dict) else spec!r}: {exc}") from None
+        if not _NAME.match(name):
+            # Extra profiles are written to <out stem>.<name>.json
+            raise ValueError(f"scoring profile name {name!r} must be letters, digits, '-' or '_'")
+        for value in [*weights.values(), *(b.min for b in badges)]:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"scoring profile {name}: weights and thresholds must be numbers, got {value!r}")
+        return cls(name, weights, badges)
+
+    def metrics(self) -> List[str]:
+        """Every metric the profile reads."""
+        return list(dict.fromkeys([*self.weights, *(b.metric for b in self.badges)]))
+
+    def evaluate(self, rows: Sequence[Dict]) -> Tuple[List[Number], List[List[str]]]:
+        """Scores and badges for a batch of metrics dicts, in order."""
+        cols = columns(rows, self.metrics(), self.name)
+        scores: List[Number] = [0] * len(rows)
+        for metric, weight in self.weights.items():
+            scores = [s + weight * v for s, v in zip(scores, cols[metric])]
+        if any(isinstance(s, float) for s in scores):
+            # Fractional weights: keep whole scores as ints in the JSON
+            scores = [int(s) if float(s).is_integer() else round(s, 2) for s in scores]
+        earned: List[List[str]] = [[] for _ in rows]
+        for rule in self.badges:
+            for got, v in zip(earned, cols[rule.metric]):
+                if v >= rule.min:
+                    got.append(rule.badge)
+        return scores, earned
+
+    def apply(self, rows: Sequence[Dict]) -> List[List[str]]:
+        """Set each row's "score" in place; returns the badges earned per row."""
+        scores, earned = self.evaluate(rows)
+        for row, score in zip(rows, scores):
+            row["score"] = score
+        return earned
+
+
+DEFAULT = Profile.from_dict(
+    {
+        "name": "default",
+        "weights": {"commits_7d": 1, "commit_days_7d": 2, "pr_opened_7d": 3, "pr_merged_7d": 5},
+        "badges": [
+            {"badge": "week-warrior", "metric": "streak", "min": 7},
+            {"badge": "pr-starter", "metric": "pr_opened_7d", "min": 1},
+            {"badge": "merge-master", "metric": "pr_merged_7d", "min": 1},
+            {"badge": "commit-cadence", "metric": "commits_7d", "min": 5},
+        ],
+    }
+)
+
+
+def columns(rows: Sequence[Dict], metrics: Iterable[str], profile: str = "") -> Dict[str, List[Number]]:
+    """One list per metric across all rows."""
+    cols: Dict[str, List[Number]] = {}
+    for metric in metrics:
+        try:
+            cols[metric] = [row[metric] for row in rows]
+        except KeyError:
+            raise ValueError(f"scoring profile {profile}: unknown metric {metric!r}") from None
+    return cols
+
+
+def load_profiles(paths: Iterable[str]) -> List[Profile]:
+    """Profiles from JSON files, in order; names must be unique."""
+    profiles: List[Profile] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        specs = spec.get("profiles", [spec]) if isinstance(spec, dict) else spec
+        profiles += [Profile.from_dict(s) for s in specs]
+    names = [p.name for p in profiles]
+    duplicate = next((n for n in names if names.count(n) > 1), None)
+    if duplicate is not None:
+        raise ValueError(f"scoring profile {duplicate!r} is defined more than once")
+    return profiles
+
+
+def rescore(data: Dict, profile: Profile) -> Dict:
+    """A leaderboard document re-scored and re-ranked under another profile; data is left untouched."""
+    students = [dict(s, metrics=dict(s["metrics"])) for s in data["students"]]
+    for student, badges in zip(students, profile.apply([s["metrics"] for s in students])):
+        student["badges"] = badges
+    ranked = ranking.RankedIndex(students)
+    return dict(data, students=list(ranked), leaderboard=ranked.rows())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-score an existing leaderboard JSON under other scoring profiles.")
+    ap.add_argument("leaderboard", help="leaderboard.json written by build_leaderboard.py")
+    ap.add_argument("out", help="Output JSON path")
+    ap.add_argument("--profile", required=True, help="Profile JSON file (the first profile in it is used)")
+    ap.add_argument("--no-split", dest="split", action="store_false", help="Only write <out>")
+    args = ap.parse_args()
+    with open(args.leaderboard, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        profiles = load_profiles([args.profile])
+        if not profiles:
+            raise ValueError(f"no profile in {args.profile}")
+        profile = profiles[0]
+        out = rescore(data, profile)
+    except ValueError as exc:
+        sys.exit(f"Error: {exc}")
+    publish.write_leaderboard(out, args.out, args.split)
+    print(f"Wrote {args.out} ({len(out['students'])} students, profile {profile.name})")
+
+
+if __name__ == "__main__":
+    main()
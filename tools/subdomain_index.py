@@ -0,0 +1,86 @@
+"""Reverse lookup from app URLs to illinihunt subdomains.
+
+subdomains.json maps a subdomain to its target: a bare bolt project ID
+(legacy entries) or the full URL of an app on another host (vercel.app,
+netlify.app, onrender.com, fly.dev, ...). SubdomainIndex inverts that map
+once, keyed by normalised hostname, so resolving a student's app URL is one
+dict lookup with exact-match semantics:
+
+    "abc-123"                          -> "abc-123.bolt.host"
+    "https://abc-123.bolt.new/"        -> "abc-123.bolt.host"
+    "https://WWW.Foo.vercel.app/x?y=1" -> "foo.vercel.app"
+
+Targets claimed by more than one subdomain keep the first (in file order)
+and are reported in duplicates.
+"""
+import json
+import re
+import urllib.parse
+from typing import Dict, List, Optional
+
+BOLT_DOMAIN = "bolt.host"
+# bolt.new preview URLs serve the same project as bolt.host
+_HOST_ALIASES = {"bolt.new": BOLT_DOMAIN}
+_PROJECT_ID = re.compile(r"^[a-z0-9][a-z0-9-]*$", re.I)
+
+
+def normalize_host(value: str) -> Optional[str]:
+    """Canonical hostname for a URL, bare hostname or bolt project ID (None if there is none)."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    if "://" not in value:
+        if _PROJECT_ID.match(value):
+            # A bare project ID, as stored for bolt.host apps
+            return f"{value.lower()}.{BOLT_DOMAIN}"
+        value = f"//{value}"
+    try:
+        host = urllib.parse.urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    for alias, canonical in _HOST_ALIASES.items():
+        if host.endswith(f".{alias}"):
+            host = host[: -len(alias)] + canonical
+    return host or None
+
+
+class SubdomainIndex:
+    def __init__(self, subdomains: Dict[str, str]):
+        """subdomains: the "subdomains" mapping of subdomains.json (name -> target)."""
+        self._by_host: Dict[str, str] = {}
+        # host -> every subdomain claiming it, for hosts with more than one
+        self.duplicates: Dict[str, List[str]] = {}
+        for name, target in subdomains.items():
+            self.add(name, target)
+
+    @classmethod
+    def load(cls, path: str = "subdomains.json") -> "SubdomainIndex":
+        """Index of a subdomains.json file; empty if it is missing or unreadable."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f).get("subdomains", {}))
+        except Exception:
+            return cls({})
+
+    def add(self, name: str, target: str) -> None:
+        host = normalize_host(str(target or ""))
+        if not host:
+            return
+        first = self._by_host.setdefault(host, name)
+        if first != name:
+            self.duplicates.setdefault(host, [first]).append(name)
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Subdomain serving this app URL, bare hostname or bolt project ID."""
+        host = normalize_host(url)
+        return self._by_host.get(host) if host else None
+
+    def claimed_by(self, url: str, exclude: str = "") -> Optional[str]:
+        """Another subdomain (not exclude) that already points at url, if any."""
+        name = self.lookup(url)
+        return name if name and name != exclude else None
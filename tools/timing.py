@@ -0,0 +1,249 @@
+"""Timing spans and profiling for leaderboard builds.
+
+Spans cover build phases, per-repo collection, GraphQL batches and every
+GitHub request attempt (endpoint, latency, status, bytes). Recording is off
+until enable() is called, and a disabled span costs one attribute check.
+
+write_trace() emits the spans in Chrome trace-event format (load it in
+chrome://tracing or https://ui.perfetto.dev); write_summary() emits per-phase,
+per-endpoint and per-repo aggregates including the slowest individual calls.
+
+With profiling on, every thread started through thread_started (used as the
+ThreadPoolExecutor initializer) gets its own cProfile profiler, and
+write_profile() merges them with the main thread's into one pstats report.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterator, List, Optional
+
+SLOWEST = 20
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[dict] = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        with self._lock:
+            self.enabled = True
+            self.spans = []
+            self._t0 = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, **args) -> Iterator[dict]:
+        """Time the block; the yielded dict can be filled with result details."""
+        if not self.enabled:
+            yield args
+            return
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            record = {
+                "name": name,
+                "cat": cat,
+                "start": start - self._t0,
+                "dur": end - start,
+                "tid": threading.get_ident(),
+                "thread": threading.current_thread().name,
+                "args": args,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+
+_tracer = Tracer()
+_profiles: List[cProfile.Profile] = []
+_profiles_lock = threading.Lock()
+_profiling = False
+
+
+def enable(profile: bool = False) -> None:
+    """Start recording spans and, with profile=True, profiling the calling thread."""
+    global _profiling
+    _tracer.enable()
+    if profile:
+        _profiling = True
+        thread_started()
+
+
+def enabled() -> bool:
+    return _tracer.enabled
+
+
+def span(name: str, cat: str, **args):
+    return _tracer.span(name, cat, **args)
+
+
+def thread_started() -> None:
+    """ThreadPoolExecutor initializer: profile the new worker thread when profiling."""
+    if not _profiling:
+        return
+    p = cProfile.Profile()
+    with _profiles_lock:
+        _profiles.append(p)
+    p.enable()
+
+
+_REPO_PATH = re.compile(r"^/repos/([^/]+)/([^/]+)")
+_SEARCH_REPO = re.compile(r"\brepo:(\S+)")
+
+
+def endpoint(method: str, url: str) -> str:
+    """Group a request URL into an endpoint template, e.g. GET /repos/{owner}/{repo}/commits."""
+    path = urllib.parse.urlsplit(url).path
+    path = _REPO_PATH.sub("/repos/{owner}/{repo}", path)
+    path = re.sub(r"^/users/[^/]+", "/users/{user}", path)
+    path = re.sub(r"^/user/repository_invitations/\d+", "/user/repository_invitations/{id}", path)
+    return f"{method} {path}"
+
+
+def repo_of(url: str, body: Optional[object] = None) -> Optional[str]:
+    """The owner/repo a request is about, if it names exactly one."""
+    parts = urllib.parse.urlsplit(url)
+    m = _REPO_PATH.match(parts.path)
+    if m:
+        return f"{m.group(1)}/{m.group(2)}".lower()
+    m = _SEARCH_REPO.search(urllib.parse.parse_qs(parts.query).get("q", [""])[0])
+    if m:
+        return m.group(1).lower()
+    variables = body.get("variables") if isinstance(body, dict) else None
+    if isinstance(variables, dict) and variables.get("owner") and variables.get("repo"):
+        return f"{variables['owner']}/{variables['repo']}".lower()
+    return None
+
+
+def _pct(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def summary() -> Dict[str, object]:
+    """Per-phase, per-endpoint and per-repo aggregates of the recorded spans."""
+    spans = list(_tracer.spans)
+    calls = [s for s in spans if s["cat"] == "http"]
+
+    phases: Dict[str, float] = {}
+    for s in spans:
+        if s["cat"] == "phase":
+            phases[s["name"]] = round(phases.get(s["name"], 0.0) + s["dur"], 3)
+
+    by_endpoint: Dict[str, List[dict]] = {}
+    for c in calls:
+        by_endpoint.setdefault(c["name"], []).append(c)
+    endpoints = {}
+    for name, group in sorted(by_endpoint.items(), key=lambda kv: -sum(c["dur"] for c in kv[1])):
+        durs = sorted(c["dur"] for c in group)
+        statuses: Dict[str, int] = {}
+        for c in group:
+            key = str(c["args"].get("status"))
+            statuses[key] = statuses.get(key, 0) + 1
+        endpoints[name] = {
+            "calls": len(group),
+            "total_s": round(sum(durs), 3),
+            "p50_ms": _ms(_pct(durs, 0.5)),
+            "p95_ms": _ms(_pct(durs, 0.95)),
+            "max_ms": _ms(durs[-1]),
+            "bytes": sum(c["args"].get("bytes", 0) for c in group),
+            "status": statuses,
+        }
+
+    repos: Dict[str, dict] = {}
+    for s in spans:
+        if s["cat"] == "repo":
+            repos.setdefault(s["name"], {"wall_s": 0.0, "calls": 0, "api_s": 0.0, "bytes": 0})["wall_s"] += s["dur"]
+    for c in calls:
+        repo = c["args"].get("repo")
+        if repo:
+            r = repos.setdefault(repo, {"wall_s": 0.0, "calls": 0, "api_s": 0.0, "bytes": 0})
+            r["calls"] += 1
+            r["api_s"] += c["dur"]
+            r["bytes"] += c["args"].get("bytes", 0)
+    slowest_repos = sorted(repos.items(), key=lambda kv: -max(kv[1]["wall_s"], kv[1]["api_s"]))[:SLOWEST]
+
+    return {
+        "phases_s": phases,
+        "requests": len(calls),
+        "endpoints": endpoints,
+        "slowest_repos": [
+            {"repo": name, "wall_s": round(r["wall_s"], 3), "api_s": round(r["api_s"], 3), "calls": r["calls"], "bytes": r["bytes"]}
+            for name, r in slowest_repos
+        ],
+        "slowest_calls": [
+            {"endpoint": c["name"], "url": c["args"].get("url"), "ms": _ms(c["dur"]), "status": c["args"].get("status")}
+            for c in sorted(calls, key=lambda c: -c["dur"])[:SLOWEST]
+        ],
+    }
+
+
+def write_summary(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary(), f, indent=2)
+
+
+def write_trace(path: str) -> None:
+    """Chrome trace-event JSON: one complete ("X") event per span, one row per thread."""
+    tids: Dict[int, int] = {}
+    events = []
+    for s in _tracer.spans:
+        if s["tid"] not in tids:
+            tids[s["tid"]] = len(tids) + 1
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tids[s["tid"]], "args": {"name": s["thread"]}})
+        tid = tids[s["tid"]]
+        events.append(
+            {
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": round(s["start"] * 1e6),
+                "dur": round(s["dur"] * 1e6),
+                "pid": 1,
+                "tid": tid,
+                "args": s["args"],
+            }
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, separators=(",", ":"))
+
+
+def write_profile(path: str, limit: int = 40) -> None:
+    """Merge the per-thread profiles and write the top functions by cumulative time."""
+    with _profiles_lock:
+        profiles = list(_profiles)
+    if not profiles:
+        return
+    # disable() detaches the calling thread's hook, so stop the main thread's profiler
+    # first; workers have exited by now and their profilers just need flushing.
+    for p in profiles:
+        p.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profiles[0], stream=out)
+    for p in profiles[1:]:
+        stats.add(p)
+    stats.sort_stats("cumulative").print_stats(limit)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# cProfile over {len(profiles)} thread(s), top {limit} by cumulative time\n")
+        f.write(out.getvalue())
+
+
+def sidecar(out_path: str, suffix: str) -> str:
+    """leaderboard.json -> leaderboard.<suffix> in the same directory."""
+    stem, _ext = os.path.splitext(out_path)
+    return f"{stem}.{suffix}"
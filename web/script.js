@@ -1,3 +1,106 @@
+// Per-student details (metrics, badges) live in shards of the summary's
+// shard_size students each, fetched as their rows scroll into view
+const detailShards = new Map();
+let detailsBase = null;
+let shardSize = 0;
+let detailObserver = null;
+
+async function fetchJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    return response.json();
+}
+
+// Ranked rows ({name, repo, score, urls, details}) plus totals. Prefers the small
+// summary file; falls back to the full leaderboard.json (details included)
+async function loadRows() {
+    try {
+        const summary = await fetchJson('leaderboard.summary.json');
+        detailsBase = summary.details;
+        shardSize = summary.shard_size;
+        return {
+            meta: summary,
+            totals: summary.totals,
+            rows: summary.leaderboard.map(row => ({ ...row, details: null }))
+        };
+    } catch (error) {
+        const data = await fetchJson('leaderboard.json');
+        return {
+            meta: data,
+            totals: {
+                students: data.students.length,
+                commits_7d: data.students.reduce((sum, s) => sum + s.metrics.commits_7d, 0),
+                pr_merged_7d: data.students.reduce((sum, s) => sum + s.metrics.pr_merged_7d, 0)
+            },
+            rows: data.students.map(s => ({
+                name: s.name,
+                repo: s.repo,
+                score: s.metrics.score,
+                urls: s.urls,
+                details: { metrics: s.metrics, badges: s.badges }
+            }))
+        };
+    }
+}
+
+// Rank changes and moving averages from leaderboard.history.json, when the
+// build keeps a history; the page renders fine without it. Loaded after the
+// first render, then the markers are added to the rows already on the page
+async function loadTrends(rows) {
+    try {
+        const history = await fetchJson('leaderboard.history.json');
+        rows.forEach(row => {
+            row.trend = history.students[row.repo.toLowerCase()] || null;
+        });
+    } catch (error) {
+        return; // No history published
+    }
+    const items = document.getElementById('leaderboard-content').children;
+    rows.forEach((row, index) => {
+        const rankEl = items[index] && items[index].querySelector('.rank');
+        if (rankEl && row.trend && !rankEl.querySelector('.rank-change')) {
+            rankEl.insertAdjacentHTML('beforeend', trendHtml(row.trend));
+        }
+    });
+}
+
+function loadShard(rows, shard) {
+    if (!detailShards.has(shard)) {
+        const request = fetchJson(`${detailsBase}/${shard}.json`)
+            .then(data => {
+                data.students.forEach((details, offset) => {
+                    const row = rows[shard * shardSize + offset];
+                    if (row && row.repo === details.repo) {
+                        row.details = details;
+                    }
+                });
+            })
+            .catch(error => {
+                console.error(`Error loading details shard ${shard}:`, error);
+                detailShards.delete(shard);
+            });
+        detailShards.set(shard, request);
+    }
+    return detailShards.get(shard);
+}
+
+// Resolves to false when the row's shard failed to load, so it can be retried
+async function fillDetails(rows, el) {
+    const index = Number(el.dataset.index);
+    if (!rows[index].details) {
+        await loadShard(rows, Math.floor(index / shardSize));
+    }
+    if (!rows[index].details) {
+        return false;
+    }
+    if (el.isConnected) {
+        el.outerHTML = detailsHtml(rows[index].details);
+    }
+    return true;
+}
+
 // Load and display leaderboard data
 async function loadLeaderboard() {
     const loadingEl = document.getElementById('loading');
@@ -6,47 +109,40 @@ async function loadLeaderboard() {
     const contentEl = document.getElementById('leaderboard-content');
 
     try {
-        const response = await fetch('leaderboard.json');
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-
-        const data = await response.json();
+        const data = await loadRows();
         loadingEl.style.display = 'none';
 
         // Update meta information
-        if (data.generated_at) {
-            const date = new Date(data.generated_at);
+        if (data.meta.generated_at) {
+            const date = new Date(data.meta.generated_at);
             document.getElementById('generated-at').textContent = 
                 `Updated ${date.toLocaleString()}`;
         }
-        if (data.window_days) {
-            document.getElementById('window-days').textContent = data.window_days;
+        if (data.meta.window_days) {
+            document.getElementById('window-days').textContent = data.meta.window_days;
         }
 
-        // Calculate summary statistics
-        const totalCommits = data.students.reduce((sum, s) => sum + s.metrics.commits_7d, 0);
-        const totalPRs = data.students.reduce((sum, s) => sum + s.metrics.pr_merged_7d, 0);
-
-        document.getElementById('total-students').textContent = data.students.length;
-        document.getElementById('total-commits').textContent = totalCommits;
-        document.getElementById('total-prs').textContent = totalPRs;
+        // Summary statistics
+        document.getElementById('total-students').textContent = data.totals.students;
+        document.getElementById('total-commits').textContent = data.totals.commits_7d;
+        document.getElementById('total-prs').textContent = data.totals.pr_merged_7d;
 
         // Render leaderboard
-        renderLeaderboard(data.students, 'comprehensive');
+        renderLeaderboard(data.rows, 'comprehensive');
         containerEl.style.display = 'block';
+        loadTrends(data.rows);
 
         // Set up view toggle
         document.getElementById('view-comprehensive').addEventListener('click', () => {
             document.getElementById('view-comprehensive').classList.add('active');
             document.getElementById('view-simple').classList.remove('active');
-            renderLeaderboard(data.students, 'comprehensive');
+            renderLeaderboard(data.rows, 'comprehensive');
         });
 
         document.getElementById('view-simple').addEventListener('click', () => {
             document.getElementById('view-simple').classList.add('active');
             document.getElementById('view-comprehensive').classList.remove('active');
-            renderLeaderboard(data.students, 'simple');
+            renderLeaderboard(data.rows, 'simple');
         });
 
     } catch (error) {
@@ -60,11 +156,29 @@ function renderLeaderboard(students, viewMode) {
     const contentEl = document.getElementById('leaderboard-content');
     contentEl.innerHTML = '';
 
+    if (detailObserver) {
+        detailObserver.disconnect();
+    }
+    detailObserver = 'IntersectionObserver' in window
+        ? new IntersectionObserver((entries, observer) => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    // Stay observed until filled: a failed shard is retried when the row comes back into view
+                    fillDetails(students, entry.target).then(filled => {
+                        if (filled) {
+                            observer.unobserve(entry.target);
+                        }
+                    });
+                }
+            });
+        }, { rootMargin: '400px 0px' })
+        : null;
+
     students.forEach((student, index) => {
         const item = document.createElement('div');
         item.className = `leaderboard-item ${viewMode}`;
 
-        const rank = student.metrics.score > 0 ? index + 1 : '-';
+        const rank = student.score > 0 ? index + 1 : '-';
         const rankClass = rank === 1 ? 'rank-1' : rank === 2 ? 'rank-2' : rank === 3 ? 'rank-3' : '';
 
         // Determine primary identifier - use illinihunt domain if available, otherwise repo name
@@ -77,7 +191,7 @@ function renderLeaderboard(students, viewMode) {
             : `https://github.com/${student.repo}`;
 
         let html = `
-            <div class="rank ${rankClass}">${rank === '-' ? '—' : rank}</div>
+            <div class="rank ${rankClass}">${rank === '-' ? '—' : rank}${trendHtml(student.trend)}</div>
             <div class="student-info">
                 <div class="student-domain">
                     <a href="${escapeHtml(primaryLink)}" target="_blank" rel="noopener noreferrer" class="primary-domain-link">
@@ -102,67 +216,98 @@ function renderLeaderboard(students, viewMode) {
         }
 
         if (viewMode === 'comprehensive') {
-            // Badges
-            if (student.badges && student.badges.length > 0) {
-                html += '<div class="badges">';
-                student.badges.forEach(badge => {
-                    const badgeLabels = {
-                        'week-warrior': '🔥 Week Warrior',
-                        'pr-starter': '🚀 PR Starter',
-                        'merge-master': '✨ Merge Master',
-                        'commit-cadence': '⚡ Commit Cadence'
-                    };
-                    html += `<span class="badge ${badge}">${badgeLabels[badge] || badge}</span>`;
-                });
-                html += '</div>';
-            }
-
-            // Metrics
-            html += '<div class="metrics">';
-            html += `<div class="metric">
-                <div class="metric-label">Commits (7d)</div>
-                <div class="metric-value">${student.metrics.commits_7d}</div>
-            </div>`;
-            if (typeof student.metrics.commits_all_time === 'number') {
-                html += `<div class="metric">
-                    <div class="metric-label">Commits (all-time)</div>
-                    <div class="metric-value">${student.metrics.commits_all_time}</div>
-                </div>`;
-            }
-            html += `<div class="metric">
-                <div class="metric-label">Commit Days</div>
-                <div class="metric-value">${student.metrics.commit_days_7d}</div>
-            </div>`;
-            html += `<div class="metric">
-                <div class="metric-label">PRs Opened</div>
-                <div class="metric-value">${student.metrics.pr_opened_7d}</div>
-            </div>`;
-            html += `<div class="metric">
-                <div class="metric-label">PRs Merged</div>
-                <div class="metric-value">${student.metrics.pr_merged_7d}</div>
-            </div>`;
-            html += `<div class="metric">
-                <div class="metric-label">
-                    Streak
-                    <span class="info-icon" title="Consecutive days with commits, counting backwards from today">ℹ️</span>
-                </div>
-                <div class="metric-value">${student.metrics.streak} 🔥</div>
-            </div>`;
-            html += '</div>';
+            html += student.details
+                ? detailsHtml(student.details)
+                : `<div class="metrics-placeholder" data-index="${index}"></div>`;
         }
 
         html += '</div>';
         html += `<div class="score">
-            <div class="score-value">${student.metrics.score}</div>
+            <div class="score-value">${student.score}</div>
             <div class="score-label">Score</div>
         </div>`;
         html += '</div>';
 
         item.innerHTML = html;
         contentEl.appendChild(item);
+
+        const placeholder = item.querySelector('.metrics-placeholder');
+        if (placeholder) {
+            if (detailObserver) {
+                detailObserver.observe(placeholder);
+            } else {
+                fillDetails(students, placeholder);
+            }
+        }
     });
 }
 
+function trendHtml(trend) {
+    if (!trend || typeof trend.rank_change !== 'number' || trend.rank_change === 0) {
+        return '';
+    }
+    const up = trend.rank_change > 0;
+    const week = typeof trend.rank_change_7d === 'number'
+        ? `, ${trend.rank_change_7d >= 0 ? 'up' : 'down'} ${Math.abs(trend.rank_change_7d)} over the week`
+        : '';
+    const title = `${up ? 'Up' : 'Down'} ${Math.abs(trend.rank_change)} since the previous day${week}`;
+    return `<div class="rank-change ${up ? 'up' : 'down'}" title="${title}">${up ? '▲' : '▼'}${Math.abs(trend.rank_change)}</div>`;
+}
+
+function detailsHtml(details) {
+    const metrics = details.metrics;
+    let html = '';
+
+    // Badges
+    if (details.badges && details.badges.length > 0) {
+        html += '<div class="badges">';
+        details.badges.forEach(badge => {
+            const badgeLabels = {
+                'week-warrior': '🔥 Week Warrior',
+                'pr-starter': '🚀 PR Starter',
+                'merge-master': '✨ Merge Master',
+                'commit-cadence': '⚡ Commit Cadence'
+            };
+            html += `<span class="badge ${badge}">${badgeLabels[badge] || badge}</span>`;
+        });
+        html += '</div>';
+    }
+
+    // Metrics
+    html += '<div class="metrics">';
+    html += `<div class="metric">
+        <div class="metric-label">Commits (7d)</div>
+        <div class="metric-value">${metrics.commits_7d}</div>
+    </div>`;
+    if (typeof metrics.commits_all_time === 'number') {
+        html += `<div class="metric">
+            <div class="metric-label">Commits (all-time)</div>
+            <div class="metric-value">${metrics.commits_all_time}</div>
+        </div>`;
+    }
+    html += `<div class="metric">
+        <div class="metric-label">Commit Days</div>
+        <div class="metric-value">${metrics.commit_days_7d}</div>
+    </div>`;
+    html += `<div class="metric">
+        <div class="metric-label">PRs Opened</div>
+        <div class="metric-value">${metrics.pr_opened_7d}</div>
+    </div>`;
+    html += `<div class="metric">
+        <div class="metric-label">PRs Merged</div>
+        <div class="metric-value">${metrics.pr_merged_7d}</div>
+    </div>`;
+    html += `<div class="metric">
+        <div class="metric-label">
+            Streak
+            <span class="info-icon" title="Consecutive days with commits, counting backwards from today">ℹ️</span>
+        </div>
+        <div class="metric-value">${metrics.streak} 🔥</div>
+    </div>`;
+    html += '</div>';
+    return html;
+}
+
 function escapeHtml(text) {
     const div = document.createElement('div');
     div.textContent = text;